@@ -1,38 +1,92 @@
-from fastapi import APIRouter, Depends, HTTPException, Query, status
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response, status
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy import distinct, func, insert
 from sqlalchemy.orm import Session
-from pydantic import BaseModel, field_serializer
-from typing import List, Optional
-from datetime import datetime
+from pydantic import BaseModel, ValidationError, field_validator
+from typing import Any, Callable, List, Optional, Union
+import codecs
+import csv
+import hashlib
+from ..core.cache import (
+    BOOT_ID, bump_user_version, response_cache_get, response_cache_set, user_version
+)
 from ..core.database import get_db
+from ..core.metrics import RESPONSE_CACHE
+from ..core.serialization import ORJSONResponse, dumps
+from ..core.security import CurrentUser, get_current_user
 from ..models.alert import Alert
+from ..models.event import AlertEvent
+from ..models.rollup import AlertDailyRollup
 from ..models.user import User
+from ..services.alert_indexes import alerts_activated, alerts_deactivated
+from ..services.indicators import DEFAULT_PERIODS, INDICATOR_TYPES, MAX_PERIOD
+from ..services.rollups import RollupIncrements, apply_increments, merge_increments, record_created
+from ..services.rules import RULE_TYPE, normalize_rule, rule_tickers
+from ..utils.pagination import decode_cursor, encode_cursor, keyset_before
 
 router = APIRouter()
 
+MAX_PAGE_SIZE = 200
+
+# Indicadores: rsi compara o próprio RSI; sma, ema e vwap comparam a
+# distância percentual do preço até o indicador (ex.: sma > 0 = acima da média).
+# compound usa a expressão (ex.: "price < 30 AND volume > 10M") no lugar de condition/target_value
+VALID_TYPES = ["price", "percentage", "volume", *INDICATOR_TYPES, RULE_TYPE]
+VALID_CONDITIONS = [">", "<", ">=", "<="]
+
+# Limite de linhas por importação em lote
+MAX_BULK_ALERTS = 1000
+
+# Headers da resposta que fazem parte da representação (guardados junto no cache)
+CACHED_HEADERS = ("x-next-cursor",)
+
+_not_modified = RESPONSE_CACHE.labels("not_modified")
+_cache_hit = RESPONSE_CACHE.labels("hit")
+_cache_miss = RESPONSE_CACHE.labels("miss")
+
+ALERT_FIELDS = (
+    "id", "ticker", "alert_type", "target_value", "condition", "period", "expression",
+    "is_active", "triggered", "created_at", "triggered_at",
+)
+
+# O histórico vem de alert_events: mesmos campos do alerta e os valores do disparo
+HISTORY_FIELDS = ALERT_FIELDS + ("trigger_value", "price")
+
+# Campo do histórico -> coluna do evento (is_active/triggered são constantes)
+_EVENT_COLUMNS = {
+    name: getattr(AlertEvent, name)
+    for name in HISTORY_FIELDS
+    if name not in ("id", "created_at", "is_active", "triggered")
+}
+_EVENT_COLUMNS["id"] = AlertEvent.alert_id
+_EVENT_COLUMNS["created_at"] = AlertEvent.alert_created_at
+
 class AlertCreate(BaseModel):
-    user_id: int
-    ticker: str
+    # Ignorado: o usuário vem do token (mantido por compatibilidade com clientes antigos)
+    user_id: Optional[int] = None
+    # Em regras compostas é o ticker padrão dos predicados sem ticker
+    ticker: str = ""
     alert_type: str
-    target_value: float
-    condition: str
+    target_value: Optional[float] = None
+    condition: Optional[str] = None
+    # Só para indicadores; sem valor usa o período padrão (SMA/EMA 20, RSI 14)
+    period: Optional[int] = None
+    # Só para compound
+    expression: Optional[str] = None
 
-class AlertResponse(BaseModel):
-    id: int
-    ticker: str
+class BulkAlertItem(BaseModel):
+    ticker: str = ""
     alert_type: str
-    target_value: float
-    condition: str
-    is_active: bool
-    triggered: bool
-    created_at: datetime
-    triggered_at: Optional[datetime] = None
-
-    @field_serializer('created_at', 'triggered_at')
-    def serialize_datetime(self, dt: Optional[datetime], _info):
-        return dt.isoformat() if dt else None
+    target_value: Optional[float] = None
+    condition: Optional[str] = None
+    period: Optional[int] = None
+    expression: Optional[str] = None
 
-    class Config:
-        from_attributes = True
+    @field_validator('target_value', 'condition', 'period', 'expression', mode='before')
+    @classmethod
+    def empty_column(cls, v):
+        # Coluna vazia no CSV
+        return None if v == "" else v
 
 class AlertStats(BaseModel):
     total_alerts: int
@@ -40,43 +94,95 @@ class AlertStats(BaseModel):
     triggered_alerts: int
     total_tickers: int
 
+def _validate_alert(alert_type: str, condition: str, period: Optional[int] = None) -> Optional[str]:
+    """Retorna a mensagem de erro ou None se o alerta for válido"""
+    if alert_type not in VALID_TYPES:
+        return f"Tipo de alerta inválido. Use: {', '.join(VALID_TYPES)}"
+    if condition not in VALID_CONDITIONS:
+        return f"Condição inválida. Use: {', '.join(VALID_CONDITIONS)}"
+    if period is not None:
+        if DEFAULT_PERIODS.get(alert_type) is None:
+            return f"Período só se aplica a: {', '.join(t for t, p in DEFAULT_PERIODS.items() if p)}"
+        if not 2 <= period <= MAX_PERIOD:
+            return f"Período deve estar entre 2 e {MAX_PERIOD}"
+    return None
+
+def _resolve_period(alert_type: str, period: Optional[int]) -> Optional[int]:
+    """Período efetivo: o informado ou o padrão do indicador"""
+    return period if period is not None else DEFAULT_PERIODS.get(alert_type)
+
+def _alert_fields(item: Union[AlertCreate, BulkAlertItem]) -> dict:
+    """
+    Colunas do alerta já validadas
+    Levanta ValueError (RuleError nas expressões) com a mensagem para o usuário.
+    """
+    ticker = item.ticker.strip().upper()
+    
+    if item.alert_type == RULE_TYPE:
+        # Parse único: o banco guarda a expressão normalizada, com os tickers explícitos
+        expression = normalize_rule(item.expression or "", ticker)
+        return {
+            "ticker": rule_tickers(expression)[0],
+            "alert_type": RULE_TYPE,
+            "target_value": 0.0,
+            "condition": "",
+            "period": None,
+            "expression": expression,
+        }
+    
+    error = _validate_alert(item.alert_type, item.condition, item.period)
+    if error:
+        raise ValueError(error)
+    if item.target_value is None:
+        raise ValueError("Informe o target_value")
+    if item.expression is not None:
+        raise ValueError(f"Expressão só se aplica a alertas {RULE_TYPE}")
+    if not ticker:
+        raise ValueError("Ticker vazio")
+    
+    return {
+        "ticker": ticker,
+        "alert_type": item.alert_type,
+        "target_value": item.target_value,
+        "condition": item.condition,
+        "period": _resolve_period(item.alert_type, item.period),
+        "expression": None,
+    }
+
 @router.post("", status_code=status.HTTP_201_CREATED)
-def create_alert(alert: AlertCreate, db: Session = Depends(get_db)):
+def create_alert(
+    alert: AlertCreate,
+    current_user: CurrentUser = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
     """Cria um novo alerta"""
-    user = db.query(User).filter(User.id == alert.user_id).first()
+    user_id = current_user.id
+    user = db.query(User).filter(User.id == user_id).first()
     if not user:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Usuário não encontrado"
         )
     
-    valid_types = ["price", "percentage", "volume"]
-    if alert.alert_type not in valid_types:
-        raise HTTPException(
-            status_code=status.HTTP_400_BAD_REQUEST,
-            detail=f"Tipo de alerta inválido. Use: {', '.join(valid_types)}"
-        )
-    
-    valid_conditions = [">", "<", ">=", "<="]
-    if alert.condition not in valid_conditions:
+    try:
+        fields = _alert_fields(alert)
+    except ValueError as e:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
-            detail=f"Condição inválida. Use: {', '.join(valid_conditions)}"
+            detail=str(e)
         )
     
     try:
-        new_alert = Alert(
-            user_id=alert.user_id,
-            ticker=alert.ticker.upper(),
-            alert_type=alert.alert_type,
-            target_value=alert.target_value,
-            condition=alert.condition
-        )
+        new_alert = Alert(user_id=user_id, **fields)
         
         db.add(new_alert)
+        record_created(db, user_id, alert.alert_type)
         db.commit()
         db.refresh(new_alert)
         
+        alerts_activated([(new_alert.ticker, new_alert.alert_type, new_alert.target_value)])
+        bump_user_version(user_id)
+        
         return new_alert
         
     except Exception as e:
@@ -87,91 +193,411 @@ def create_alert(alert: AlertCreate, db: Session = Depends(get_db)):
             detail="Erro ao criar alerta"
         )
 
-@router.get("", response_model=List[AlertResponse])
-def list_alerts(
-    user_id: int = Query(...),
-    active_only: bool = Query(True, description="Retornar apenas alertas ativos"),
-    db: Session = Depends(get_db)
-):
-    """Lista alertas do usuário"""
+async def _iter_csv_rows(request: Request):
+    """
+    Lê o corpo CSV em streaming, linha a linha, sem carregar tudo em memória
+    A primeira linha é o cabeçalho (ticker,alert_type,condition,target_value[,period][,expression]).
+    """
+    decoder = codecs.getincrementaldecoder("utf-8-sig")()
+    header = None
+    buffer = ""
+    
+    def parse(line: str) -> Optional[dict]:
+        nonlocal header
+        line = line.strip()
+        if not line:
+            return None
+        values = [v.strip() for v in next(csv.reader([line]))]
+        if header is None:
+            header = [h.lower() for h in values]
+            return None
+        return dict(zip(header, values))
+    
+    async for chunk in request.stream():
+        buffer += decoder.decode(chunk)
+        *lines, buffer = buffer.split("\n")
+        for line in lines:
+            row = parse(line)
+            if row is not None:
+                yield row
+    
+    row = parse(buffer + decoder.decode(b"", final=True))
+    if row is not None:
+        yield row
+
+async def _read_bulk_rows(request: Request) -> List[dict]:
+    content_type = request.headers.get("content-type", "")
+    
+    if "csv" in content_type:
+        rows = []
+        async for row in _iter_csv_rows(request):
+            rows.append(row)
+            if len(rows) > MAX_BULK_ALERTS:
+                break
+        return rows
+    
     try:
-        query = db.query(Alert).filter(Alert.user_id == user_id)
+        payload = await request.json()
+    except ValueError:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Corpo inválido. Envie um array JSON ou CSV (text/csv)"
+        )
+    
+    if isinstance(payload, dict):
+        payload = payload.get("alerts")
+    if not isinstance(payload, list):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Envie um array JSON de alertas"
+        )
+    return payload
+
+def _insert_bulk(db: Session, user_id: int, raw_rows: List[dict]) -> dict:
+    """Valida as linhas e insere as válidas num único INSERT multi-linha"""
+    user = db.query(User.id).filter(User.id == user_id).first()
+    if not user:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Usuário não encontrado"
+        )
+    
+    errors = []
+    values = []
+    rows = []
+    
+    for index, raw in enumerate(raw_rows, start=1):
+        try:
+            item = BulkAlertItem.model_validate(raw)
+        except ValidationError as e:
+            first = e.errors()[0]
+            field = ".".join(str(loc) for loc in first["loc"])
+            errors.append({"row": index, "error": f"{field}: {first['msg']}"})
+            continue
         
-        if active_only:
-            query = query.filter(Alert.is_active == True)
+        try:
+            fields = _alert_fields(item)
+        except ValueError as e:
+            errors.append({"row": index, "error": str(e)})
+            continue
         
-        alerts = query.order_by(Alert.created_at.desc()).all()
-        return alerts
+        values.append({
+            "user_id": user_id,
+            **fields,
+            "is_active": True,
+            "triggered": False,
+        })
+        rows.append(index)
+    
+    created_ids = []
+    if values:
+        increments: RollupIncrements = {}
+        for value in values:
+            merge_increments(increments, user_id, value["alert_type"], created=1)
         
-    except Exception as e:
-        print(f"❌ Erro ao listar alertas: {e}")
-        raise HTTPException(
-            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-            detail="Erro ao buscar alertas"
+        try:
+            # Sem sort_by_parameter_order o RETURNING do insertmanyvalues pode vir fora de ordem
+            created_ids = list(db.scalars(insert(Alert).returning(Alert.id, sort_by_parameter_order=True), values))
+            apply_increments(db, increments)
+            db.commit()
+        except Exception as e:
+            db.rollback()
+            print(f"❌ Erro ao importar alertas: {e}")
+            raise HTTPException(
+                status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+                detail="Erro ao importar alertas"
+            )
+        
+        # Índices em memória são atualizados uma única vez por lote
+        alerts_activated(
+            (value["ticker"], value["alert_type"], value["target_value"])
+            for value in values
         )
+        bump_user_version(user_id)
+    
+    return {
+        "created": len(created_ids),
+        "alerts": [
+            {"row": row, "id": alert_id}
+            for row, alert_id in zip(rows, created_ids)
+        ],
+        "errors": errors
+    }
 
-@router.get("/history", response_model=List[AlertResponse])
-def get_alert_history(
-    user_id: int = Query(...),
+@router.post("/bulk", status_code=status.HTTP_201_CREATED)
+async def bulk_create_alerts(
+    request: Request,
+    current_user: CurrentUser = Depends(get_current_user),
     db: Session = Depends(get_db)
 ):
-    """Retorna histórico de alertas disparados"""
+    """
+    Cria alertas em lote a partir de um array JSON ou de um CSV (text/csv)
+    Linhas inválidas são reportadas individualmente; as válidas entram numa única transação.
+    """
+    user_id = current_user.id
+    raw_rows = await _read_bulk_rows(request)
+    
+    if len(raw_rows) > MAX_BULK_ALERTS:
+        raise HTTPException(
+            status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+            detail=f"Máximo de {MAX_BULK_ALERTS} alertas por importação"
+        )
+    
+    if not raw_rows:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Nenhum alerta enviado"
+        )
+    
+    result = await run_in_threadpool(_insert_bulk, db, user_id, raw_rows)
+    
+    if not result["created"]:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail={"message": "Nenhum alerta válido", "errors": result["errors"]}
+        )
+    
+    return result
+
+def _parse_fields(fields: Optional[str], allowed=ALERT_FIELDS) -> List[str]:
+    """Valida a projeção pedida em ?fields=ticker,target_value (id sempre incluso)"""
+    if not fields:
+        return list(allowed)
+    
+    requested = [f.strip() for f in fields.split(",") if f.strip()]
+    invalid = [f for f in requested if f not in allowed]
+    if invalid:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Campos inválidos: {', '.join(invalid)}. Use: {', '.join(allowed)}"
+        )
+    
+    return ["id"] + [f for f in requested if f != "id"]
+
+def _parse_cursor(cursor: Optional[str]):
+    if not cursor:
+        return None
     try:
-        alerts = db.query(Alert).filter(
-            Alert.user_id == user_id,
-            Alert.triggered == True
-        ).order_by(Alert.triggered_at.desc()).limit(50).all()
-        
-        return alerts
-        
-    except Exception as e:
-        print(f"❌ Erro ao buscar histórico: {e}")
+        return decode_cursor(cursor)
+    except ValueError:
         raise HTTPException(
-            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-            detail="Erro ao buscar histórico"
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Cursor inválido"
         )
 
+def alert_to_dict(row, field_names=ALERT_FIELDS) -> dict:
+    """
+    Linha (ORM ou tupla nomeada) nos campos pedidos
+    Os valores vão crus: datetimes são serializados pelo orjson (core/serialization.py).
+    """
+    return {name: getattr(row, name) for name in field_names}
+
+def _fetch_page(query, sort_column, response: Response, field_names: List[str], limit: int):
+    """
+    Executa a página (limit + 1 para saber se há próxima) e monta o cursor
+    O cursor da próxima página vai no header X-Next-Cursor.
+    """
+    sort_name = sort_column.key
+    select_names = field_names if sort_name in field_names else field_names + [sort_name]
+    
+    rows = query.with_entities(*[getattr(Alert, f) for f in select_names]).order_by(
+        sort_column.desc(), Alert.id.desc()
+    ).limit(limit + 1).all()
+    
+    has_more = len(rows) > limit
+    rows = rows[:limit]
+    
+    if has_more:
+        last = rows[-1]
+        response.headers["X-Next-Cursor"] = encode_cursor(getattr(last, sort_name), last.id)
+    
+    # Caminho rápido: as colunas vêm na ordem de field_names (a de ordenação extra fica de fora)
+    return [dict(zip(field_names, row)) for row in rows]
+
+def _etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """If-None-Match usa comparação fraca: ignora o prefixo W/"""
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    return any(tag.strip().removeprefix("W/") == etag for tag in if_none_match.split(","))
+
+def _cached_response(request: Request, user_id: int, build: Callable[[Response], Any]) -> Response:
+    """
+    GET condicional por usuário: 304 ou resposta em cache sem tocar no banco
+    O ETag (forte) é a versão do usuário + a URL; qualquer escrita nos alertas
+    do usuário bumpa a versão (bump_user_version) e invalida os dois.
+    A versão é lida antes da consulta: uma escrita concorrente nunca fica
+    escondida atrás de um ETag antigo.
+    """
+    version = user_version(user_id)
+    key = f"{request.url.path}?{'&'.join(sorted(f'{k}={v}' for k, v in request.query_params.multi_items()))}"
+    digest = hashlib.blake2b(f"{user_id}:{key}".encode(), digest_size=8).hexdigest()
+    etag = f'"{BOOT_ID}-{version}-{digest}"'
+    # no-cache: o navegador guarda, mas revalida sempre (If-None-Match)
+    cache_headers = {"ETag": etag, "Cache-Control": "private, no-cache"}
+    
+    if _etag_matches(request.headers.get("if-none-match"), etag):
+        _not_modified.inc()
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=cache_headers)
+    
+    cached = response_cache_get(user_id, key, version)
+    if cached is not None:
+        _cache_hit.inc()
+        body, headers = cached
+    else:
+        _cache_miss.inc()
+        collector = Response()
+        body = dumps(build(collector))
+        headers = {name: value for name, value in collector.headers.items() if name in CACHED_HEADERS}
+        response_cache_set(user_id, key, version, body, headers)
+    
+    return Response(body, media_type=ORJSONResponse.media_type, headers={**headers, **cache_headers})
+
+@router.get("")
+def list_alerts(
+    request: Request,
+    current_user: CurrentUser = Depends(get_current_user),
+    active_only: bool = Query(True, description="Retornar apenas alertas ativos"),
+    limit: int = Query(50, ge=1, le=MAX_PAGE_SIZE, description="Tamanho da página"),
+    cursor: Optional[str] = Query(None, description="Cursor retornado em X-Next-Cursor"),
+    fields: Optional[str] = Query(None, description="Campos separados por vírgula"),
+    db: Session = Depends(get_db)
+):
+    """Lista alertas do usuário (paginação por cursor em created_at, id; aceita If-None-Match)"""
+    user_id = current_user.id
+    field_names = _parse_fields(fields)
+    after = _parse_cursor(cursor)
+    
+    def build(response: Response):
+        try:
+            query = db.query(Alert).filter(Alert.user_id == user_id)
+            
+            if active_only:
+                query = query.filter(Alert.is_active == True)
+            
+            if after:
+                query = query.filter(keyset_before(db, Alert.created_at, Alert.id, after))
+            
+            return _fetch_page(query, Alert.created_at, response, field_names, limit)
+            
+        except Exception as e:
+            print(f"❌ Erro ao listar alertas: {e}")
+            raise HTTPException(
+                status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+                detail="Erro ao buscar alertas"
+            )
+    
+    return _cached_response(request, user_id, build)
+
+@router.get("/history")
+def get_alert_history(
+    request: Request,
+    current_user: CurrentUser = Depends(get_current_user),
+    limit: int = Query(50, ge=1, le=MAX_PAGE_SIZE, description="Tamanho da página"),
+    cursor: Optional[str] = Query(None, description="Cursor retornado em X-Next-Cursor"),
+    fields: Optional[str] = Query(None, description="Campos separados por vírgula"),
+    db: Session = Depends(get_db)
+):
+    """
+    Retorna histórico de alertas disparados, lido de alert_events
+    Paginação por cursor em (triggered_at, id do evento); `id` é o do alerta.
+    Aceita If-None-Match.
+    """
+    user_id = current_user.id
+    field_names = _parse_fields(fields, HISTORY_FIELDS)
+    after = _parse_cursor(cursor)
+    
+    def build(response: Response):
+        try:
+            rows = history_rows(db, user_id, field_names, limit + 1, after)
+            
+            if len(rows) > limit:
+                rows = rows[:limit]
+                response.headers["X-Next-Cursor"] = encode_cursor(rows[-1].triggered_at, rows[-1].event_id)
+            
+            return [event_to_dict(row, field_names) for row in rows]
+            
+        except Exception as e:
+            print(f"❌ Erro ao buscar histórico: {e}")
+            raise HTTPException(
+                status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+                detail="Erro ao buscar histórico"
+            )
+    
+    return _cached_response(request, user_id, build)
+
+def history_rows(db: Session, user_id: int, field_names: List[str], limit: int, after=None):
+    """Eventos de disparo do usuário, do mais recente ao mais antigo (usa idx_events_user_triggered)"""
+    columns = [_EVENT_COLUMNS[name].label(name) for name in field_names if name in _EVENT_COLUMNS]
+    if "triggered_at" not in field_names:
+        columns.append(AlertEvent.triggered_at)
+    
+    query = db.query(*columns, AlertEvent.id.label("event_id")).filter(AlertEvent.user_id == user_id)
+    if after:
+        query = query.filter(keyset_before(db, AlertEvent.triggered_at, AlertEvent.id, after))
+    return query.order_by(AlertEvent.triggered_at.desc(), AlertEvent.id.desc()).limit(limit).all()
+
+def event_to_dict(row, field_names=HISTORY_FIELDS) -> dict:
+    """Serializa um evento no formato de alerta (sempre inativo e disparado)"""
+    constants = {"is_active": False, "triggered": True}
+    return {
+        name: constants[name] if name in constants else getattr(row, name)
+        for name in field_names
+    }
+
+def compute_alert_stats(db: Session, user_id: int) -> AlertStats:
+    """
+    Estatísticas do usuário: ativos na tabela quente, totais nos rollups
+    Alertas arquivados saem de `alerts`, mas continuam contados em alert_daily_rollups.
+    """
+    # Coberto por idx_alerts_live_covering
+    active_alerts, total_tickers = db.query(
+        func.count(),
+        # Conta tickers únicos entre os alertas ativos
+        func.count(distinct(Alert.ticker))
+    ).filter(Alert.user_id == user_id, Alert.is_active == True).one()
+    
+    total_alerts, triggered_alerts = db.query(
+        func.coalesce(func.sum(AlertDailyRollup.created_count), 0),
+        func.coalesce(func.sum(AlertDailyRollup.triggered_count), 0)
+    ).filter(AlertDailyRollup.user_id == user_id).one()
+    
+    return AlertStats(
+        total_alerts=total_alerts,
+        active_alerts=active_alerts,
+        triggered_alerts=triggered_alerts,
+        total_tickers=total_tickers
+    )
+
 @router.get("/stats", response_model=AlertStats)
 def get_alert_stats(
-    user_id: int = Query(...),
+    request: Request,
+    current_user: CurrentUser = Depends(get_current_user),
     db: Session = Depends(get_db)
 ):
-    """Retorna estatísticas dos alertas do usuário"""
-    try:
-        total_alerts = db.query(Alert).filter(Alert.user_id == user_id).count()
-        active_alerts = db.query(Alert).filter(
-            Alert.user_id == user_id,
-            Alert.is_active == True
-        ).count()
-        triggered_alerts = db.query(Alert).filter(
-            Alert.user_id == user_id,
-            Alert.triggered == True
-        ).count()
-        
-        # Conta tickers únicos
-        tickers = db.query(Alert.ticker).filter(
-            Alert.user_id == user_id,
-            Alert.is_active == True
-        ).distinct().all()
-        total_tickers = len(tickers)
-        
-        return AlertStats(
-            total_alerts=total_alerts,
-            active_alerts=active_alerts,
-            triggered_alerts=triggered_alerts,
-            total_tickers=total_tickers
-        )
-        
-    except Exception as e:
-        print(f"❌ Erro ao buscar estatísticas: {e}")
-        raise HTTPException(
-            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-            detail="Erro ao buscar estatísticas"
-        )
+    """Retorna estatísticas dos alertas do usuário (aceita If-None-Match)"""
+    def build(response: Response):
+        try:
+            return compute_alert_stats(db, current_user.id)
+            
+        except Exception as e:
+            print(f"❌ Erro ao buscar estatísticas: {e}")
+            raise HTTPException(
+                status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+                detail="Erro ao buscar estatísticas"
+            )
+    
+    return _cached_response(request, current_user.id, build)
 
 @router.delete("/{alert_id}")
-def delete_alert(alert_id: int, user_id: int = Query(...), db: Session = Depends(get_db)):
+def delete_alert(
+    alert_id: int,
+    current_user: CurrentUser = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
     """Desativa (deleta) um alerta"""
+    user_id = current_user.id
     try:
         alert = db.query(Alert).filter(
             Alert.id == alert_id,
@@ -184,9 +610,14 @@ def delete_alert(alert_id: int, user_id: int = Query(...), db: Session = Depends
                 detail="Alerta não encontrado"
             )
         
+        was_active = alert.is_active
         alert.is_active = False
         db.commit()
         
+        if was_active:
+            alerts_deactivated([(alert.ticker, alert.alert_type, alert.target_value)])
+        bump_user_version(user_id)
+        
         return {"message": "Alerta removido com sucesso", "alert_id": alert_id}
         
     except HTTPException:
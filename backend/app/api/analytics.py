@@ -1,71 +1,80 @@
 # backend/app/api/analytics.py
-from fastapi import APIRouter, Depends
+from fastapi import APIRouter, Depends, Query
 from sqlalchemy.orm import Session
-from sqlalchemy import func, and_
+from sqlalchemy import func, case
 from datetime import datetime, timedelta
 from ..core.database import get_db
+from ..core.security import CurrentUser, get_current_user
 from ..models.alert import Alert
+from ..models.rollup import AlertDailyRollup
 
 router = APIRouter()
 
-@router.get("/api/analytics/dashboard")
-def get_dashboard_analytics(user_id: int, db: Session = Depends(get_db)):
+@router.get("/dashboard")
+def get_dashboard_analytics(
+    current_user: CurrentUser = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
     """Retorna analytics completo do dashboard"""
+    user_id = current_user.id
     
-    # Alertas por tipo
+    # Alertas ativos por tipo (só lê idx_alerts_live_covering, sem tocar na tabela)
     alerts_by_type = db.query(
         Alert.alert_type,
-        func.count(Alert.id)
+        func.count()
     ).filter(
         Alert.user_id == user_id,
         Alert.is_active == True
     ).group_by(Alert.alert_type).all()
     
-    # Alertas disparados nos últimos 30 dias
-    thirty_days_ago = datetime.utcnow() - timedelta(days=30)
-    recent_triggers = db.query(func.count(Alert.id)).filter(
-        Alert.user_id == user_id,
-        Alert.triggered == True,
-        Alert.triggered_at >= thirty_days_ago
-    ).scalar()
-    
-    # Taxa de sucesso (alertas que dispararam vs criados)
-    total_created = db.query(func.count(Alert.id)).filter(
-        Alert.user_id == user_id
-    ).scalar()
+    # Totais e disparos dos últimos 30 dias saem dos rollups diários
+    thirty_days_ago = (datetime.utcnow() - timedelta(days=30)).date()
+    recent_triggers = func.sum(case(
+        (AlertDailyRollup.day >= thirty_days_ago, AlertDailyRollup.triggered_count),
+        else_=0
+    ))
     
-    total_triggered = db.query(func.count(Alert.id)).filter(
-        Alert.user_id == user_id,
-        Alert.triggered == True
-    ).scalar()
+    total_created, total_triggered, recent = db.query(
+        func.coalesce(func.sum(AlertDailyRollup.created_count), 0),
+        func.coalesce(func.sum(AlertDailyRollup.triggered_count), 0),
+        func.coalesce(recent_triggers, 0)
+    ).filter(
+        AlertDailyRollup.user_id == user_id
+    ).one()
     
+    # Taxa de sucesso (alertas que dispararam vs criados)
     success_rate = (total_triggered / total_created * 100) if total_created > 0 else 0
     
     return {
         'alerts_by_type': dict(alerts_by_type),
-        'recent_triggers': recent_triggers,
+        'recent_triggers': recent,
         'success_rate': round(success_rate, 2),
         'total_created': total_created,
         'total_triggered': total_triggered
     }
 
-@router.get("/api/analytics/chart")
-def get_alert_chart_data(user_id: int, days: int = 30, db: Session = Depends(get_db)):
+@router.get("/chart")
+def get_alert_chart_data(
+    days: int = Query(30, ge=1, le=365),
+    current_user: CurrentUser = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
     """Dados para gráfico de histórico"""
+    user_id = current_user.id
     
-    start_date = datetime.utcnow() - timedelta(days=days)
+    start_date = (datetime.utcnow() - timedelta(days=days)).date()
     
-    # Alertas disparados por dia
+    # Alertas disparados por dia (no máximo uma linha de rollup por dia e tipo)
     daily_triggers = db.query(
-        func.date(Alert.triggered_at).label('date'),
-        func.count(Alert.id).label('count')
+        AlertDailyRollup.day.label('date'),
+        func.sum(AlertDailyRollup.triggered_count).label('count')
     ).filter(
-        Alert.user_id == user_id,
-        Alert.triggered == True,
-        Alert.triggered_at >= start_date
-    ).group_by(func.date(Alert.triggered_at)).all()
+        AlertDailyRollup.user_id == user_id,
+        AlertDailyRollup.day >= start_date,
+        AlertDailyRollup.triggered_count > 0
+    ).group_by(AlertDailyRollup.day).order_by(AlertDailyRollup.day).all()
     
     return [
         {'date': str(item.date), 'alerts': item.count}
         for item in daily_triggers
-    ]
\ No newline at end of file
+    ]
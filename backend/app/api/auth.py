@@ -1,9 +1,13 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, BackgroundTasks, Depends, HTTPException, status
+from fastapi.security import HTTPAuthorizationCredentials
+from fastapi.concurrency import run_in_threadpool
 from sqlalchemy.orm import Session
 from pydantic import BaseModel, EmailStr, field_validator
 from datetime import timedelta
-from ..core.database import get_db
-from ..core.security import verify_password, get_password_hash, create_access_token
+from ..core.database import SessionLocal, get_db
+from ..core.security import (
+    HashingOverloaded, bearer_scheme, create_access_token, get_current_user, password_hasher, revoke_token
+)
 from ..core.config import settings
 from ..models.user import User
 
@@ -38,32 +42,62 @@ class Token(BaseModel):
     token_type: str
     user_id: int
 
+def _find_user_by_email(db: Session, email: str):
+    return db.query(User).filter(User.email == email).first()
+
+def _save_new_user(db: Session, user: UserCreate, hashed_pw: str) -> User:
+    new_user = User(
+        email=user.email,
+        name=user.name,
+        hashed_password=hashed_pw
+    )
+    
+    db.add(new_user)
+    db.commit()
+    db.refresh(new_user)
+    return new_user
+
+def _update_password_hash(user_id: int, old_hash: str, new_hash: str):
+    """Troca o hash só se ninguém alterou a senha nesse meio tempo"""
+    db = SessionLocal()
+    try:
+        db.query(User).filter(
+            User.id == user_id,
+            User.hashed_password == old_hash
+        ).update({User.hashed_password: new_hash}, synchronize_session=False)
+        db.commit()
+    finally:
+        db.close()
+
+async def _rehash_password(user_id: int, password: str, old_hash: str):
+    """Refaz o hash com o custo atual depois que a resposta do login já saiu"""
+    try:
+        new_hash = await password_hasher.hash(password)
+        await run_in_threadpool(_update_password_hash, user_id, old_hash, new_hash)
+    except HashingOverloaded:
+        # Sem folga no executor: tenta de novo no próximo login
+        pass
+    except Exception as e:
+        print(f"❌ Erro ao refazer hash da senha: {e}")
+
 @router.post("/signup", status_code=status.HTTP_201_CREATED)
-def signup(user: UserCreate, db: Session = Depends(get_db)):
+async def signup(user: UserCreate, db: Session = Depends(get_db)):
     """Cria uma nova conta de usuário"""
     
     # Verifica se email já existe
-    existing = db.query(User).filter(User.email == user.email).first()
+    existing = await run_in_threadpool(_find_user_by_email, db, user.email)
     if existing:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="Email já cadastrado"
         )
     
+    # Hash da senha no executor dedicado (trunca automaticamente se necessário)
+    hashed_pw = await password_hasher.hash(user.password)
+    
     try:
-        # Hash da senha (trunca automaticamente se necessário)
-        hashed_pw = get_password_hash(user.password)
-        
         # Cria o usuário
-        new_user = User(
-            email=user.email,
-            name=user.name,
-            hashed_password=hashed_pw
-        )
-        
-        db.add(new_user)
-        db.commit()
-        db.refresh(new_user)
+        new_user = await run_in_threadpool(_save_new_user, db, user, hashed_pw)
         
         return {
             "message": "Usuário criado com sucesso",
@@ -82,12 +116,16 @@ def signup(user: UserCreate, db: Session = Depends(get_db)):
         )
 
 @router.post("/login", response_model=Token)
-def login(credentials: UserLogin, db: Session = Depends(get_db)):
+async def login(
+    credentials: UserLogin,
+    background_tasks: BackgroundTasks,
+    db: Session = Depends(get_db)
+):
     """Faz login e retorna token JWT"""
     
     try:
         # Busca usuário
-        user = db.query(User).filter(User.email == credentials.email).first()
+        user = await run_in_threadpool(_find_user_by_email, db, credentials.email)
         
         # Verifica se usuário existe
         if not user:
@@ -97,12 +135,16 @@ def login(credentials: UserLogin, db: Session = Depends(get_db)):
             )
         
         # Verifica senha
-        if not verify_password(credentials.password, user.hashed_password):
+        if not await password_hasher.verify(credentials.password, user.hashed_password):
             raise HTTPException(
                 status_code=status.HTTP_401_UNAUTHORIZED,
                 detail="Email ou senha incorretos"
             )
         
+        # Custo do bcrypt mudou: refaz o hash em segundo plano
+        if password_hasher.needs_rehash(user.hashed_password):
+            background_tasks.add_task(_rehash_password, user.id, credentials.password, user.hashed_password)
+        
         # Cria token
         access_token_expires = timedelta(minutes=settings.ACCESS_TOKEN_EXPIRE_MINUTES)
         access_token = create_access_token(
@@ -129,4 +171,14 @@ def login(credentials: UserLogin, db: Session = Depends(get_db)):
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail="Erro ao processar login. Tente novamente."
-        )
\ No newline at end of file
+        )
+
+@router.post("/logout", dependencies=[Depends(get_current_user)])
+def logout(
+    credentials: HTTPAuthorizationCredentials = Depends(bearer_scheme),
+    db: Session = Depends(get_db)
+):
+    """Revoga o token usado na requisição (e as demais sessões do usuário)"""
+    revoke_token(db, credentials.credentials)
+    db.commit()
+    return {"message": "Logout realizado com sucesso"}
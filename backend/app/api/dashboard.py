@@ -0,0 +1,113 @@
+# backend/app/api/dashboard.py
+from fastapi import APIRouter, Depends, HTTPException, Query, status
+from sqlalchemy.orm import Session
+from typing import Optional
+from datetime import datetime, timedelta
+from ..core.database import get_db
+from ..core.security import CurrentUser, get_current_user
+from ..core.serialization import ORJSONResponse
+from ..models.alert import Alert
+from ..services.events import archive_cutoff
+from ..utils.pagination import encode_cursor
+from .alerts import (
+    ALERT_FIELDS, HISTORY_FIELDS, MAX_PAGE_SIZE, alert_to_dict, compute_alert_stats, event_to_dict,
+    history_rows
+)
+
+router = APIRouter()
+
+HISTORY_SIZE = 50
+
+# Acima disso o delta deixa de compensar e devolvemos o snapshot completo
+MAX_DELTA_CHANGES = 500
+
+# Sobreposição aplicada ao `since` para cobrir commits concorrentes ao snapshot;
+# o cliente aplica as mudanças por id, então repetições são inofensivas
+SYNC_OVERLAP = timedelta(seconds=5)
+
+_columns = [getattr(Alert, name) for name in ALERT_FIELDS]
+
+
+def _begin_snapshot(db: Session):
+    """No Postgres, todas as consultas da requisição leem do mesmo snapshot"""
+    if db.get_bind().dialect.name == "postgresql":
+        db.connection(execution_options={"isolation_level": "REPEATABLE READ"})
+
+
+def _parse_since(since: str) -> datetime:
+    try:
+        return datetime.fromisoformat(since)
+    except ValueError:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Token de sincronização inválido"
+        )
+
+
+def _full_snapshot(db: Session, user_id: int) -> dict:
+    active = db.query(*_columns).filter(
+        Alert.user_id == user_id,
+        Alert.is_active == True
+    ).order_by(Alert.created_at.desc(), Alert.id.desc()).limit(MAX_PAGE_SIZE + 1).all()
+    
+    history = history_rows(db, user_id, list(HISTORY_FIELDS), HISTORY_SIZE)
+    
+    # Cursor para continuar a lista de ativos em GET /api/alerts
+    active_next_cursor = None
+    if len(active) > MAX_PAGE_SIZE:
+        active = active[:MAX_PAGE_SIZE]
+        active_next_cursor = encode_cursor(active[-1].created_at, active[-1].id)
+    
+    return {
+        "full": True,
+        "active": [alert_to_dict(row) for row in active],
+        "active_next_cursor": active_next_cursor,
+        "history": [event_to_dict(row) for row in history],
+    }
+
+
+@router.get("")
+def get_dashboard(
+    current_user: CurrentUser = Depends(get_current_user),
+    since: Optional[str] = Query(None, description="sync_token de uma resposta anterior"),
+    db: Session = Depends(get_db)
+):
+    """
+    Bootstrap do dashboard: alertas ativos, histórico e estatísticas numa só chamada
+    Com `since`, devolve apenas os alertas criados, removidos ou disparados desde então.
+    """
+    user_id = current_user.id
+    since_at = _parse_since(since) if since else None
+    
+    try:
+        _begin_snapshot(db)
+        snapshot_at = datetime.utcnow()
+        
+        payload = None
+        # Mudanças mais antigas que o arquivamento já podem ter saído de `alerts`
+        if since_at is not None and since_at.replace(tzinfo=None) > archive_cutoff():
+            changes = db.query(*_columns).filter(
+                Alert.user_id == user_id,
+                Alert.updated_at >= since_at - SYNC_OVERLAP
+            ).order_by(Alert.updated_at, Alert.id).limit(MAX_DELTA_CHANGES + 1).all()
+            
+            if len(changes) <= MAX_DELTA_CHANGES:
+                payload = {
+                    "full": False,
+                    "changes": [alert_to_dict(row) for row in changes],
+                }
+        
+        if payload is None:
+            payload = _full_snapshot(db, user_id)
+        
+        payload["stats"] = compute_alert_stats(db, user_id).model_dump()
+        payload["sync_token"] = snapshot_at.isoformat()
+        # Direto pelo orjson, sem passar pelo jsonable_encoder
+        return ORJSONResponse(payload)
+        
+    except Exception as e:
+        print(f"❌ Erro ao montar dashboard: {e}")
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail="Erro ao carregar dashboard"
+        )
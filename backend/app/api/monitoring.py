@@ -1,24 +1,69 @@
-from fastapi import APIRouter, Depends, HTTPException
-from fastapi.responses import JSONResponse
-from sqlalchemy.orm import Session
+from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi.responses import PlainTextResponse
 from sqlalchemy import func
+from sqlalchemy.orm import Session
 from datetime import datetime, timedelta
 from ..core.database import get_db
-from ..models.alert import Alert
+from ..core.metrics import registry
+from ..core.serialization import ORJSONResponse
+from ..core.security import password_hasher, token_cache
+from ..models.alert import Alert, AlertArchive
+from ..models.event import AlertEvent
+from ..models.rollup import AlertDailyRollup
 from ..models.user import User
+from ..scheduler import TRACE_HISTORY, alert_checker, scheduler
+from ..services.indicators import indicator_store
+from ..services.market_data import market_data_service
+from ..services.outbox import outbox_stats
+from ..services.rules import rule_engine
+from ..services.popularity import ticker_popularity
 
 router = APIRouter()
 
 @router.get("/health")
 def health_check():
     """Health check básico"""
-    return JSONResponse({
+    return ORJSONResponse({
         "status": "healthy",
         "service": "Gatilho API",
         "timestamp": datetime.utcnow().isoformat(),
         "version": "1.0.0"
     })
 
+@router.get("/metrics", response_class=PlainTextResponse)
+def metrics():
+    """Métricas no formato de exposição do Prometheus"""
+    return PlainTextResponse(
+        registry.render(),
+        media_type="text/plain; version=0.0.4; charset=utf-8"
+    )
+
+@router.get("/scheduler")
+def scheduler_status(limit: int = Query(20, ge=0, le=TRACE_HISTORY)):
+    """Trace dos últimos ciclos de verificação e execuções puladas"""
+    jobs = [
+        {
+            "id": job.id,
+            "name": job.name,
+            "next_run_time": job.next_run_time.isoformat() if job.next_run_time else None
+        }
+        for job in scheduler.get_jobs()
+    ] if scheduler.running else []
+    
+    return ORJSONResponse({
+        "scheduler_running": scheduler.running,
+        "jobs": jobs,
+        **alert_checker.snapshot(limit)
+    })
+
+@router.get("/market-data")
+def market_data_status():
+    """Saúde, p95 e circuit breakers dos provedores de cotação (não consulta o banco)"""
+    return ORJSONResponse({
+        "timestamp": datetime.utcnow().isoformat(),
+        "providers": market_data_service.provider_stats()
+    })
+
 @router.get("/status")
 def system_status(db: Session = Depends(get_db)):
     """Status detalhado do sistema"""
@@ -26,10 +71,14 @@ def system_status(db: Session = Depends(get_db)):
         # Conta total de usuários
         total_users = db.query(User).count()
         
-        # Conta alertas
-        total_alerts = db.query(Alert).count()
+        # Conta alertas: ativos na tabela quente, totais nos rollups
         active_alerts = db.query(Alert).filter(Alert.is_active == True).count()
-        triggered_alerts = db.query(Alert).filter(Alert.triggered == True).count()
+        total_alerts, triggered_alerts = db.query(
+            func.coalesce(func.sum(AlertDailyRollup.created_count), 0),
+            func.coalesce(func.sum(AlertDailyRollup.triggered_count), 0)
+        ).one()
+        hot_alerts = db.query(Alert).count()
+        archived_alerts = db.query(AlertArchive).count()
         
         # Alertas criados nas últimas 24h
         yesterday = datetime.utcnow() - timedelta(days=1)
@@ -37,27 +86,20 @@ def system_status(db: Session = Depends(get_db)):
             Alert.created_at >= yesterday
         ).count()
         
-        # Alertas disparados nas últimas 24h
-        recent_triggered = db.query(Alert).filter(
-            Alert.triggered_at >= yesterday
-        ).count() if db.query(Alert).filter(Alert.triggered_at != None).count() > 0 else 0
+        # Alertas disparados nas últimas 24h (no Postgres só lê as partições recentes)
+        recent_triggered = db.query(AlertEvent).filter(
+            AlertEvent.triggered_at >= yesterday
+        ).count()
         
         # Tickers mais monitorados
-        top_tickers_query = db.query(
-            Alert.ticker,
-            func.count(Alert.id).label('count')
-        ).filter(
-            Alert.is_active == True
-        ).group_by(Alert.ticker).order_by(
-            func.count(Alert.id).desc()
-        ).limit(5).all()
+        top_tickers_query = ticker_popularity.top(db, 5)
         
         top_tickers = [
             {"ticker": t[0], "alerts": t[1]} 
             for t in top_tickers_query
         ]
         
-        return JSONResponse({
+        return ORJSONResponse({
             "status": "operational",
             "timestamp": datetime.utcnow().isoformat(),
             "metrics": {
@@ -69,9 +111,17 @@ def system_status(db: Session = Depends(get_db)):
                     "active": active_alerts,
                     "triggered": triggered_alerts,
                     "created_last_24h": recent_alerts,
-                    "triggered_last_24h": recent_triggered
+                    "triggered_last_24h": recent_triggered,
+                    "hot_rows": hot_alerts,
+                    "archived_rows": archived_alerts
                 },
-                "top_tickers": top_tickers
+                "top_tickers": top_tickers,
+                "password_hashing": password_hasher.stats(),
+                "token_cache": token_cache.stats(),
+                "indicators": indicator_store.stats(),
+                "rules": rule_engine.stats(),
+                "notifications": outbox_stats(db),
+                "market_data": market_data_service.provider_stats()
             }
         })
         
@@ -80,7 +130,7 @@ def system_status(db: Session = Depends(get_db)):
         import traceback
         traceback.print_exc()
         
-        return JSONResponse(
+        return ORJSONResponse(
             status_code=500,
             content={
                 "status": "error",
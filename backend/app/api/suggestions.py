@@ -2,44 +2,80 @@
 from fastapi import APIRouter, Depends
 from sqlalchemy.orm import Session
 from ..core.database import get_db
-from ..models.alert import Alert
-from collections import Counter
+from ..core.cache import cache_get
+from ..services.popularity import query_top_tickers, ticker_popularity
+from ..services.value_sketches import value_sketches
+from typing import Optional
+import logging
+
+logger = logging.getLogger(__name__)
 
 router = APIRouter()
 
-@router.get("/api/suggestions/tickers")
+SUGGESTION_PERCENTILES = (10, 25, 50, 75, 90)
+
+@router.get("/tickers")
 def get_popular_tickers(db: Session = Depends(get_db)):
     """Retorna ações mais usadas em alertas"""
     
-    tickers = db.query(Alert.ticker).filter(
-        Alert.is_active == True
-    ).all()
-    
-    counter = Counter([t[0] for t in tickers])
-    most_common = counter.most_common(10)
+    try:
+        most_common = ticker_popularity.top(db, 10)
+    except Exception as e:
+        logger.warning(f"⚠️ Top-K em memória indisponível, usando GROUP BY: {e}")
+        most_common = query_top_tickers(db, 10)
     
     return [
         {'ticker': ticker, 'count': count}
         for ticker, count in most_common
     ]
 
-@router.get("/api/suggestions/values")
+def _reference_value(quote: dict, alert_type: str) -> Optional[float]:
+    """Valor atual da métrica do alerta, a partir da cotação em cache"""
+    field = {"price": "price", "percentage": "change_percent", "volume": "volume"}.get(alert_type)
+    if not quote or field not in quote:
+        return None
+    value = abs(float(quote[field])) if alert_type == "percentage" else float(quote[field])
+    return value or None
+
+def _distance_percent(value: float, reference: Optional[float]) -> Optional[float]:
+    if not reference:
+        return None
+    return round((value / reference - 1) * 100, 2)
+
+@router.get("/values")
 def get_suggested_values(ticker: str, alert_type: str, db: Session = Depends(get_db)):
-    """Sugere valores baseado em alertas similares"""
+    """
+    Sugere valores baseado em alertas similares
+    Usa o sketch de quantis do (ticker, alert_type) e a cotação em cache, sem varrer alertas.
+    """
+    ticker = ticker.upper()
+    sketch = value_sketches.get(db, ticker, alert_type)
     
-    similar_alerts = db.query(Alert.target_value).filter(
-        Alert.ticker == ticker,
-        Alert.alert_type == alert_type,
-        Alert.is_active == True
-    ).all()
-    
-    if not similar_alerts:
+    if not sketch or sketch.count <= 0:
         return {'suggestions': []}
     
-    values = [a[0] for a in similar_alerts]
-    avg_value = sum(values) / len(values)
+    reference = _reference_value(cache_get(f"quote:{ticker}"), alert_type)
+    
+    percentiles = {
+        f"p{p}": round(sketch.quantile(p / 100), 2)
+        for p in SUGGESTION_PERCENTILES
+    }
+    
+    clusters = [
+        {
+            'value': round(value, 2),
+            'count': count,
+            'share': round(count / sketch.count, 4),
+            'distance_percent': _distance_percent(value, reference)
+        }
+        for value, count in sketch.clusters(3)
+    ]
     
     return {
-        'average': round(avg_value, 2),
-        'suggestions': sorted(list(set(values)))[:5]
-    }
\ No newline at end of file
+        'average': round(sketch.average, 2),
+        'count': sketch.count,
+        'current_value': reference,
+        'percentiles': percentiles,
+        'clusters': clusters,
+        'suggestions': sorted(set(percentiles[key] for key in ("p25", "p50", "p75")))
+    }
@@ -1,11 +1,19 @@
 from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi.concurrency import run_in_threadpool
 from sqlalchemy.orm import Session
 from pydantic import BaseModel, EmailStr
 from typing import Optional
+from ..core.cache import bump_user_version
 from ..core.database import get_db
-from ..core.security import verify_password, get_password_hash
+from ..core.security import (
+    CurrentUser, create_access_token, get_current_user, password_hasher, revoke_user_tokens
+)
 from ..models.user import User
-from ..models.alert import Alert
+from ..models.alert import Alert, AlertArchive
+from ..models.event import AlertEvent
+from ..models.outbox import NotificationOutbox
+from ..models.rollup import AlertDailyRollup
+from ..services.alert_indexes import alerts_deactivated
 
 router = APIRouter()
 
@@ -27,8 +35,12 @@ class UserResponse(BaseModel):
         from_attributes = True
 
 @router.get("/me", response_model=UserResponse)
-def get_current_user(user_id: int, db: Session = Depends(get_db)):
+def read_current_user(
+    current_user: CurrentUser = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
     """Retorna informações do usuário atual"""
+    user_id = current_user.id
     user = db.query(User).filter(User.id == user_id).first()
     if not user:
         raise HTTPException(
@@ -45,11 +57,12 @@ def get_current_user(user_id: int, db: Session = Depends(get_db)):
 
 @router.put("/me")
 def update_user(
-    user_id: int,
     user_update: UserUpdate,
+    current_user: CurrentUser = Depends(get_current_user),
     db: Session = Depends(get_db)
 ):
     """Atualiza informações do usuário"""
+    user_id = current_user.id
     user = db.query(User).filter(User.id == user_id).first()
     if not user:
         raise HTTPException(
@@ -103,14 +116,26 @@ def update_user(
             detail="Erro ao atualizar usuário"
         )
 
+def _find_user(db: Session, user_id: int):
+    return db.query(User).filter(User.id == user_id).first()
+
+def _save_password(db: Session, user: User, hashed_password: str):
+    user.hashed_password = hashed_password
+    revoke_user_tokens(db, user.id)
+    db.commit()
+
 @router.post("/change-password")
-def change_password(
-    user_id: int,
+async def change_password(
     password_data: PasswordChange,
+    current_user: CurrentUser = Depends(get_current_user),
     db: Session = Depends(get_db)
 ):
-    """Altera a senha do usuário"""
-    user = db.query(User).filter(User.id == user_id).first()
+    """
+    Altera a senha do usuário
+    Todos os tokens anteriores são revogados; a resposta traz um token novo.
+    """
+    user_id = current_user.id
+    user = await run_in_threadpool(_find_user, db, user_id)
     if not user:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
@@ -118,7 +143,7 @@ def change_password(
         )
     
     # Verifica senha atual
-    if not verify_password(password_data.current_password, user.hashed_password):
+    if not await password_hasher.verify(password_data.current_password, user.hashed_password):
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Senha atual incorreta"
@@ -131,12 +156,19 @@ def change_password(
             detail="Nova senha deve ter pelo menos 6 caracteres"
         )
     
+    new_hash = await password_hasher.hash(password_data.new_password)
+    
     try:
-        # Atualiza senha
-        user.hashed_password = get_password_hash(password_data.new_password)
-        db.commit()
+        # Grava a senha e revoga os tokens anteriores na mesma transação
+        await run_in_threadpool(_save_password, db, user, new_hash)
         
-        return {"message": "Senha alterada com sucesso"}
+        access_token = create_access_token(data={"sub": str(user.id), "email": user.email})
+        
+        return {
+            "message": "Senha alterada com sucesso",
+            "access_token": access_token,
+            "token_type": "bearer"
+        }
     
     except Exception as e:
         db.rollback()
@@ -149,8 +181,12 @@ def change_password(
         )
 
 @router.delete("/me")
-def delete_account(user_id: int, db: Session = Depends(get_db)):
+def delete_account(
+    current_user: CurrentUser = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
     """Deleta a conta do usuário permanentemente"""
+    user_id = current_user.id
     user = db.query(User).filter(User.id == user_id).first()
     if not user:
         raise HTTPException(
@@ -159,13 +195,27 @@ def delete_account(user_id: int, db: Session = Depends(get_db)):
         )
     
     try:
-        # Deleta todos os alertas do usuário
+        # Guarda os alertas ativos para atualizar os índices em memória
+        active_alerts = db.query(Alert.ticker, Alert.alert_type, Alert.target_value).filter(
+            Alert.user_id == user_id,
+            Alert.is_active == True
+        ).all()
+        
+        # Deleta todos os alertas do usuário (quentes, arquivados e o histórico de disparos)
+        db.query(NotificationOutbox).filter(NotificationOutbox.user_id == user_id).delete()
         db.query(Alert).filter(Alert.user_id == user_id).delete()
+        db.query(AlertArchive).filter(AlertArchive.user_id == user_id).delete()
+        db.query(AlertEvent).filter(AlertEvent.user_id == user_id).delete()
+        db.query(AlertDailyRollup).filter(AlertDailyRollup.user_id == user_id).delete()
         
-        # Deleta o usuário
+        # Deleta o usuário (tokens de conta inexistente já são recusados no miss do cache)
+        revoke_user_tokens(db, user_id)
         db.delete(user)
         db.commit()
         
+        alerts_deactivated(active_alerts)
+        bump_user_version(user_id)
+        
         return {
             "message": "Conta excluída com sucesso",
             "deleted": True
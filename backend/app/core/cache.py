@@ -4,9 +4,13 @@ Cache simples em memória - substitui Redis
 Usa dicionário Python com expiração manual
 """
 
-import json
+import secrets
+import threading
 import time
-from typing import Optional, Dict, Tuple
+from collections import OrderedDict
+from typing import Iterable, Optional, Dict, Tuple
+
+from .serialization import cache_dumps, cache_loads
 
 # Cache em memória: {key: (value, expire_timestamp)}
 _cache: Dict[str, Tuple[any, float]] = {}
@@ -18,11 +22,11 @@ def cache_set(key: str, value: any, expire: int = 300):
     
     Args:
         key: Chave do cache
-        value: Valor a ser armazenado (será convertido para JSON)
+        value: Valor a ser armazenado (serializado com cache_dumps: orjson ou msgpack)
         expire: Tempo de expiração em segundos (padrão: 5 minutos)
     """
     expire_at = time.time() + expire
-    _cache[key] = (json.dumps(value), expire_at)
+    _cache[key] = (cache_dumps(value), expire_at)
 
 
 def cache_get(key: str) -> Optional[any]:
@@ -46,8 +50,8 @@ def cache_get(key: str) -> Optional[any]:
         return None
     
     try:
-        return json.loads(value)
-    except json.JSONDecodeError:
+        return cache_loads(value)
+    except ValueError:
         return None
 
 
@@ -60,6 +64,8 @@ def cache_delete(key: str):
 def cache_clear():
     """Limpa todo o cache (útil para testes)"""
     _cache.clear()
+    with _responses_lock:
+        _responses.clear()
 
 
 def cache_cleanup():
@@ -89,5 +95,73 @@ def cache_stats() -> dict:
     return {
         "total_items": len(_cache),
         "active_items": active,
-        "expired_items": expired
-    }
\ No newline at end of file
+        "expired_items": expired,
+        "response_users": len(_responses)
+    }
+
+
+# --- Versões por usuário e cache de respostas ---
+#
+# Cada usuário tem um contador bumpado a cada escrita que muda os seus alertas
+# (criação, remoção, disparo, arquivamento). Respostas dos GETs ficam guardadas
+# com a versão em que foram geradas; bumpar descarta todas as do usuário.
+# Como o resto deste módulo, vale para um processo: o BOOT_ID entra nos ETags
+# para que um ETag de outro processo (ou de antes de um restart) nunca bata.
+
+BOOT_ID = secrets.token_hex(4)
+
+RESPONSE_TTL = 300
+MAX_RESPONSE_USERS = 10000
+MAX_RESPONSES_PER_USER = 32
+
+_versions: Dict[int, int] = {}
+# {user_id: {chave: (versão, corpo, headers, expire_timestamp)}}, LRU por usuário
+_responses: "OrderedDict[int, Dict[str, Tuple[int, bytes, Dict[str, str], float]]]" = OrderedDict()
+_responses_lock = threading.Lock()
+
+
+def user_version(user_id: int) -> int:
+    return _versions.get(user_id, 0)
+
+
+def bump_user_versions(user_ids: Iterable[int]):
+    """Invalida na hora as respostas em cache dos usuários (chamar depois do commit)"""
+    with _responses_lock:
+        for user_id in set(user_ids):
+            _versions[user_id] = _versions.get(user_id, 0) + 1
+            _responses.pop(user_id, None)
+
+
+def bump_user_version(user_id: int):
+    bump_user_versions((user_id,))
+
+
+def response_cache_get(user_id: int, key: str, version: int) -> Optional[Tuple[bytes, Dict[str, str]]]:
+    """(corpo, headers) gerados na versão pedida, ou None"""
+    with _responses_lock:
+        entries = _responses.get(user_id)
+        entry = entries.get(key) if entries else None
+        if entry is None:
+            return None
+        cached_version, body, headers, expire_at = entry
+        if cached_version != version or time.time() > expire_at:
+            del entries[key]
+            return None
+        _responses.move_to_end(user_id)
+        return body, headers
+
+
+def response_cache_set(user_id: int, key: str, version: int, body: bytes, headers: Dict[str, str]):
+    with _responses_lock:
+        # Uma escrita entre a leitura da versão e aqui já invalidou esta resposta
+        if _versions.get(user_id, 0) != version:
+            return
+        entries = _responses.get(user_id)
+        if entries is None:
+            entries = _responses[user_id] = {}
+            if len(_responses) > MAX_RESPONSE_USERS:
+                _responses.popitem(last=False)
+        elif len(entries) >= MAX_RESPONSES_PER_USER and key not in entries:
+            entries.pop(next(iter(entries)))
+        _responses.move_to_end(user_id)
+        entries[key] = (version, body, headers, time.time() + RESPONSE_TTL)
@@ -1,3 +1,4 @@
+from typing import Dict, List
 from pydantic_settings import BaseSettings
 
 class Settings(BaseSettings):
@@ -7,9 +8,42 @@ class Settings(BaseSettings):
     ALGORITHM: str = "HS256"
     ACCESS_TOKEN_EXPIRE_MINUTES: int = 10080
     TWELVE_DATA_API_KEY: str = "demo"
+    TWELVE_DATA_BASE_URL: str = "https://api.twelvedata.com"
+    BRAPI_API_KEY: str = ""
+    BRAPI_BASE_URL: str = "https://brapi.dev/api"
+    # Provedores de cotação, em ordem de preferência enquanto não há histórico de saúde
+    MARKET_DATA_PROVIDERS: List[str] = ["twelvedata", "brapi"]
+    # Cotação aleatória quando nenhum provedor responde (só para desenvolvimento)
+    MARKET_DATA_MOCK_FALLBACK: bool = False
+    # Circuit breaker por provedor e endpoint: falhas seguidas para abrir,
+    # tempo aberto antes das chamadas de prova e quantas provas precisam passar
+    CIRCUIT_FAILURE_THRESHOLD: int = 5
+    CIRCUIT_RECOVERY_SECONDS: float = 30.0
+    CIRCUIT_HALF_OPEN_PROBES: int = 1
     SENDGRID_API_KEY: str = ""
+    # Trocado pelo stub local nos benchmarks
+    SENDGRID_API_HOST: str = "https://api.sendgrid.com"
     EMAIL_FROM: str = "noreply@gatilho.app"
 
+    # Hash de senhas (bcrypt) em executor próprio
+    BCRYPT_ROUNDS: int = 12
+    PASSWORD_HASH_WORKERS: int = 2
+    PASSWORD_HASH_MAX_PENDING: int = 32
+    PASSWORD_HASH_USE_PROCESSES: bool = False
+
+    # Formato do cache em memória: "json" (orjson) ou "msgpack" (precisa do pacote)
+    CACHE_CODEC: str = "json"
+
+    # Logging
+    LOG_LEVEL: str = "INFO"
+    LOG_JSON: bool = False
+    ACCESS_LOG_SAMPLE_RATE: float = 1.0
+    # Taxa por rota (template), ex.: {"/api/alerts": 0.1}
+    ACCESS_LOG_ROUTE_SAMPLE_RATES: Dict[str, float] = {
+        "/health": 0.0,
+        "/api/monitoring/health": 0.0,
+    }
+
     class Config:
         env_file = ".env"
         extra = "ignore"
@@ -0,0 +1,95 @@
+"""
+Logging assíncrono: os handlers da aplicação só enfileiram o registro;
+formatação (texto ou JSON) e escrita acontecem numa thread de background.
+"""
+
+import logging
+import random
+import sys
+from logging.handlers import QueueHandler, QueueListener
+from queue import SimpleQueue
+from typing import Dict, Optional
+
+from .config import settings
+
+TEXT_FORMAT = '%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+
+_listener: Optional[QueueListener] = None
+
+
+class _LocalQueueHandler(QueueHandler):
+    """
+    Enfileira o registro sem formatá-lo
+    (a fila é local ao processo, então não precisa serializar nada no hot path)
+    """
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        return record
+
+
+def _build_formatter() -> logging.Formatter:
+    if settings.LOG_JSON:
+        from pythonjsonlogger import jsonlogger
+        return jsonlogger.JsonFormatter(
+            '%(asctime)s %(name)s %(levelname)s %(message)s',
+            rename_fields={"asctime": "time", "levelname": "level", "name": "logger"},
+            json_ensure_ascii=False
+        )
+    return logging.Formatter(TEXT_FORMAT)
+
+
+def setup_logging():
+    """Configura o root logger com QueueHandler + listener em background (idempotente)"""
+    global _listener
+    if _listener is not None:
+        return
+
+    stream = logging.StreamHandler(sys.stdout)
+    stream.setFormatter(_build_formatter())
+
+    queue = SimpleQueue()
+    _listener = QueueListener(queue, stream, respect_handler_level=True)
+    _listener.start()
+
+    root = logging.getLogger()
+    root.handlers = [_LocalQueueHandler(queue)]
+    root.setLevel(settings.LOG_LEVEL.upper())
+
+    # Os logs do uvicorn passam pela mesma fila; o access log é o nosso middleware
+    for name in ("uvicorn", "uvicorn.error", "uvicorn.access"):
+        uvicorn_logger = logging.getLogger(name)
+        uvicorn_logger.handlers = []
+        uvicorn_logger.propagate = True
+    logging.getLogger("uvicorn.access").setLevel(logging.WARNING)
+    # "Running job"/"executed successfully" a cada execução de cada job
+    logging.getLogger("apscheduler.executors").setLevel(logging.WARNING)
+    logging.getLogger("httpx").setLevel(logging.WARNING)
+
+
+def shutdown_logging():
+    """Esvazia a fila e para o listener"""
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
+
+
+class AccessLogSampler:
+    """Amostragem do access log por rota (template), com taxa padrão para as demais"""
+
+    def __init__(self, default_rate: float, route_rates: Dict[str, float]):
+        self.default_rate = default_rate
+        self.route_rates = route_rates
+
+    def should_log(self, route_path: str, status_code: int) -> bool:
+        # Erros sempre entram no log
+        if status_code >= 500:
+            return True
+        rate = self.route_rates.get(route_path, self.default_rate)
+        return rate >= 1.0 or (rate > 0.0 and random.random() < rate)
+
+
+access_sampler = AccessLogSampler(
+    default_rate=settings.ACCESS_LOG_SAMPLE_RATE,
+    route_rates=settings.ACCESS_LOG_ROUTE_SAMPLE_RATES
+)
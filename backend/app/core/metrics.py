@@ -0,0 +1,280 @@
+"""
+Registro de métricas em processo, exposto no formato texto do Prometheus
+Registrar uma métrica no hot path é só um incremento de atributo: os filhos
+rotulados são criados uma vez (sob lock) e podem ser guardados pelo chamador.
+"""
+
+import threading
+from bisect import bisect_left
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+
+# Buckets padrão (segundos), adequados para latência HTTP e de upstream
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+class CounterChild:
+    __slots__ = ("value",)
+
+    def __init__(self):
+        self.value = 0.0
+
+    def inc(self, amount: float = 1.0):
+        self.value += amount
+
+
+class GaugeChild:
+    __slots__ = ("value",)
+
+    def __init__(self):
+        self.value = 0.0
+
+    def set(self, value: float):
+        self.value = value
+
+    def inc(self, amount: float = 1.0):
+        self.value += amount
+
+    def dec(self, amount: float = 1.0):
+        self.value -= amount
+
+
+class HistogramChild:
+    __slots__ = ("buckets", "counts", "sum", "count")
+
+    def __init__(self, buckets: Tuple[float, ...]):
+        self.buckets = buckets
+        # Um contador por bucket + o +Inf; acumulado só na renderização
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float):
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+
+class MetricFamily:
+    """Métrica com nome, tipo e rótulos; cada combinação de rótulos é um filho"""
+
+    def __init__(self, name: str, help_text: str, kind: str, labelnames: Sequence[str],
+                 buckets: Tuple[float, ...] = DEFAULT_BUCKETS):
+        self.name = name
+        self.help = help_text
+        self.kind = kind
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(buckets)
+        self._children: Dict[Tuple[str, ...], object] = {}
+        self._lock = threading.Lock()
+        self._callback: Optional[Callable[[], float]] = None
+        if not self.labelnames:
+            # Sem rótulos a série existe desde o início (exporta 0 em vez de sumir)
+            self._children[()] = self._new_child()
+
+    def _new_child(self):
+        if self.kind == "counter":
+            return CounterChild()
+        if self.kind == "gauge":
+            return GaugeChild()
+        return HistogramChild(self.buckets)
+
+    def labels(self, *values: str):
+        """Retorna (criando se preciso) o filho para esses valores de rótulo"""
+        child = self._children.get(values)
+        if child is None:
+            if len(values) != len(self.labelnames):
+                raise ValueError(f"{self.name} espera rótulos {self.labelnames}")
+            with self._lock:
+                child = self._children.get(values)
+                if child is None:
+                    child = self._children[values] = self._new_child()
+        return child
+
+    # Atalhos para métricas sem rótulos
+    def inc(self, amount: float = 1.0):
+        self.labels().inc(amount)
+
+    def dec(self, amount: float = 1.0):
+        self.labels().dec(amount)
+
+    def set(self, value: float):
+        self.labels().set(value)
+
+    def observe(self, value: float):
+        self.labels().observe(value)
+
+    def set_function(self, callback: Callable[[], float]):
+        """Gauge calculado na hora da coleta"""
+        self._callback = callback
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.kind}"]
+
+        if self._callback is not None:
+            try:
+                lines.append(f"{self.name} {_format_value(self._callback())}")
+            except Exception:
+                pass
+            return lines
+
+        for values, child in list(self._children.items()):
+            labels = _format_labels(self.labelnames, values)
+            if self.kind == "histogram":
+                cumulative = 0
+                for bound, count in zip(self.buckets, child.counts):
+                    cumulative += count
+                    lines.append(f"{self.name}_bucket{_format_labels(self.labelnames + ('le',), values + (_format_value(bound),))} {cumulative}")
+                lines.append(f"{self.name}_bucket{_format_labels(self.labelnames + ('le',), values + ('+Inf',))} {child.count}")
+                lines.append(f"{self.name}_sum{labels} {_format_value(child.sum)}")
+                lines.append(f"{self.name}_count{labels} {child.count}")
+            else:
+                lines.append(f"{self.name}{labels} {_format_value(child.value)}")
+        return lines
+
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(names: Tuple[str, ...], values: Tuple[str, ...]) -> str:
+    if not names:
+        return ""
+    return "{" + ",".join(f'{name}="{_escape(value)}"' for name, value in zip(names, values)) + "}"
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+class MetricsRegistry:
+    def __init__(self):
+        self._families: Dict[str, MetricFamily] = {}
+        self._lock = threading.Lock()
+
+    def _register(self, name: str, help_text: str, kind: str, labelnames: Sequence[str], **kwargs) -> MetricFamily:
+        with self._lock:
+            family = self._families.get(name)
+            if family is None:
+                family = self._families[name] = MetricFamily(name, help_text, kind, labelnames, **kwargs)
+            return family
+
+    def counter(self, name: str, help_text: str, labelnames: Sequence[str] = ()) -> MetricFamily:
+        return self._register(name, help_text, "counter", labelnames)
+
+    def gauge(self, name: str, help_text: str, labelnames: Sequence[str] = ()) -> MetricFamily:
+        return self._register(name, help_text, "gauge", labelnames)
+
+    def histogram(self, name: str, help_text: str, labelnames: Sequence[str] = (),
+                  buckets: Tuple[float, ...] = DEFAULT_BUCKETS) -> MetricFamily:
+        return self._register(name, help_text, "histogram", labelnames, buckets=buckets)
+
+    def render(self) -> str:
+        lines: List[str] = []
+        for family in list(self._families.values()):
+            lines.extend(family.render())
+        return "\n".join(lines) + "\n"
+
+
+# Registro global
+registry = MetricsRegistry()
+
+# Métricas compartilhadas entre módulos
+HTTP_REQUEST_DURATION = registry.histogram(
+    "gatilho_http_request_duration_seconds",
+    "Latência das requisições HTTP por rota",
+    ("method", "route")
+)
+HTTP_REQUESTS = registry.counter(
+    "gatilho_http_requests_total",
+    "Requisições HTTP por rota e status",
+    ("method", "route", "status")
+)
+SCHEDULER_CYCLE_DURATION = registry.histogram(
+    "gatilho_scheduler_cycle_duration_seconds",
+    "Duração total de cada ciclo de verificação de alertas",
+    buckets=(0.1, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0, 300.0)
+)
+SCHEDULER_PHASE_DURATION = registry.histogram(
+    "gatilho_scheduler_phase_duration_seconds",
+    "Duração de cada fase do ciclo (fetch, evaluate, notify)",
+    ("phase",),
+    buckets=(0.01, 0.05, 0.1, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0)
+)
+SCHEDULER_TRIGGERS = registry.counter(
+    "gatilho_scheduler_triggers_total",
+    "Alertas disparados pelo scheduler"
+)
+SCHEDULER_ALERTS_CHECKED = registry.gauge(
+    "gatilho_scheduler_alerts_checked",
+    "Alertas avaliados no último ciclo"
+)
+QUOTE_CACHE = registry.counter(
+    "gatilho_quote_cache_requests_total",
+    "Consultas ao cache de cotações",
+    ("result",)
+)
+UPSTREAM_DURATION = registry.histogram(
+    "gatilho_upstream_request_duration_seconds",
+    "Latência das chamadas às APIs de cotações por provedor e endpoint",
+    ("provider", "endpoint")
+)
+UPSTREAM_ERRORS = registry.counter(
+    "gatilho_upstream_errors_total",
+    "Erros nas chamadas às APIs de cotações por provedor e endpoint",
+    ("provider", "endpoint", "reason")
+)
+MARKET_DATA_HEDGES = registry.counter(
+    "gatilho_market_data_hedges_total",
+    "Pedidos de hedge a outro provedor (launched) e quantos responderam primeiro (won)",
+    ("provider", "result")
+)
+MARKET_DATA_PROVIDER_HEALTH = registry.gauge(
+    "gatilho_market_data_provider_health",
+    "Saúde de cada provedor de cotações (média móvel de sucesso, 0 a 1)",
+    ("provider",)
+)
+CIRCUIT_STATE = registry.gauge(
+    "gatilho_circuit_breaker_state",
+    "Estado do circuit breaker por provedor e endpoint (0 closed, 1 half_open, 2 open)",
+    ("provider", "endpoint")
+)
+CIRCUIT_TRANSITIONS = registry.counter(
+    "gatilho_circuit_breaker_transitions_total",
+    "Mudanças de estado do circuit breaker, pelo estado de destino",
+    ("provider", "endpoint", "state")
+)
+WEBSOCKET_CONNECTIONS = registry.gauge(
+    "gatilho_websocket_connections",
+    "Conexões WebSocket abertas"
+)
+NOTIFICATION_QUEUE_DEPTH = registry.gauge(
+    "gatilho_notification_queue_depth",
+    "Notificações aguardando envio"
+)
+NOTIFICATIONS = registry.counter(
+    "gatilho_notifications_total",
+    "Notificações processadas pelo drain do outbox (sent, retry, failed)",
+    ("result",)
+)
+
+RESPONSE_CACHE = registry.counter(
+    "gatilho_response_cache_requests_total",
+    "GETs por usuário servidos com 304, do cache de respostas ou do banco",
+    ("result",)
+)
+
+
+def _quote_cache_hit_ratio() -> float:
+    hits = QUOTE_CACHE.labels("hit").value
+    total = hits + QUOTE_CACHE.labels("miss").value
+    return hits / total if total else 0.0
+
+
+registry.gauge(
+    "gatilho_quote_cache_hit_ratio",
+    "Proporção de cotações servidas pelo cache"
+).set_function(_quote_cache_hit_ratio)
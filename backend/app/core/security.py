@@ -1,10 +1,40 @@
+import asyncio
+import hashlib
+import math
+import multiprocessing
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from dataclasses import dataclass
 from datetime import datetime, timedelta
-from typing import Optional
+from functools import lru_cache
+from typing import Dict, Optional, Tuple
+from fastapi import Depends, HTTPException, status
+from fastapi.concurrency import run_in_threadpool
+from fastapi.security import HTTPAuthorizationCredentials, HTTPBearer
 from jose import JWTError, jwt
 from passlib.context import CryptContext
+from sqlalchemy.orm import Session
 from .config import settings
+from .database import SessionLocal
+from .metrics import registry
 
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+@lru_cache(maxsize=4)
+def _crypt_context(rounds: int) -> CryptContext:
+    """
+    Contexto bcrypt com custo fixo: hashes com outro custo são marcados
+    como desatualizados e refeitos no próximo login
+    """
+    return CryptContext(
+        schemes=["bcrypt"],
+        deprecated="auto",
+        bcrypt__default_rounds=rounds,
+        bcrypt__min_rounds=rounds,
+        bcrypt__max_rounds=rounds
+    )
+
+pwd_context = _crypt_context(settings.BCRYPT_ROUNDS)
 
 def truncate_password(password: str, max_bytes: int = 72) -> str:
     """Trunca a senha para o limite de bytes do bcrypt"""
@@ -49,13 +79,171 @@ def get_password_hash(password: str) -> str:
         print(f"❌ Erro ao criar hash da senha: {e}")
         raise
 
+def _hash_job(password: str, rounds: int) -> Tuple[str, float]:
+    """Executado no worker (thread ou processo): retorna hash e duração"""
+    started = time.perf_counter()
+    hashed = _crypt_context(rounds).hash(truncate_password(password, max_bytes=72))
+    return hashed, time.perf_counter() - started
+
+def _verify_job(password: str, hashed_password: str, rounds: int) -> Tuple[bool, float]:
+    started = time.perf_counter()
+    try:
+        ok = _crypt_context(rounds).verify(truncate_password(password, max_bytes=72), hashed_password)
+    except Exception as e:
+        print(f"❌ Erro ao verificar senha: {e}")
+        ok = False
+    return ok, time.perf_counter() - started
+
+PASSWORD_HASH_DURATION = registry.histogram(
+    "gatilho_password_hash_duration_seconds",
+    "Tempo de cada operação bcrypt (hash ou verify)",
+    ("operation",),
+    buckets=(0.01, 0.05, 0.1, 0.25, 0.5, 1.0, 2.0, 5.0)
+)
+PASSWORD_HASH_REJECTED = registry.counter(
+    "gatilho_password_hash_rejected_total",
+    "Operações de hash rejeitadas por fila cheia"
+)
+
+class HashingOverloaded(HTTPException):
+    """Fila de hash cheia: rejeita na hora em vez de segurar a requisição"""
+    
+    def __init__(self):
+        super().__init__(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Servidor ocupado. Tente novamente em instantes.",
+            headers={"Retry-After": "1"}
+        )
+
+class PasswordHasher:
+    """
+    Executor dedicado para bcrypt, isolado do threadpool compartilhado do FastAPI
+    Limita a quantidade de hashes em andamento + na fila e rejeita o excedente (503).
+    """
+    
+    def __init__(self, workers: int, max_pending: int, use_processes: bool, rounds: int):
+        self.workers = workers
+        self.max_pending = max_pending
+        self.use_processes = use_processes
+        self.rounds = rounds
+        self._executor: Optional[Executor] = None
+        self._lock = threading.Lock()
+        self._pending = 0
+        
+        # Métricas
+        self.hash_count = 0
+        self.verify_count = 0
+        self.rejected_count = 0
+        self.total_seconds = 0.0
+        self.max_seconds = 0.0
+    
+    def _get_executor(self) -> Executor:
+        if self._executor is None:
+            with self._lock:
+                if self._executor is None:
+                    if self.use_processes:
+                        self._executor = ProcessPoolExecutor(
+                            max_workers=self.workers,
+                            mp_context=multiprocessing.get_context("spawn")
+                        )
+                    else:
+                        # bcrypt libera o GIL, então threads já usam vários núcleos
+                        self._executor = ThreadPoolExecutor(
+                            max_workers=self.workers,
+                            thread_name_prefix="password-hash"
+                        )
+        return self._executor
+    
+    def _admit(self):
+        with self._lock:
+            if self._pending >= self.max_pending:
+                self.rejected_count += 1
+                PASSWORD_HASH_REJECTED.inc()
+                raise HashingOverloaded()
+            self._pending += 1
+    
+    def _release(self, seconds: float, is_hash: bool):
+        with self._lock:
+            self._pending -= 1
+            if is_hash:
+                self.hash_count += 1
+            else:
+                self.verify_count += 1
+            self.total_seconds += seconds
+            self.max_seconds = max(self.max_seconds, seconds)
+        if seconds:
+            (_HASH_TIMER if is_hash else _VERIFY_TIMER).observe(seconds)
+    
+    async def _run(self, is_hash: bool, fn, *args):
+        self._admit()
+        seconds = 0.0
+        try:
+            loop = asyncio.get_running_loop()
+            result, seconds = await loop.run_in_executor(self._get_executor(), fn, *args)
+            return result
+        finally:
+            self._release(seconds, is_hash)
+    
+    async def hash(self, password: str) -> str:
+        return await self._run(True, _hash_job, password, self.rounds)
+    
+    async def verify(self, password: str, hashed_password: str) -> bool:
+        return await self._run(False, _verify_job, password, hashed_password, self.rounds)
+    
+    def needs_rehash(self, hashed_password: str) -> bool:
+        """True se o hash foi gerado com outro custo (BCRYPT_ROUNDS mudou)"""
+        try:
+            return _crypt_context(self.rounds).needs_update(hashed_password)
+        except Exception:
+            return False
+    
+    def stats(self) -> dict:
+        operations = self.hash_count + self.verify_count
+        return {
+            "rounds": self.rounds,
+            "workers": self.workers,
+            "executor": "process" if self.use_processes else "thread",
+            "pending": self._pending,
+            "max_pending": self.max_pending,
+            "hashes": self.hash_count,
+            "verifications": self.verify_count,
+            "rejected": self.rejected_count,
+            "avg_ms": round(self.total_seconds / operations * 1000, 2) if operations else None,
+            "max_ms": round(self.max_seconds * 1000, 2)
+        }
+    
+    def shutdown(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=False)
+            self._executor = None
+
+_HASH_TIMER = PASSWORD_HASH_DURATION.labels("hash")
+_VERIFY_TIMER = PASSWORD_HASH_DURATION.labels("verify")
+
+password_hasher = PasswordHasher(
+    workers=settings.PASSWORD_HASH_WORKERS,
+    max_pending=settings.PASSWORD_HASH_MAX_PENDING,
+    use_processes=settings.PASSWORD_HASH_USE_PROCESSES,
+    rounds=settings.BCRYPT_ROUNDS
+)
+
+registry.gauge(
+    "gatilho_password_hash_pending",
+    "Operações bcrypt em andamento ou na fila"
+).set_function(lambda: password_hasher._pending)
+registry.gauge(
+    "gatilho_password_hash_rounds",
+    "Custo (rounds) configurado do bcrypt"
+).set_function(lambda: password_hasher.rounds)
+
 def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
     to_encode = data.copy()
     if expires_delta:
         expire = datetime.utcnow() + expires_delta
     else:
         expire = datetime.utcnow() + timedelta(minutes=settings.ACCESS_TOKEN_EXPIRE_MINUTES)
-    to_encode.update({"exp": expire})
+    # iat com fração de segundo: revogações valem mesmo para tokens do mesmo segundo
+    to_encode.update({"exp": expire, "iat": time.time()})
     encoded_jwt = jwt.encode(to_encode, settings.SECRET_KEY, algorithm=settings.ALGORITHM)
     return encoded_jwt
 
@@ -64,4 +252,167 @@ def verify_token(token: str):
         payload = jwt.decode(token, settings.SECRET_KEY, algorithms=[settings.ALGORITHM])
         return payload
     except JWTError:
-        return None
\ No newline at end of file
+        return None
+
+@dataclass(frozen=True)
+class CurrentUser:
+    """Usuário autenticado, extraído das claims do token"""
+    id: int
+    email: Optional[str] = None
+
+class TokenCache:
+    """
+    Cache LRU de claims já verificadas, indexado pelo SHA-256 do token
+    Tokens repetidos viram uma consulta ao dicionário em vez de decode + assinatura.
+    A revogação vale de fato pela coluna users.tokens_valid_after, conferida a
+    cada miss; as entradas duram no máximo `revalidate_seconds`, então uma
+    revogação feita em outro processo chega aqui nesse prazo.
+    """
+    
+    def __init__(self, max_size: int = 10000, revalidate_seconds: float = 60.0, token_lifetime: float = 0.0):
+        self.max_size = max_size
+        self.revalidate_seconds = revalidate_seconds
+        self.token_lifetime = token_lifetime or settings.ACCESS_TOKEN_EXPIRE_MINUTES * 60
+        self._entries: "OrderedDict[bytes, Tuple[CurrentUser, float, float]]" = OrderedDict()
+        # Revogações feitas neste processo: user_id -> instante. Tokens emitidos
+        # antes disso expiram até instante + token_lifetime; depois a entrada sai
+        self._not_before: Dict[int, float] = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+    
+    @staticmethod
+    def key(token: str) -> bytes:
+        return hashlib.sha256(token.encode()).digest()
+    
+    def get(self, key: bytes, now: float) -> Optional[CurrentUser]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            user, expires_at, iat = entry
+            if expires_at <= now or iat < self._not_before.get(user.id, 0):
+                del self._entries[key]
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return user
+    
+    def put(self, key: bytes, user: CurrentUser, exp: float, iat: float, now: float):
+        with self._lock:
+            self._entries[key] = (user, min(exp, now + self.revalidate_seconds), iat)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+    
+    def is_revoked(self, user_id: int, iat: float) -> bool:
+        return iat < self._not_before.get(user_id, 0)
+    
+    def revoke_user(self, user_id: int, since: Optional[float] = None):
+        since = time.time() if since is None else since
+        with self._lock:
+            self._not_before[user_id] = max(since, self._not_before.get(user_id, 0))
+            # Descarta revogações cujos tokens já expiraram de qualquer forma
+            horizon = time.time() - self.token_lifetime
+            self._not_before = {uid: t for uid, t in self._not_before.items() if t > horizon}
+            stale = [k for k, (user, _, _) in self._entries.items() if user.id == user_id]
+            for k in stale:
+                del self._entries[k]
+    
+    def stats(self) -> dict:
+        return {
+            "size": len(self._entries),
+            "max_size": self.max_size,
+            "revoked": len(self._not_before),
+            "hits": self.hits,
+            "misses": self.misses
+        }
+
+token_cache = TokenCache()
+
+def _tokens_valid_after(user_id: int) -> float:
+    """users.tokens_valid_after do usuário (0 se nunca revogou, inf se a conta não existe)"""
+    from ..models.user import User
+    
+    db = SessionLocal()
+    try:
+        row = db.query(User.tokens_valid_after).filter(User.id == user_id).first()
+    finally:
+        db.close()
+    if row is None:
+        return math.inf
+    return row[0] or 0.0
+
+def _authenticate_uncached(token: str, key: bytes, now: float) -> Optional[CurrentUser]:
+    payload = verify_token(token)
+    if not payload or "sub" not in payload:
+        return None
+    
+    try:
+        user = CurrentUser(id=int(payload["sub"]), email=payload.get("email"))
+        exp = float(payload.get("exp", 0))
+        iat = float(payload.get("iat", 0))
+    except (TypeError, ValueError):
+        return None
+    
+    if exp <= now or token_cache.is_revoked(user.id, iat) or iat < _tokens_valid_after(user.id):
+        return None
+    
+    token_cache.put(key, user, exp, iat, now)
+    return user
+
+async def authenticate_token(token: str) -> Optional[CurrentUser]:
+    """
+    Valida o token (cache primeiro) e retorna o usuário, ou None se inválido
+    O miss (decode + consulta ao banco) roda no threadpool.
+    """
+    now = time.time()
+    key = TokenCache.key(token)
+    user = token_cache.get(key, now)
+    if user is not None:
+        return user
+    return await run_in_threadpool(_authenticate_uncached, token, key, now)
+
+def revoke_user_tokens(db: Session, user_id: int):
+    """
+    Invalida todos os tokens já emitidos para o usuário, em todos os processos
+    Grava users.tokens_valid_after; o commit é do chamador.
+    """
+    from ..models.user import User
+    
+    now = time.time()
+    db.query(User).filter(User.id == user_id).update(
+        {User.tokens_valid_after: now}, synchronize_session=False
+    )
+    token_cache.revoke_user(user_id, now)
+
+def revoke_token(db: Session, token: str):
+    """
+    Logout: invalida o token e os demais já emitidos para o mesmo usuário
+    (só a revogação por usuário fica no banco). O commit é do chamador.
+    """
+    payload = verify_token(token)
+    if not payload:
+        return
+    try:
+        user_id = int(payload["sub"])
+    except (KeyError, TypeError, ValueError):
+        return
+    revoke_user_tokens(db, user_id)
+
+bearer_scheme = HTTPBearer(auto_error=False)
+
+async def get_current_user(
+    credentials: Optional[HTTPAuthorizationCredentials] = Depends(bearer_scheme)
+) -> CurrentUser:
+    """Dependência de autenticação: exige Authorization: Bearer <token>"""
+    user = await authenticate_token(credentials.credentials) if credentials else None
+    if user is None:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Não autenticado",
+            headers={"WWW-Authenticate": "Bearer"}
+        )
+    return user
@@ -0,0 +1,94 @@
+# backend/app/core/serialization.py
+"""
+Serialização compartilhada: orjson para HTTP, cache e WebSocket
+
+- dumps/loads: JSON em bytes (datetime, date e UUID direto, sem isoformat manual)
+- ORJSONResponse: resposta padrão dos routers (ver main.py); devolver uma
+  instância direto do endpoint pula também o jsonable_encoder do FastAPI
+- cache_dumps/cache_loads: formato do cache em memória (CACHE_CODEC)
+- msgpack é opcional: usado no cache com CACHE_CODEC=msgpack e no WebSocket
+  quando o cliente conecta com ?format=msgpack; sem o pacote, tudo é JSON
+"""
+
+import logging
+from datetime import date, datetime, time
+from decimal import Decimal
+from typing import Any
+
+import orjson
+from fastapi.responses import JSONResponse
+from pydantic import BaseModel
+
+from .config import settings
+
+try:
+    import msgpack
+except ImportError:  # pragma: no cover - dependência opcional
+    msgpack = None
+
+logger = logging.getLogger(__name__)
+
+HAS_MSGPACK = msgpack is not None
+
+# Chaves int (ex.: contagens por user_id) viram string, como no json da stdlib
+_OPTIONS = orjson.OPT_NON_STR_KEYS
+
+
+def _default(value: Any):
+    """Tipos que o orjson não conhece"""
+    if isinstance(value, BaseModel):
+        return value.model_dump()
+    if isinstance(value, Decimal):
+        return float(value)
+    if isinstance(value, (set, frozenset, tuple)):
+        return list(value)
+    raise TypeError(f"Tipo não serializável: {type(value).__name__}")
+
+
+def dumps(value: Any) -> bytes:
+    return orjson.dumps(value, default=_default, option=_OPTIONS)
+
+
+def loads(data) -> Any:
+    return orjson.loads(data)
+
+
+def _msgpack_default(value: Any):
+    # Mesma representação do JSON: datetimes voltam como string ISO 8601
+    if isinstance(value, (datetime, date, time)):
+        return value.isoformat()
+    return _default(value)
+
+
+def packb(value: Any) -> bytes:
+    return msgpack.packb(value, default=_msgpack_default, use_bin_type=True)
+
+
+def unpackb(data: bytes) -> Any:
+    return msgpack.unpackb(data, raw=False, strict_map_key=False)
+
+
+class ORJSONResponse(JSONResponse):
+    """JSONResponse renderizada pelo orjson (NaN/inf viram null em vez de erro)"""
+
+    def render(self, content: Any) -> bytes:
+        return dumps(content)
+
+
+def _cache_codec() -> str:
+    codec = settings.CACHE_CODEC.lower()
+    if codec == "msgpack" and not HAS_MSGPACK:
+        logger.warning("⚠️ CACHE_CODEC=msgpack sem o pacote msgpack instalado; usando JSON")
+        return "json"
+    return codec
+
+
+CACHE_CODEC = _cache_codec()
+
+
+def cache_dumps(value: Any) -> bytes:
+    return packb(value) if CACHE_CODEC == "msgpack" else dumps(value)
+
+
+def cache_loads(data: bytes) -> Any:
+    return unpackb(data) if CACHE_CODEC == "msgpack" else loads(data)
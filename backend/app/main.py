@@ -1,31 +1,59 @@
-from fastapi import FastAPI, WebSocket, WebSocketDisconnect
+import asyncio
+from contextlib import asynccontextmanager
+from fastapi import FastAPI, WebSocket, WebSocketDisconnect, status
 from fastapi.middleware.cors import CORSMiddleware
-from .core.database import engine, Base
-from .api import auth, alerts, user
+from .core.security import authenticate_token, password_hasher
+from .api import auth, alerts, user, analytics, dashboard, suggestions
 from .websocket import manager
 from .scheduler import start_scheduler, shutdown_scheduler
+from .services.indicators import indicator_store
+from .core.metrics import HTTP_REQUEST_DURATION, HTTP_REQUESTS
+from .core.serialization import ORJSONResponse
+from .core.logging_config import access_sampler, setup_logging, shutdown_logging
 import logging
+import time
 
-# Configurar logging
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
-)
+# Importar o app não toca no banco nem sobe threads: tudo isso fica no lifespan.
+# O schema é gerenciado pelas migrações do Alembic (alembic upgrade head).
 logger = logging.getLogger(__name__)
+access_logger = logging.getLogger("app.access")
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Logging em fila + listener em background
+    setup_logging()
+    logger.info("🚀 Gatilho API iniciada")
+    logger.info("📊 Endpoints disponíveis:")
+    logger.info("   - Docs: http://localhost:8000/docs")
+    logger.info("   - Health: http://localhost:8000/health")
+    logger.info("   - Status: http://localhost:8000/api/monitoring/status")
+    
+    # Inicia o scheduler
+    start_scheduler()
+    logger.info("⏰ Scheduler APScheduler ativo (verifica alertas a cada 5 min)")
+    
+    # Histórico intraday dos indicadores em segundo plano, sem atrasar o boot
+    indicator_warmup = asyncio.create_task(indicator_store.warm_active())
+    
+    yield
+    
+    indicator_warmup.cancel()
+    shutdown_scheduler()
+    password_hasher.shutdown()
+    logger.info("👋 Gatilho API encerrada")
+    shutdown_logging()
 
-# Cria as tabelas no banco
-try:
-    Base.metadata.create_all(bind=engine)
-    logger.info("✅ Tabelas do banco de dados criadas/verificadas")
-except Exception as e:
-    logger.error(f"❌ Erro ao criar tabelas: {e}")
 
 app = FastAPI(
     title="Gatilho API",
     description="API para alertas inteligentes de ações da B3",
     version="1.0.0",
     docs_url="/docs",
-    redoc_url="/redoc"
+    redoc_url="/redoc",
+    # orjson em todas as respostas JSON
+    default_response_class=ORJSONResponse,
+    lifespan=lifespan
 )
 
 # CORS - CONFIGURAÇÃO CRÍTICA (DEVE estar ANTES de todas as rotas)
@@ -48,6 +76,9 @@ app.add_middleware(
 app.include_router(auth.router, prefix="/api/auth", tags=["Autenticação"])
 app.include_router(alerts.router, prefix="/api/alerts", tags=["Alertas"])
 app.include_router(user.router, prefix="/api/user", tags=["Usuário"])
+app.include_router(analytics.router, prefix="/api/analytics", tags=["Analytics"])
+app.include_router(dashboard.router, prefix="/api/dashboard", tags=["Dashboard"])
+app.include_router(suggestions.router, prefix="/api/suggestions", tags=["Sugestões"])
 
 # Importa e inclui rotas de monitoramento
 try:
@@ -68,7 +99,9 @@ def root():
         "endpoints": {
             "docs": "/docs",
             "health": "/api/monitoring/health",
-            "status": "/api/monitoring/status"
+            "status": "/api/monitoring/status",
+            "metrics": "/api/monitoring/metrics",
+            "market_data": "/api/monitoring/market-data"
         }
     }
 
@@ -77,22 +110,51 @@ def health_check():
     """Health check simplificado"""
     return {"status": "healthy", "service": "Gatilho API"}
 
-# Middleware para debug
+# Access log + métricas: uma linha por requisição, amostrada por rota
 @app.middleware("http")
 async def log_requests(request, call_next):
-    logger.info(f"🔵 {request.method} {request.url}")
+    started = time.perf_counter()
     try:
         response = await call_next(request)
-        logger.info(f"✅ Status: {response.status_code}")
-        return response
     except Exception as e:
-        logger.error(f"❌ Erro: {e}")
+        access_logger.error(
+            "%s %s falhou: %s", request.method, request.url.path, e,
+            extra={"method": request.method, "path": request.url.path}
+        )
         raise
+    
+    duration = time.perf_counter() - started
+    route = request.scope.get("route")
+    # Rotas não encontradas viram um único rótulo para não explodir a cardinalidade
+    route_path = route.path if route is not None else "unmatched"
+    
+    HTTP_REQUEST_DURATION.labels(request.method, route_path).observe(duration)
+    HTTP_REQUESTS.labels(request.method, route_path, str(response.status_code)).inc()
+    
+    if access_sampler.should_log(route_path, response.status_code):
+        access_logger.info(
+            "%s %s %s %.1fms", request.method, request.url.path, response.status_code, duration * 1000,
+            extra={
+                "method": request.method,
+                "path": request.url.path,
+                "route": route_path,
+                "status": response.status_code,
+                "duration_ms": round(duration * 1000, 2)
+            }
+        )
+    return response
 
 # WebSocket para notificações em tempo real
 @app.websocket("/ws/{user_id}")
-async def websocket_endpoint(websocket: WebSocket, user_id: int):
-    await manager.connect(websocket, user_id)
+async def websocket_endpoint(websocket: WebSocket, user_id: int, token: str = "", format: str = "json"):
+    # Navegadores não enviam headers no handshake: o token vem em ?token=
+    current_user = await authenticate_token(token) if token else None
+    if current_user is None or current_user.id != user_id:
+        await websocket.close(code=status.WS_1008_POLICY_VIOLATION)
+        return
+    
+    # ?format=msgpack: mensagens em frames binários (se o msgpack estiver instalado)
+    await manager.connect(websocket, user_id, binary=format == "msgpack")
     try:
         while True:
             data = await websocket.receive_text()
@@ -101,22 +163,3 @@ async def websocket_endpoint(websocket: WebSocket, user_id: int):
     except WebSocketDisconnect:
         manager.disconnect(websocket, user_id)
         logger.info(f"🔌 WebSocket desconectado: user_id={user_id}")
-
-# Startup event
-@app.on_event("startup")
-async def startup_event():
-    logger.info("🚀 Gatilho API iniciada")
-    logger.info("📊 Endpoints disponíveis:")
-    logger.info("   - Docs: http://localhost:8000/docs")
-    logger.info("   - Health: http://localhost:8000/health")
-    logger.info("   - Status: http://localhost:8000/api/monitoring/status")
-    
-    # Inicia o scheduler
-    start_scheduler()
-    logger.info("⏰ Scheduler APScheduler ativo (verifica alertas a cada 5 min)")
-
-# Shutdown event
-@app.on_event("shutdown")
-async def shutdown_event():
-    shutdown_scheduler()
-    logger.info("👋 Gatilho API encerrada")
\ No newline at end of file
@@ -3,6 +3,7 @@ from sqlalchemy.sql import func
 from sqlalchemy.orm import relationship
 from ..core.database import Base
 from sqlalchemy import Index
+from datetime import datetime
 
 class Alert(Base):
     __tablename__ = "alerts"
@@ -13,14 +14,74 @@ class Alert(Base):
     alert_type = Column(String, nullable=False)
     target_value = Column(Float, nullable=False)
     condition = Column(String, nullable=False)
+    # Período dos alertas de indicador (sma, ema, rsi); None nos demais tipos
+    period = Column(Integer, nullable=True)
+    # Expressão normalizada das regras compostas (alert_type "compound"); None nos demais tipos
+    expression = Column(String, nullable=True)
     is_active = Column(Boolean, default=True)
     triggered = Column(Boolean, default=False)
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     triggered_at = Column(DateTime(timezone=True), nullable=True)
+    # Atualizado em toda escrita (criação, remoção, disparo); base do delta-sync do dashboard
+    updated_at = Column(
+        DateTime(timezone=True), default=datetime.utcnow, onupdate=datetime.utcnow,
+        server_default=func.now(), nullable=False
+    )
     
+    # Índices parciais: o WHERE precisa ser o mesmo que as consultas usam
+    # (no SQLite, termo a termo), por isso vem das próprias colunas.
+    # As consultas quentes e seus planos são verificados em tests/test_query_plans.py
     __table_args__ = (
-        Index('idx_user_active', 'user_id', 'is_active'),
         Index('idx_ticker_type', 'ticker', 'alert_type'),
-        Index('idx_triggered_at', 'triggered_at'),
+        # Paginação por cursor em list_alerts
+        Index('idx_user_created', 'user_id', 'created_at', 'id'),
+        Index('idx_user_updated', 'user_id', 'updated_at'),
+        # Ciclo do scheduler e chaves de indicadores: só os alertas pendentes
+        Index(
+            'idx_alerts_pending', 'alert_type', 'ticker', 'period',
+            sqlite_where=(is_active == True) & (triggered == False),
+            postgresql_where=(is_active == True) & (triggered == False),
+        ),
+        # Alertas vivos por usuário: lista paginada (active_only) e snapshot do dashboard
+        Index(
+            'idx_alerts_live_created', 'user_id', 'created_at', 'id',
+            sqlite_where=is_active == True,
+            postgresql_where=is_active == True,
+        ),
+        # Cobre estatísticas e analytics por tipo sem ler a tabela
+        Index(
+            'idx_alerts_live_covering', 'user_id', 'alert_type', 'ticker',
+            sqlite_where=is_active == True,
+            postgresql_where=is_active == True,
+        ),
+        # Popularidade por ticker e sketches de sugestões (GROUP BY na ordem do índice)
+        Index(
+            'idx_alerts_live_ticker', 'ticker', 'alert_type', 'target_value',
+            sqlite_where=is_active == True,
+            postgresql_where=is_active == True,
+        ),
     )
     user = relationship("User", back_populates="alerts")
+
+
+class AlertArchive(Base):
+    """
+    Alertas frios: disparados ou removidos há mais de ALERT_ARCHIVE_DAYS
+    Movidos pelo job de arquivamento (services/events.py) para que `alerts`
+    só tenha alertas vivos e recentes; o histórico vem de alert_events.
+    """
+    __tablename__ = "alerts_archive"
+
+    id = Column(Integer, primary_key=True)
+    user_id = Column(Integer, ForeignKey("users.id"), nullable=False, index=True)
+    ticker = Column(String, nullable=False)
+    alert_type = Column(String, nullable=False)
+    target_value = Column(Float, nullable=False)
+    condition = Column(String, nullable=False)
+    period = Column(Integer, nullable=True)
+    expression = Column(String, nullable=True)
+    triggered = Column(Boolean, default=False)
+    created_at = Column(DateTime(timezone=True), nullable=True)
+    triggered_at = Column(DateTime(timezone=True), nullable=True)
+    updated_at = Column(DateTime(timezone=True), nullable=True)
+    archived_at = Column(DateTime(timezone=True), nullable=False, default=datetime.utcnow)
@@ -0,0 +1,35 @@
+from sqlalchemy import BigInteger, Column, Integer, String, Float, DateTime, ForeignKey, Index
+from ..core.database import Base
+
+class AlertEvent(Base):
+    """
+    Log append-only dos disparos de alerta (uma linha por alerta disparado)
+    Guarda uma cópia da regra e os valores do momento do disparo, então o
+    histórico continua válido depois que o alerta sai da tabela quente.
+    No Postgres a tabela é particionada por mês em triggered_at (ver a
+    migração 0005 e services/events.py); aqui fica a forma lógica.
+    """
+    __tablename__ = "alert_events"
+
+    id = Column(BigInteger().with_variant(Integer, "sqlite"), primary_key=True)
+    triggered_at = Column(DateTime(timezone=True), nullable=False)
+    user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
+    # Sem FK: o alerta pode ser arquivado (alerts_archive) e o evento fica
+    alert_id = Column(Integer, nullable=False)
+    ticker = Column(String, nullable=False)
+    alert_type = Column(String, nullable=False)
+    condition = Column(String, nullable=False)
+    target_value = Column(Float, nullable=False)
+    period = Column(Integer, nullable=True)
+    expression = Column(String, nullable=True)
+    # Valor que cruzou o alvo (preço, variação, RSI...); None nas regras compostas
+    trigger_value = Column(Float, nullable=True)
+    # Preço do ticker do alerta no disparo (None se a cotação não estava disponível)
+    price = Column(Float, nullable=True)
+    alert_created_at = Column(DateTime(timezone=True), nullable=True)
+
+    __table_args__ = (
+        # Histórico paginado por cursor (triggered_at, id)
+        Index('idx_events_user_triggered', 'user_id', 'triggered_at', 'id'),
+        Index('idx_events_triggered_at', 'triggered_at'),
+    )
@@ -0,0 +1,34 @@
+from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, JSON, Index
+from sqlalchemy.sql import func
+from ..core.database import Base
+from datetime import datetime
+
+class NotificationOutbox(Base):
+    """
+    Notificações pendentes, gravadas no mesmo commit que marca o alerta como disparado
+    O drain (services/outbox.py) reivindica lotes, envia e marca como enviadas;
+    falhas voltam para a fila com backoff exponencial.
+    """
+    __tablename__ = "notification_outbox"
+
+    id = Column(Integer, primary_key=True)
+    # Um aviso por disparo de alerta: reprocessar o mesmo disparo não duplica a linha
+    idempotency_key = Column(String, nullable=False, unique=True)
+    user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
+    # SET NULL: remover o alerta não apaga o aviso já enfileirado
+    alert_id = Column(Integer, ForeignKey("alerts.id", ondelete="SET NULL"), nullable=True)
+    to_email = Column(String, nullable=False)
+    # Campos do AlertNotice (ticker, alert_type, condition, target_value, current_value)
+    payload = Column(JSON, nullable=False)
+    # pending -> sent | failed (tentativas esgotadas)
+    status = Column(String, nullable=False, default="pending")
+    attempts = Column(Integer, nullable=False, default=0)
+    # Próxima vez em que a linha pode ser reivindicada (também serve de lease do drain)
+    next_attempt_at = Column(DateTime(timezone=True), nullable=False, default=datetime.utcnow)
+    last_error = Column(String, nullable=True)
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    sent_at = Column(DateTime(timezone=True), nullable=True)
+
+    __table_args__ = (
+        Index('idx_outbox_status_next', 'status', 'next_attempt_at'),
+    )
@@ -0,0 +1,16 @@
+from sqlalchemy import Column, Integer, String, Date, ForeignKey
+from ..core.database import Base
+
+class AlertDailyRollup(Base):
+    """
+    Contadores diários pré-agregados por usuário e tipo de alerta.
+    Mantidos incrementalmente na criação e no disparo de alertas,
+    para que o analytics não precise varrer o histórico inteiro.
+    """
+    __tablename__ = "alert_daily_rollups"
+
+    user_id = Column(Integer, ForeignKey("users.id"), primary_key=True)
+    day = Column(Date, primary_key=True)
+    alert_type = Column(String, primary_key=True)
+    created_count = Column(Integer, nullable=False, default=0)
+    triggered_count = Column(Integer, nullable=False, default=0)
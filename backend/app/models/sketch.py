@@ -0,0 +1,12 @@
+from sqlalchemy import Column, String, Text, DateTime
+from sqlalchemy.sql import func
+from ..core.database import Base
+
+class TargetValueSketch(Base):
+    """Sketch de quantis dos target_value ativos por (ticker, alert_type), serializado em JSON"""
+    __tablename__ = "target_value_sketches"
+
+    ticker = Column(String, primary_key=True)
+    alert_type = Column(String, primary_key=True)
+    payload = Column(Text, nullable=False)
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, DateTime
+from sqlalchemy import Column, Integer, String, DateTime, Float
 from sqlalchemy.sql import func
 from sqlalchemy.orm import relationship
 from ..core.database import Base
@@ -11,5 +11,7 @@ class User(Base):
     name = Column(String, nullable=True)
     hashed_password = Column(String, nullable=False)
     created_at = Column(DateTime(timezone=True), server_default=func.now())
+    # Tokens com iat anterior (epoch em segundos) são inválidos: troca de senha, logout
+    tokens_valid_after = Column(Float, nullable=True)
     
     alerts = relationship("Alert", back_populates="user")
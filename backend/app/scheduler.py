@@ -5,32 +5,117 @@ Roda no mesmo processo do FastAPI, sem dependências externas!
 
 import asyncio
 import logging
+import time
+from collections import Counter, deque
 from datetime import datetime
-from typing import List
+from typing import Dict, List, Optional, Tuple
+from apscheduler.events import EVENT_JOB_MAX_INSTANCES, EVENT_JOB_MISSED
 from apscheduler.schedulers.asyncio import AsyncIOScheduler
+from apscheduler.triggers.cron import CronTrigger
 from apscheduler.triggers.interval import IntervalTrigger
+from sqlalchemy import update
 from sqlalchemy.orm import Session
 
+from .core.cache import bump_user_versions
 from .core.database import SessionLocal
+from .core.metrics import (
+    NOTIFICATION_QUEUE_DEPTH, SCHEDULER_ALERTS_CHECKED, SCHEDULER_CYCLE_DURATION,
+    SCHEDULER_PHASE_DURATION, SCHEDULER_TRIGGERS
+)
 from .models.alert import Alert
 from .models.user import User
 from .services.market_data import market_data_service
-from .services.notification import notification_service
+from .services.events import event_row, maintain_alert_events, record_events
+from .services.outbox import drain_outbox, enqueue as enqueue_notifications, idempotency_key, purge_outbox
+from .services.alert_indexes import alerts_deactivated
+from .services.indicators import INDICATOR_TYPES, MAX_WARMUPS_PER_CYCLE, indicator_store
+from .services.rules import RULE_TYPE, InputKey, rule_engine
+from .services.value_sketches import flush_value_sketches, rebuild_value_sketches, value_sketches
+from .services.rollups import RollupIncrements, apply_increments, merge_increments
 
 logger = logging.getLogger(__name__)
 
 # Instância global do scheduler
 scheduler = AsyncIOScheduler()
 
+# Filhos pré-criados: observar a duração de uma fase não aloca nada
+_FETCH_PHASE = SCHEDULER_PHASE_DURATION.labels("fetch")
+_EVALUATE_PHASE = SCHEDULER_PHASE_DURATION.labels("evaluate")
+_NOTIFY_PHASE = SCHEDULER_PHASE_DURATION.labels("notify")
+
+# Quantos ciclos recentes ficam guardados para o endpoint de monitoramento
+TRACE_HISTORY = 50
+
+# Ids por UPDATE no disparo em lote
+TRIGGER_BATCH = 500
+
+# Chave canônica de um alerta simples: cópias iguais de usuários diferentes
+# são avaliadas uma vez só. (ticker, alert_type, condition, target_value, period)
+RuleKey = Tuple[str, str, str, float, Optional[int]]
+
+# (alerta representante, valor atual (None nas regras compostas), preço do ticker, todos os alertas da mesma regra)
+TriggerGroup = Tuple[Alert, Optional[float], Optional[float], List[Alert]]
+
+
+def _ms(seconds: float) -> float:
+    return round(seconds * 1000, 2)
+
 
 class AlertChecker:
     """Classe para verificar alertas de forma assíncrona"""
     
     def __init__(self):
         self.market_cache = {}
+        # Ring buffer com o trace dos últimos ciclos (o mais antigo sai sozinho)
+        self.traces = deque(maxlen=TRACE_HISTORY)
+        self.current: Optional[Dict] = None
+        self.cycles = 0
+        # Execuções puladas pelo APScheduler, por job
+        self.overruns = Counter()
+        self.missed = Counter()
+    
+    def on_job_event(self, event):
+        """Listener do APScheduler para execuções puladas"""
+        if event.code == EVENT_JOB_MAX_INSTANCES:
+            # Ciclo anterior ainda rodando quando o próximo deveria começar
+            self.overruns[event.job_id] += 1
+            logger.warning("⏱️ Job %s pulado: execução anterior ainda em andamento", event.job_id)
+        elif event.code == EVENT_JOB_MISSED:
+            self.missed[event.job_id] += 1
+            logger.warning("⏱️ Job %s perdeu o horário agendado", event.job_id)
+    
+    def snapshot(self, limit: int = TRACE_HISTORY) -> Dict:
+        """Estado atual, contadores e traces mais recentes (do mais novo ao mais antigo)"""
+        traces = list(self.traces)[-limit:] if limit > 0 else []
+        traces.reverse()
+        return {
+            "cycles": self.cycles,
+            "in_progress": dict(self.current) if self.current else None,
+            "overruns": dict(self.overruns),
+            "missed": dict(self.missed),
+            "traces": traces
+        }
     
     async def check_all_alerts(self):
         """Verifica todos os alertas ativos (roda a cada 5 minutos)"""
+        cycle_started = time.perf_counter()
+        self.cycles += 1
+        trace = self.current = {
+            "cycle": self.cycles,
+            "started_at": datetime.utcnow().isoformat(),
+            "finished_at": None,
+            "duration_ms": None,
+            "status": "running",
+            "alerts": 0,
+            "rules": 0,
+            "tickers": 0,
+            "fetch_ms": None,
+            "fetches": [],
+            "evaluate_ms": None,
+            "triggered": 0,
+            "notify_ms": None,
+            "error": None
+        }
         db = SessionLocal()
         
         try:
@@ -39,29 +124,64 @@ class AlertChecker:
                 Alert.is_active == True,
                 Alert.triggered == False
             ).all()
+            SCHEDULER_ALERTS_CHECKED.set(len(alerts))
+            trace["alerts"] = len(alerts)
             
             if not alerts:
-                logger.info("ℹ️ Nenhum alerta ativo para verificar")
+                logger.debug("ℹ️ Nenhum alerta ativo para verificar")
+                trace["status"] = "empty"
                 return
             
-            logger.info(f"🔍 Verificando {len(alerts)} alertas ativos...")
+            logger.debug("🔍 Verificando %d alertas ativos...", len(alerts))
+            
+            # Regras compostas: compiladas uma vez e avaliadas pelo rule_engine
+            rules = {alert.id: alert for alert in alerts if alert.alert_type == RULE_TYPE}
+            rule_engine.sync((alert_id, alert.expression) for alert_id, alert in rules.items())
             
-            # Agrupa por ticker para otimizar API calls
-            tickers = list(set([alert.ticker for alert in alerts]))
+            # Agrupa por ticker para otimizar API calls (inclui os tickers citados nas regras)
+            tickers = list(
+                {alert.ticker for alert in alerts if alert.alert_type != RULE_TYPE} | rule_engine.tickers()
+            )
+            trace["tickers"] = len(tickers)
             
-            # Busca cotações em paralelo
+            # Fase 1: busca cotações (e aquece indicadores novos)
+            phase_started = time.perf_counter()
+            await self._prepare_indicators(alerts)
             quotes = {}
+            sources = Counter()
+            fetches = trace["fetches"]
             for ticker in tickers:
+                fetch_started = time.perf_counter()
+                source = None
                 try:
                     quote = await market_data_service.get_quote(ticker)
                     if quote:
                         quotes[ticker] = quote
+                        source = quote.get("_source", "upstream")
+                        sources[source] += 1
+                        indicator_store.on_quote(ticker, quote)
                 except Exception as e:
                     logger.error(f"❌ Erro ao buscar {ticker}: {e}")
+                fetches.append({
+                    "ticker": ticker,
+                    "source": source,
+                    "latency_ms": _ms(time.perf_counter() - fetch_started)
+                })
+            phase_elapsed = time.perf_counter() - phase_started
+            _FETCH_PHASE.observe(phase_elapsed)
+            trace["fetch_ms"] = _ms(phase_elapsed)
             
-            # Verifica cada alerta
-            triggered_count = 0
+            # Fase 2: avalia cada regra distinta uma vez
+            phase_started = time.perf_counter()
+            groups: Dict[RuleKey, List[Alert]] = {}
             for alert in alerts:
+                if alert.alert_type != RULE_TYPE:
+                    groups.setdefault(self._rule_key(alert), []).append(alert)
+            trace["rules"] = len(groups) + len({alert.expression for alert in rules.values()})
+            
+            to_trigger: List[TriggerGroup] = []
+            for subscribers in groups.values():
+                alert = subscribers[0]
                 try:
                     quote = quotes.get(alert.ticker)
                     if not quote:
@@ -73,34 +193,118 @@ class AlertChecker:
                     
                     # Verifica condição
                     if self._check_condition(alert, current_value):
-                        await self._trigger_alert(alert, current_value, db)
-                        triggered_count += 1
-                        logger.info(f"🔔 Alerta disparado! {alert.ticker} {alert.condition} {alert.target_value}")
+                        to_trigger.append((alert, current_value, self._quote_price(quote), subscribers))
                 
                 except Exception as e:
                     logger.error(f"❌ Erro ao processar alerta {alert.id}: {e}")
+            if rules:
+                # Cada entrada distinta é lida uma vez; só o que mudou é reavaliado
+                values = {key: self._input_value(key, quotes) for key in rule_engine.input_keys()}
+                hits: Dict[str, List[Alert]] = {}
+                for alert_id in rule_engine.evaluate(values):
+                    if alert_id in rules:
+                        hits.setdefault(rules[alert_id].expression, []).append(rules[alert_id])
+                # Regras compostas não têm um valor único que cruzou o alvo
+                to_trigger.extend(
+                    (group[0], None, self._quote_price(quotes.get(group[0].ticker)), group)
+                    for group in hits.values()
+                )
+            phase_elapsed = time.perf_counter() - phase_started
+            _EVALUATE_PHASE.observe(phase_elapsed)
+            trace["evaluate_ms"] = _ms(phase_elapsed)
             
-            logger.info(f"✅ Verificação concluída: {triggered_count} alertas disparados")
+            # Fase 3: dispara e enfileira as notificações (em lote, por regra)
+            phase_started = time.perf_counter()
+            triggered_count = await self._trigger_alerts(to_trigger, db)
+            SCHEDULER_TRIGGERS.inc(triggered_count)
+            phase_elapsed = time.perf_counter() - phase_started
+            _NOTIFY_PHASE.observe(phase_elapsed)
+            trace["triggered"] = triggered_count
+            trace["notify_ms"] = _ms(phase_elapsed)
+            trace["status"] = "ok"
+            
+            # Uma linha agregada por ciclo em vez de uma por ticker
+            logger.info(
+                "✅ Verificação concluída: %d alertas (%d regras distintas), %d tickers (cache=%d, api=%d, mock=%d), %d disparados",
+                len(alerts), trace["rules"], len(tickers), sources["cache"], sources["upstream"], sources["mock"], triggered_count,
+                extra={
+                    "alerts": len(alerts),
+                    "rules": trace["rules"],
+                    "tickers": len(tickers),
+                    "quote_sources": dict(sources),
+                    "triggered": triggered_count
+                }
+            )
         
         except Exception as e:
             logger.error(f"❌ Erro na verificação de alertas: {e}")
             import traceback
             traceback.print_exc()
+            trace["status"] = "error"
+            trace["error"] = str(e)
         
         finally:
             db.close()
+            cycle_elapsed = time.perf_counter() - cycle_started
+            SCHEDULER_CYCLE_DURATION.observe(cycle_elapsed)
+            trace["finished_at"] = datetime.utcnow().isoformat()
+            trace["duration_ms"] = _ms(cycle_elapsed)
+            self.traces.append(trace)
+            self.current = None
+    
+    async def _prepare_indicators(self, alerts: List[Alert]):
+        """Mantém um estado por (ticker, indicador, período) dos alertas ativos"""
+        keys = {
+            (alert.ticker, alert.alert_type, alert.period)
+            for alert in alerts
+            if alert.alert_type in INDICATOR_TYPES
+        }
+        keys |= rule_engine.indicator_keys()
+        pending = indicator_store.sync(keys)
+        if pending:
+            await indicator_store.warm(pending[:MAX_WARMUPS_PER_CYCLE])
+    
+    @staticmethod
+    def _rule_key(alert: Alert) -> RuleKey:
+        return (alert.ticker, alert.alert_type, alert.condition, alert.target_value, alert.period)
     
     def _extract_value(self, alert: Alert, quote: dict) -> float:
         """Extrai valor atual baseado no tipo de alerta"""
+        return self._metric_value(alert.ticker, alert.alert_type, alert.period, quote)
+    
+    def _input_value(self, key: InputKey, quotes: Dict[str, dict]) -> Optional[float]:
+        """Valor de uma entrada das regras compostas (None sem cotação)"""
+        ticker, metric, period = key
+        quote = quotes.get(ticker)
+        if not quote:
+            return None
+        return self._metric_value(ticker, metric, period, quote)
+    
+    def _metric_value(self, ticker: str, metric: str, period: Optional[int], quote: dict) -> Optional[float]:
         try:
-            if alert.alert_type == "price":
+            if metric in INDICATOR_TYPES:
+                # Cotação mockada não tem relação com o histórico do indicador
+                if quote.get("_mock"):
+                    return None
+                return indicator_store.alert_value(
+                    ticker, metric, period, float(quote.get("price", 0))
+                )
+            elif metric == "price":
                 return float(quote.get("price", 0))
-            elif alert.alert_type == "percentage":
+            elif metric == "percentage":
                 return abs(float(quote.get("change_percent", 0)))
-            elif alert.alert_type == "volume":
+            elif metric == "volume":
                 return float(quote.get("volume", 0))
         except (ValueError, TypeError) as e:
-            logger.error(f"❌ Erro ao extrair valor para {alert.ticker}: {e}")
+            logger.error(f"❌ Erro ao extrair valor para {ticker}: {e}")
+            return None
+    
+    @staticmethod
+    def _quote_price(quote: Optional[dict]) -> Optional[float]:
+        """Preço da cotação, guardado no evento de disparo"""
+        try:
+            return float(quote["price"]) if quote and quote.get("price") is not None else None
+        except (ValueError, TypeError):
             return None
     
     def _check_condition(self, alert: Alert, current_value: float) -> bool:
@@ -115,42 +319,98 @@ class AlertChecker:
             return current_value <= alert.target_value
         return False
     
-    async def _trigger_alert(self, alert: Alert, current_value: float, db: Session):
-        """Dispara um alerta e notifica o usuário"""
+    async def _trigger_alerts(self, hits: List[TriggerGroup], db: Session) -> int:
+        """
+        Dispara os alertas em lote e enfileira as notificações
+        Uma consulta de usuários para o ciclo inteiro e um único commit com o
+        disparo, os eventos em alert_events, os rollups e as linhas do outbox;
+        o envio (um resumo por usuário) fica com o drain_outbox, acordado logo em seguida.
+        """
+        if not hits:
+            return 0
+        
+        user_ids = {alert.user_id for _, _, _, group in hits for alert in group}
+        emails = dict(db.query(User.id, User.email).filter(User.id.in_(user_ids)).all())
+        
+        triggered_at = datetime.utcnow()
+        fired: List[Alert] = []
+        notifications = []
+        events = []
+        for alert, current_value, price, group in hits:
+            payload = {
+                "ticker": alert.ticker,
+                "alert_type": alert.alert_type,
+                # Regras compostas mostram a expressão no lugar da condição
+                "condition": alert.expression if alert.alert_type == RULE_TYPE else alert.condition,
+                "target_value": alert.target_value,
+                "current_value": current_value
+            }
+            subscribers = 0
+            for subscriber in group:
+                email = emails.get(subscriber.user_id)
+                if email is None:
+                    logger.error(f"❌ Usuário {subscriber.user_id} não encontrado")
+                    continue
+                notifications.append({
+                    "idempotency_key": idempotency_key(subscriber.id, triggered_at),
+                    "user_id": subscriber.user_id,
+                    "alert_id": subscriber.id,
+                    "to_email": email,
+                    "payload": payload
+                })
+                events.append(event_row(subscriber, triggered_at, current_value, price))
+                fired.append(subscriber)
+                subscribers += 1
+            if subscribers:
+                logger.info(
+                    "🔔 Alerta disparado! %s %s %s (%d inscritos)",
+                    alert.ticker, alert.expression or alert.condition, alert.target_value, subscribers
+                )
+        
+        if not fired:
+            return 0
+        
         try:
-            # Busca usuário
-            user = db.query(User).filter(User.id == alert.user_id).first()
-            if not user:
-                logger.error(f"❌ Usuário {alert.user_id} não encontrado")
-                return
-            
-            # Envia notificação por email
-            notification_service.send_alert_email(
-                to_email=user.email,
-                ticker=alert.ticker,
-                alert_type=alert.alert_type,
-                condition=alert.condition,
-                target_value=alert.target_value,
-                current_value=current_value
-            )
-            
-            # Atualiza alerta no banco
-            alert.triggered = True
-            alert.triggered_at = datetime.utcnow()
-            alert.is_active = False
+            # Atualiza os alertas no banco
+            ids = [alert.id for alert in fired]
+            for start in range(0, len(ids), TRIGGER_BATCH):
+                db.execute(
+                    update(Alert)
+                    .where(Alert.id.in_(ids[start:start + TRIGGER_BATCH]))
+                    .values(triggered=True, triggered_at=triggered_at, is_active=False)
+                    .execution_options(synchronize_session=False)
+                )
+            increments: RollupIncrements = {}
+            for alert in fired:
+                merge_increments(increments, alert.user_id, alert.alert_type, when=triggered_at, triggered=1)
+            apply_increments(db, increments)
+            record_events(db, events)
+            # Notificações entram no mesmo commit do disparo; o envio é do drain do outbox
+            enqueue_notifications(db, notifications)
             db.commit()
-            
-            logger.info(f"✅ Notificação enviada para {user.email}")
-        
         except Exception as e:
-            logger.error(f"❌ Erro ao disparar alerta {alert.id}: {e}")
+            logger.error(f"❌ Erro ao disparar {len(fired)} alertas: {e}")
             db.rollback()
+            return 0
+        
+        NOTIFICATION_QUEUE_DEPTH.inc(len(notifications))
+        wake_outbox_drain()
+        alerts_deactivated((alert.ticker, alert.alert_type, alert.target_value) for alert in fired)
+        bump_user_versions(user_ids)
+        return len(fired)
 
 
 # Instância global do checker
 alert_checker = AlertChecker()
 
 
+def wake_outbox_drain():
+    """Antecipa o próximo drain do outbox para agora (sem scheduler rodando, não faz nada)"""
+    job = scheduler.get_job('drain_outbox')
+    if job is not None and scheduler.running:
+        job.modify(next_run_time=datetime.now(scheduler.timezone))
+
+
 def start_scheduler():
     """Inicia o scheduler quando a aplicação subir"""
     
@@ -164,6 +424,63 @@ def start_scheduler():
         max_instances=1  # Garante que não rode duas vezes ao mesmo tempo
     )
     
+    # Reconstrói os sketches de sugestões a partir do banco: agora (o que está
+    # gravado é só cache morno) e depois periodicamente
+    scheduler.add_job(
+        rebuild_value_sketches,
+        trigger=IntervalTrigger(seconds=value_sketches.rebuild_interval),
+        next_run_time=datetime.now(scheduler.timezone),
+        id='rebuild_value_sketches',
+        name='Reconstruir sketches de sugestões',
+        replace_existing=True,
+        max_instances=1
+    )
+    
+    # Persiste periodicamente os sketches de sugestões alterados
+    scheduler.add_job(
+        flush_value_sketches,
+        trigger=IntervalTrigger(minutes=1),
+        id='flush_value_sketches',
+        name='Gravar sketches de sugestões',
+        replace_existing=True,
+        max_instances=1
+    )
+    
+    # Envia as notificações do outbox; também é acordado a cada disparo
+    scheduler.add_job(
+        drain_outbox,
+        trigger=IntervalTrigger(seconds=30),
+        id='drain_outbox',
+        name='Enviar notificações pendentes',
+        replace_existing=True,
+        max_instances=1,
+        coalesce=True
+    )
+    
+    # Remove do outbox as notificações já resolvidas
+    scheduler.add_job(
+        purge_outbox,
+        trigger=IntervalTrigger(hours=1),
+        id='purge_outbox',
+        name='Limpar outbox de notificações',
+        replace_existing=True,
+        max_instances=1
+    )
+    
+    # Partições de alert_events, retenção dos eventos e arquivamento dos alertas frios.
+    # Horário fixo (madrugada): um intervalo de 24h seria adiado a cada restart
+    scheduler.add_job(
+        maintain_alert_events,
+        trigger=CronTrigger(hour=3, minute=30),
+        id='maintain_alert_events',
+        name='Manter eventos e arquivar alertas antigos',
+        replace_existing=True,
+        max_instances=1
+    )
+    
+    # Conta ciclos pulados por max_instances (overrun) ou perdidos
+    scheduler.add_listener(alert_checker.on_job_event, EVENT_JOB_MAX_INSTANCES | EVENT_JOB_MISSED)
+    
     # Inicia o scheduler
     scheduler.start()
     logger.info("✅ Scheduler iniciado - Verificando alertas a cada 5 minutos")
@@ -172,4 +489,5 @@ def start_scheduler():
 def shutdown_scheduler():
     """Para o scheduler quando a aplicação for encerrada"""
     scheduler.shutdown()
+    flush_value_sketches()
     logger.info("👋 Scheduler encerrado")
\ No newline at end of file
@@ -0,0 +1,38 @@
+"""
+Ponto único de atualização dos índices em memória derivados dos alertas ativos
+Chamado depois do commit, uma vez por operação (ou por lote).
+"""
+
+from collections import Counter
+from typing import Iterable, Tuple
+
+from .popularity import ticker_popularity
+from .rules import RULE_TYPE
+from .value_sketches import value_sketches
+
+# (ticker, alert_type, target_value)
+AlertKey = Tuple[str, str, float]
+
+
+def _apply(alerts: Iterable[AlertKey], sign: int):
+    alerts = list(alerts)
+    if not alerts:
+        return
+    tickers = Counter(ticker for ticker, _, _ in alerts)
+    ticker_popularity.apply({ticker: sign * n for ticker, n in tickers.items()})
+    # Regras compostas gravam target_value=0.0: não são um valor-alvo de verdade
+    value_sketches.apply(
+        (ticker, alert_type, target_value, sign)
+        for ticker, alert_type, target_value in alerts
+        if alert_type != RULE_TYPE
+    )
+
+
+def alerts_activated(alerts: Iterable[AlertKey]):
+    """Alertas novos passaram a contar como ativos"""
+    _apply(alerts, +1)
+
+
+def alerts_deactivated(alerts: Iterable[AlertKey]):
+    """Alertas deixaram de ser ativos (removidos ou disparados)"""
+    _apply(alerts, -1)
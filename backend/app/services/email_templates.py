@@ -0,0 +1,234 @@
+"""
+Templates de email de alerta pré-compilados
+
+Cada template é quebrado em trechos literais e nomes de campo uma única vez,
+no import; renderizar é só juntar os trechos com os valores. O layout do
+resumo é um só para todos os destinatários de um envio: o que muda por
+usuário entra como substitution do SendGrid (tags -nome-).
+"""
+
+from dataclasses import dataclass
+from html import escape
+from string import Formatter
+from typing import Dict, List, Optional, Sequence, Tuple
+
+# Limite do SendGrid por envio
+MAX_PERSONALIZATIONS = 1000
+# As substitutions de uma personalization somam no máximo 10 KB no SendGrid;
+# o que não couber vira "+ N alertas no dashboard"
+MAX_ROWS_BYTES = 9000
+# Cada linha renderizada tem ~470 bytes: com 20 o limite de bytes cortaria
+# sempre antes e este nunca valeria
+MAX_DIGEST_ROWS = 15
+
+DEFAULT_COLOR = "#4f46e5"  # indigo padrão
+DEFAULT_ICON = "🔔"
+
+
+class CompiledTemplate:
+    """Template no formato do str.format, analisado uma vez"""
+
+    def __init__(self, source: str):
+        self.parts: List[Tuple[str, str]] = [
+            (literal, field or "")
+            for literal, field, _, _ in Formatter().parse(source)
+        ]
+
+    def render(self, **values) -> str:
+        return "".join(
+            literal + (str(values[field]) if field else "")
+            for literal, field in self.parts
+        )
+
+
+@dataclass(frozen=True)
+class AlertNotice:
+    """Um alerta disparado, do jeito que entra no email"""
+    ticker: str
+    alert_type: str
+    condition: str
+    target_value: float
+    # None nas regras compostas (não há um valor único)
+    current_value: Optional[float]
+
+
+# Labels em português
+ALERT_TYPE_LABELS = {
+    "price": "Preço",
+    "percentage": "Variação",
+    "volume": "Volume",
+    "sma": "Distância da SMA",
+    "ema": "Distância da EMA",
+    "vwap": "Distância do VWAP",
+    "rsi": "RSI",
+    "compound": "Regra composta"
+}
+
+
+def alert_style(alert_type: str, condition: str) -> Tuple[str, str]:
+    """(ícone, cor) do tipo de alerta"""
+    if alert_type == "price":
+        return "💰", "#10b981" if condition in [">", ">="] else "#ef4444"
+    elif alert_type == "percentage":
+        return "📊", "#f59e0b"
+    elif alert_type == "volume":
+        return "📈", "#8b5cf6"
+    elif alert_type in ("rsi", "sma", "ema", "vwap"):
+        return "📉", "#0ea5e9"
+    elif alert_type == "compound":
+        return "🧩", "#14b8a6"
+    return DEFAULT_ICON, DEFAULT_COLOR
+
+
+def _format_value(alert_type: str, value: float) -> str:
+    if alert_type == "price":
+        return f"R$ {value:,.2f}"
+    elif alert_type == "percentage":
+        return f"{value}%"
+    elif alert_type == "rsi":
+        return f"{value:.1f}"
+    elif alert_type in ("sma", "ema", "vwap"):
+        return f"{value:+.2f}%"
+    return f"{int(value):,}"
+
+
+def format_values(alert_type: str, target_value: float, current_value: Optional[float]) -> Tuple[str, str]:
+    """(alvo, valor atual) formatados para exibição"""
+    if alert_type == "compound":
+        # A condição já é a expressão inteira; não há valor atual único
+        return "", "Condições atendidas"
+    current = "—" if current_value is None else _format_value(alert_type, current_value)
+    return _format_value(alert_type, target_value), current
+
+
+ALERT_ROW = CompiledTemplate(
+    '<tr>'
+    '<td style="padding: 12px 10px; border-top: 1px solid #e5e7eb;">{icon} <strong style="color: #1f2937; font-size: 16px;">{ticker}</strong>'
+    '<br><span style="color: #6b7280; font-size: 12px;">{label}</span></td>'
+    '<td style="padding: 12px 10px; border-top: 1px solid #e5e7eb; color: #1f2937; font-size: 14px;">{condition} {target}</td>'
+    '<td style="padding: 12px 10px; border-top: 1px solid #e5e7eb; color: {color}; font-size: 16px; font-weight: bold; text-align: right;">{current}</td>'
+    '</tr>'
+)
+
+OVERFLOW_ROW = CompiledTemplate(
+    '<tr><td colspan="3" style="padding: 12px 10px; border-top: 1px solid #e5e7eb; color: #6b7280; font-size: 13px; text-align: center;">'
+    '+ {count} alerta(s) no dashboard</td></tr>'
+)
+
+# Layout compartilhado; -headline-, -color- e -rows- são trocados pelo SendGrid
+DIGEST_LAYOUT = """
+<!DOCTYPE html>
+<html>
+<head>
+    <meta charset="UTF-8">
+    <meta name="viewport" content="width=device-width, initial-scale=1.0">
+</head>
+<body style="margin: 0; padding: 0; font-family: -apple-system, BlinkMacSystemFont, 'Segoe UI', Roboto, 'Helvetica Neue', Arial, sans-serif; background-color: #f3f4f6;">
+    <table width="100%" cellpadding="0" cellspacing="0" style="background-color: #f3f4f6; padding: 20px;">
+        <tr>
+            <td align="center">
+                <table width="600" cellpadding="0" cellspacing="0" style="background-color: #ffffff; border-radius: 12px; overflow: hidden; box-shadow: 0 4px 6px rgba(0,0,0,0.1);">
+
+                    <!-- Header -->
+                    <tr>
+                        <td style="background: linear-gradient(135deg, -color- 0%, #764ba2 100%); padding: 30px; text-align: center;">
+                            <h1 style="color: #ffffff; margin: 0; font-size: 28px; font-weight: bold;">
+                                -headline-
+                            </h1>
+                        </td>
+                    </tr>
+
+                    <!-- Conteúdo Principal -->
+                    <tr>
+                        <td style="padding: 40px 30px;">
+                            <!-- Alertas -->
+                            <table width="100%" cellpadding="0" cellspacing="0" style="background-color: #f9fafb; border-radius: 8px; padding: 10px; margin-bottom: 25px;">
+                                <tr>
+                                    <td style="padding: 10px; color: #6b7280; font-size: 12px; text-transform: uppercase; font-weight: 600;">Ativo</td>
+                                    <td style="padding: 10px; color: #6b7280; font-size: 12px; text-transform: uppercase; font-weight: 600;">Condição Configurada</td>
+                                    <td style="padding: 10px; color: #6b7280; font-size: 12px; text-transform: uppercase; font-weight: 600; text-align: right;">Valor Atual</td>
+                                </tr>
+                                -rows-
+                            </table>
+
+                            <!-- CTA Button -->
+                            <div style="text-align: center; margin: 30px 0;">
+                                <a href="http://localhost:3000/dashboard"
+                                   style="display: inline-block; background-color: -color-; color: #ffffff; text-decoration: none; padding: 14px 32px; border-radius: 8px; font-weight: 600; font-size: 16px;">
+                                    Ver no Dashboard
+                                </a>
+                            </div>
+
+                            <!-- Dica -->
+                            <div style="background-color: #fef3c7; border-left: 4px solid #f59e0b; padding: 12px 16px; border-radius: 4px;">
+                                <p style="margin: 0; color: #92400e; font-size: 13px;">
+                                    💡 <strong>Dica:</strong> Alertas disparados são desativados automaticamente. Configure um novo alerta se quiser continuar monitorando.
+                                </p>
+                            </div>
+                        </td>
+                    </tr>
+
+                    <!-- Footer -->
+                    <tr>
+                        <td style="background-color: #f9fafb; padding: 20px 30px; text-align: center; border-top: 1px solid #e5e7eb;">
+                            <p style="margin: 0 0 10px 0; color: #6b7280; font-size: 12px;">
+                                Você está recebendo este email porque configurou um alerta no Gatilho
+                            </p>
+                            <p style="margin: 0; color: #9ca3af; font-size: 11px;">
+                                © 2025 Gatilho - Alertas Inteligentes para Ações
+                            </p>
+                        </td>
+                    </tr>
+
+                </table>
+            </td>
+        </tr>
+    </table>
+</body>
+</html>
+"""
+
+
+def render_row(notice: AlertNotice) -> str:
+    icon, color = alert_style(notice.alert_type, notice.condition)
+    target, current = format_values(notice.alert_type, notice.target_value, notice.current_value)
+    return ALERT_ROW.render(
+        icon=icon,
+        ticker=escape(notice.ticker),
+        label=ALERT_TYPE_LABELS.get(notice.alert_type, escape(notice.alert_type)),
+        condition=escape(notice.condition),
+        target=target,
+        color=color,
+        current=current
+    )
+
+
+def digest_subject(notices: Sequence[AlertNotice]) -> str:
+    if len(notices) == 1:
+        return f"🔔 Alerta Disparado: {notices[0].ticker}"
+    tickers = list(dict.fromkeys(notice.ticker for notice in notices))
+    listed = ", ".join(tickers[:3]) + (" e outros" if len(tickers) > 3 else "")
+    return f"🔔 {len(notices)} alertas disparados: {listed}"
+
+
+def digest_substitutions(notices: Sequence[AlertNotice]) -> Dict[str, str]:
+    """Valores por destinatário do layout do resumo"""
+    if len(notices) == 1:
+        icon, color = alert_style(notices[0].alert_type, notices[0].condition)
+        headline = f"{icon} Alerta Disparado!"
+    else:
+        color = DEFAULT_COLOR
+        headline = f"{DEFAULT_ICON} {len(notices)} Alertas Disparados!"
+
+    rows = []
+    size = 0
+    for notice in notices[:MAX_DIGEST_ROWS]:
+        row = render_row(notice)
+        size += len(row.encode())
+        if size > MAX_ROWS_BYTES:
+            break
+        rows.append(row)
+    if len(rows) < len(notices):
+        rows.append(OVERFLOW_ROW.render(count=len(notices) - len(rows)))
+    rows = "".join(rows)
+    return {"-headline-": headline, "-color-": color, "-rows-": rows}
@@ -0,0 +1,209 @@
+"""
+Log de disparos (alert_events) e separação entre alertas quentes e frios
+
+- record_events: grava os disparos no mesmo commit que desativa os alertas
+- archive_alerts: move para alerts_archive os alertas inativos há mais de
+  ALERT_ARCHIVE_DAYS, para que `alerts` só tenha alertas vivos e recentes
+- ensure_event_partitions / expire_events: no Postgres, criam as partições
+  mensais dos próximos meses e descartam as que passaram de
+  EVENT_RETENTION_MONTHS (nos outros bancos a retenção é um DELETE)
+"""
+
+import logging
+import re
+from datetime import date, datetime, timedelta
+from typing import Dict, List, Optional
+
+from sqlalchemy import DateTime, delete, insert, literal, select, text
+from sqlalchemy.orm import Session
+
+from ..core.cache import bump_user_versions
+from ..core.database import SessionLocal
+from ..models.alert import Alert, AlertArchive
+from ..models.event import AlertEvent
+
+logger = logging.getLogger(__name__)
+
+# Alertas disparados ou removidos ficam na tabela quente por esse tempo
+# (o delta-sync do dashboard depende deles); depois vão para alerts_archive
+ALERT_ARCHIVE_DAYS = 30
+ARCHIVE_BATCH = 1000
+MAX_ARCHIVE_BATCHES = 50
+
+# Partições mensais criadas à frente e tempo de vida dos eventos
+PARTITION_MONTHS_AHEAD = 2
+EVENT_RETENTION_MONTHS = 24
+
+_PARTITION_NAME = re.compile(r"^alert_events_y(\d{4})m(\d{2})$")
+
+# Colunas copiadas de alerts para alerts_archive
+_ARCHIVED_COLUMNS = (
+    "id", "user_id", "ticker", "alert_type", "target_value", "condition", "period",
+    "expression", "triggered", "created_at", "triggered_at", "updated_at",
+)
+
+
+def event_row(alert: Alert, triggered_at: datetime, trigger_value: Optional[float],
+              price: Optional[float]) -> Dict:
+    """Linha de alert_events para um alerta disparado"""
+    return {
+        "triggered_at": triggered_at,
+        "user_id": alert.user_id,
+        "alert_id": alert.id,
+        "ticker": alert.ticker,
+        "alert_type": alert.alert_type,
+        "condition": alert.condition,
+        "target_value": alert.target_value,
+        "period": alert.period,
+        "expression": alert.expression,
+        "trigger_value": trigger_value,
+        "price": price,
+        "alert_created_at": alert.created_at,
+    }
+
+
+def record_events(db: Session, rows: List[Dict]):
+    """INSERT multi-linha dos disparos; o commit é de quem chamou"""
+    if rows:
+        db.execute(insert(AlertEvent), rows)
+
+
+def archive_cutoff() -> datetime:
+    """Alertas inativos com updated_at anterior a isso já podem estar em alerts_archive"""
+    return datetime.utcnow() - timedelta(days=ALERT_ARCHIVE_DAYS)
+
+
+def archive_alerts(db: Session) -> int:
+    """
+    Move os alertas inativos antigos para alerts_archive, em lotes
+    Cada lote é um INSERT ... SELECT seguido do DELETE, no mesmo commit.
+    Retorna quantos alertas foram movidos.
+    """
+    cutoff = archive_cutoff()
+    moved = 0
+    for _ in range(MAX_ARCHIVE_BATCHES):
+        ids = list(db.scalars(
+            select(Alert.id)
+            .where(Alert.is_active == False, Alert.updated_at < cutoff)
+            .order_by(Alert.id)
+            .limit(ARCHIVE_BATCH)
+        ))
+        if not ids:
+            break
+
+        now = datetime.utcnow()
+        db.execute(
+            insert(AlertArchive).from_select(
+                [*_ARCHIVED_COLUMNS, "archived_at"],
+                select(
+                    *[getattr(Alert, name) for name in _ARCHIVED_COLUMNS],
+                    literal(now, DateTime(timezone=True))
+                ).where(Alert.id.in_(ids))
+            )
+        )
+        user_ids = set(db.scalars(select(Alert.user_id).where(Alert.id.in_(ids)).distinct()))
+        db.execute(delete(Alert).where(Alert.id.in_(ids)).execution_options(synchronize_session=False))
+        db.commit()
+        # Alertas arquivados saem da listagem (active_only=false)
+        bump_user_versions(user_ids)
+        moved += len(ids)
+        if len(ids) < ARCHIVE_BATCH:
+            break
+    return moved
+
+
+def _add_months(month: date, months: int) -> date:
+    index = month.year * 12 + month.month - 1 + months
+    return date(index // 12, index % 12 + 1, 1)
+
+
+def partition_name(month: date) -> str:
+    return f"alert_events_y{month.year:04d}m{month.month:02d}"
+
+
+def partition_ddl(month: date) -> str:
+    """CREATE da partição mensal (idempotente)"""
+    return (
+        f"CREATE TABLE IF NOT EXISTS {partition_name(month)} PARTITION OF alert_events "
+        f"FOR VALUES FROM ('{month.isoformat()}') TO ('{_add_months(month, 1).isoformat()}')"
+    )
+
+
+def _existing_partitions(db: Session) -> List[str]:
+    return list(db.scalars(text(
+        "SELECT c.relname FROM pg_inherits i "
+        "JOIN pg_class c ON c.oid = i.inhrelid "
+        "JOIN pg_class p ON p.oid = i.inhparent "
+        "WHERE p.relname = 'alert_events'"
+    )))
+
+
+def expire_events(db: Session) -> int:
+    """
+    Descarta os eventos mais antigos que EVENT_RETENTION_MONTHS
+    No Postgres é um DROP da partição inteira (sem varrer linhas). Os
+    rollups continuam certos: o backfill conta os disparos por
+    alerts/alerts_archive.triggered_at, não pelos eventos.
+    """
+    oldest_kept = _add_months(date.today().replace(day=1), -EVENT_RETENTION_MONTHS)
+
+    if db.get_bind().dialect.name != "postgresql":
+        result = db.execute(delete(AlertEvent).where(AlertEvent.triggered_at < oldest_kept))
+        db.commit()
+        return result.rowcount
+
+    dropped = 0
+    for name in _existing_partitions(db):
+        match = _PARTITION_NAME.match(name)
+        if match and date(int(match.group(1)), int(match.group(2)), 1) < oldest_kept:
+            db.execute(text(f"DROP TABLE IF EXISTS {name}"))
+            dropped += 1
+    # Linhas que caíram na partição default saem por DELETE
+    db.execute(
+        text("DELETE FROM alert_events_default WHERE triggered_at < :oldest"),
+        {"oldest": oldest_kept}
+    )
+    db.commit()
+    return dropped
+
+
+def ensure_event_partitions(db: Session, months_ahead: int = PARTITION_MONTHS_AHEAD) -> List[str]:
+    """
+    Cria as partições do mês atual e dos próximos (só Postgres)
+    Precisam existir antes do mês começar: linhas que caem na partição
+    default impedem criar depois a partição daquele mês.
+    """
+    if db.get_bind().dialect.name != "postgresql":
+        return []
+
+    current = date.today().replace(day=1)
+    months = [_add_months(current, offset) for offset in range(months_ahead + 1)]
+    existing = set(_existing_partitions(db))
+    created = []
+    for month in months:
+        if partition_name(month) not in existing:
+            db.execute(text(partition_ddl(month)))
+            created.append(partition_name(month))
+    db.commit()
+    return created
+
+
+def maintain_alert_events():
+    """Job diário: partições novas, retenção dos eventos e arquivamento dos alertas frios"""
+    db = SessionLocal()
+    try:
+        created = ensure_event_partitions(db)
+        if created:
+            logger.info("🗂️ Partições criadas: %s", ", ".join(created))
+        expired = expire_events(db)
+        if expired:
+            logger.info("🧹 Retenção de eventos: %d partições/linhas removidas", expired)
+        archived = archive_alerts(db)
+        if archived:
+            logger.info("📦 %d alertas inativos movidos para alerts_archive", archived)
+    except Exception as e:
+        logger.error(f"❌ Erro na manutenção de eventos/arquivo: {e}")
+        db.rollback()
+    finally:
+        db.close()
+
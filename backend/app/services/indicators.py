@@ -0,0 +1,416 @@
+"""
+Indicadores técnicos incrementais para alertas (SMA, EMA, RSI, VWAP)
+
+O estado fica uma vez por (ticker, indicador, período) e é compartilhado
+por todos os alertas que o usam. Cada barra fechada atualiza o estado em
+O(1) (soma móvel, suavização de Wilder, somatórios da sessão); a barra
+em formação só entra na leitura, sem alterar o estado.
+
+As barras de 5 minutos são montadas a partir das cotações que o scheduler
+já busca; o histórico inicial vem do endpoint intraday uma vez por ticker.
+"""
+
+import logging
+import math
+from collections import deque
+from dataclasses import dataclass
+from datetime import date, datetime, timezone
+from typing import Deque, Dict, Iterable, List, Optional, Set, Tuple
+
+from sqlalchemy.orm import Session
+
+logger = logging.getLogger(__name__)
+
+BAR_INTERVAL = "5min"
+BAR_SECONDS = 300
+
+# Período padrão de cada indicador (VWAP é da sessão, sem período)
+DEFAULT_PERIODS = {"sma": 20, "ema": 20, "rsi": 14, "vwap": None}
+INDICATOR_TYPES = tuple(DEFAULT_PERIODS)
+MAX_PERIOD = 100
+
+# Barras guardadas por ticker: estados novos são montados daqui, sem voltar à API
+HISTORY_BARS = 2 * MAX_PERIOD
+# Quantos pontos pedir ao intraday no aquecimento
+WARMUP_OUTPUTSIZE = 2 * MAX_PERIOD
+# Aquecimentos por ciclo do scheduler (os demais ficam para o próximo)
+MAX_WARMUPS_PER_CYCLE = 10
+
+# (ticker, indicador, período)
+IndicatorKey = Tuple[str, str, Optional[int]]
+
+
+@dataclass
+class Bar:
+    start: datetime
+    high: float
+    low: float
+    close: float
+    volume: float
+
+
+class SMAState:
+    """Média simples com soma móvel"""
+
+    def __init__(self, period: int):
+        self.period = period
+        self.window: Deque[float] = deque()
+        self.total = 0.0
+
+    def update(self, bar: Bar):
+        self.window.append(bar.close)
+        self.total += bar.close
+        if len(self.window) > self.period:
+            self.total -= self.window.popleft()
+
+    def value(self, pending: Optional[Bar]) -> Optional[float]:
+        n = len(self.window)
+        if pending is None:
+            return self.total / self.period if n == self.period else None
+        if n == self.period:
+            return (self.total - self.window[0] + pending.close) / self.period
+        if n == self.period - 1:
+            return (self.total + pending.close) / self.period
+        return None
+
+
+class EMAState:
+    """Média exponencial, semeada com a SMA dos primeiros `period` fechamentos"""
+
+    def __init__(self, period: int):
+        self.period = period
+        self.alpha = 2 / (period + 1)
+        self.ema: Optional[float] = None
+        self._seed_total = 0.0
+        self._seed_count = 0
+
+    def update(self, bar: Bar):
+        if self.ema is None:
+            self._seed_total += bar.close
+            self._seed_count += 1
+            if self._seed_count == self.period:
+                self.ema = self._seed_total / self.period
+            return
+        self.ema += self.alpha * (bar.close - self.ema)
+
+    def value(self, pending: Optional[Bar]) -> Optional[float]:
+        if self.ema is None:
+            return None
+        if pending is None:
+            return self.ema
+        return self.ema + self.alpha * (pending.close - self.ema)
+
+
+class RSIState:
+    """RSI com suavização de Wilder"""
+
+    def __init__(self, period: int):
+        self.period = period
+        self.prev_close: Optional[float] = None
+        self.avg_gain: Optional[float] = None
+        self.avg_loss: Optional[float] = None
+        self._seed_gain = 0.0
+        self._seed_loss = 0.0
+        self._seed_count = 0
+
+    def update(self, bar: Bar):
+        if self.prev_close is None:
+            self.prev_close = bar.close
+            return
+        change = bar.close - self.prev_close
+        gain, loss = max(change, 0.0), max(-change, 0.0)
+        self.prev_close = bar.close
+
+        if self.avg_gain is None:
+            self._seed_gain += gain
+            self._seed_loss += loss
+            self._seed_count += 1
+            if self._seed_count == self.period:
+                self.avg_gain = self._seed_gain / self.period
+                self.avg_loss = self._seed_loss / self.period
+            return
+
+        self.avg_gain = (self.avg_gain * (self.period - 1) + gain) / self.period
+        self.avg_loss = (self.avg_loss * (self.period - 1) + loss) / self.period
+
+    @staticmethod
+    def _rsi(avg_gain: float, avg_loss: float) -> float:
+        if avg_loss == 0:
+            return 50.0 if avg_gain == 0 else 100.0
+        return 100 - 100 / (1 + avg_gain / avg_loss)
+
+    def value(self, pending: Optional[Bar]) -> Optional[float]:
+        if self.avg_gain is None:
+            return None
+        if pending is None:
+            return self._rsi(self.avg_gain, self.avg_loss)
+        change = pending.close - self.prev_close
+        avg_gain = (self.avg_gain * (self.period - 1) + max(change, 0.0)) / self.period
+        avg_loss = (self.avg_loss * (self.period - 1) + max(-change, 0.0)) / self.period
+        return self._rsi(avg_gain, avg_loss)
+
+
+class VWAPState:
+    """VWAP da sessão (preço típico ponderado pelo volume), zerado a cada dia"""
+
+    def __init__(self, period: Optional[int] = None):
+        self.day: Optional[date] = None
+        self.price_volume = 0.0
+        self.volume = 0.0
+
+    @staticmethod
+    def _typical(bar: Bar) -> float:
+        return (bar.high + bar.low + bar.close) / 3
+
+    def update(self, bar: Bar):
+        if bar.start.date() != self.day:
+            self.day = bar.start.date()
+            self.price_volume = 0.0
+            self.volume = 0.0
+        self.price_volume += self._typical(bar) * bar.volume
+        self.volume += bar.volume
+
+    def value(self, pending: Optional[Bar]) -> Optional[float]:
+        price_volume, volume = self.price_volume, self.volume
+        if pending is not None:
+            if pending.start.date() != self.day:
+                price_volume, volume = 0.0, 0.0
+            price_volume += self._typical(pending) * pending.volume
+            volume += pending.volume
+        return price_volume / volume if volume > 0 else None
+
+
+STATE_CLASSES = {"sma": SMAState, "ema": EMAState, "rsi": RSIState, "vwap": VWAPState}
+
+
+def _bucket(moment: datetime) -> datetime:
+    epoch = int(moment.timestamp())
+    return datetime.fromtimestamp(epoch - epoch % BAR_SECONDS, tz=timezone.utc)
+
+
+class TickerSeries:
+    """Barras de um ticker e os estados de indicador que dependem delas"""
+
+    def __init__(self):
+        self.history: Deque[Bar] = deque(maxlen=HISTORY_BARS)
+        self.pending: Optional[Bar] = None
+        self.states: Dict[Tuple[str, Optional[int]], object] = {}
+        self.warmed = False
+        # Volume do quote é acumulado do dia: a barra usa a diferença
+        self._volume_day: Optional[date] = None
+        self._volume_seen = 0.0
+        self._volume_at_bar_start = 0.0
+
+    def add_state(self, indicator: str, period: Optional[int]):
+        """Cria o estado a partir das barras guardadas (no máximo HISTORY_BARS)"""
+        state = STATE_CLASSES[indicator](period)
+        for bar in self.history:
+            state.update(bar)
+        self.states[(indicator, period)] = state
+
+    def _commit(self, bar: Bar):
+        self.history.append(bar)
+        for state in self.states.values():
+            state.update(bar)
+
+    def on_quote(self, price: float, cumulative_volume: float, moment: datetime):
+        start = _bucket(moment)
+        if self._volume_day != start.date():
+            self._volume_day = start.date()
+            self._volume_seen = 0.0
+            self._volume_at_bar_start = 0.0
+
+        if self.pending is not None and self.pending.start != start:
+            self._commit(self.pending)
+            self.pending = None
+
+        if self.pending is None:
+            self._volume_at_bar_start = self._volume_seen
+            self.pending = Bar(start, price, price, price, 0.0)
+
+        bar = self.pending
+        bar.close = price
+        bar.high = max(bar.high, price)
+        bar.low = min(bar.low, price)
+        self._volume_seen = max(self._volume_seen, cumulative_volume)
+        bar.volume = max(0.0, self._volume_seen - self._volume_at_bar_start)
+
+    def load_history(self, bars: List[Bar]):
+        """Coloca o histórico do intraday antes das barras montadas ao vivo e refaz os estados"""
+        if self.history:
+            cutoff = self.history[0].start
+        elif self.pending is not None:
+            cutoff = self.pending.start
+        else:
+            cutoff = None
+        older = [bar for bar in bars if cutoff is None or bar.start < cutoff]
+        self.history = deque(older + list(self.history), maxlen=HISTORY_BARS)
+        for indicator, period in list(self.states):
+            self.add_state(indicator, period)
+        self.warmed = True
+
+
+def _parse_intraday(data: Dict) -> List[Bar]:
+    """Converte a resposta do time_series (mais recente primeiro) em barras UTC, da mais antiga à mais nova"""
+    tz = timezone.utc
+    name = data.get("timezone")
+    if name:
+        try:
+            from zoneinfo import ZoneInfo
+            tz = ZoneInfo(name)
+        except Exception:
+            logger.debug("Fuso %s desconhecido, assumindo UTC", name)
+
+    bars = []
+    for row in data.get("values", []):
+        try:
+            start = datetime.fromisoformat(row["datetime"]).replace(tzinfo=tz).astimezone(timezone.utc)
+            bars.append(Bar(
+                start=start,
+                high=float(row["high"]),
+                low=float(row["low"]),
+                close=float(row["close"]),
+                volume=float(row.get("volume") or 0)
+            ))
+        except (KeyError, TypeError, ValueError):
+            continue
+    bars.sort(key=lambda bar: bar.start)
+    return bars
+
+
+class IndicatorStore:
+    """Séries por ticker e estados compartilhados por (ticker, indicador, período)"""
+
+    def __init__(self):
+        self._series: Dict[str, TickerSeries] = {}
+
+    def sync(self, keys: Iterable[IndicatorKey]) -> List[str]:
+        """
+        Garante estado para cada chave usada por alertas ativos e descarta o resto
+        Retorna os tickers que ainda precisam de aquecimento pelo intraday.
+        """
+        wanted: Dict[str, Set[Tuple[str, Optional[int]]]] = {}
+        for ticker, indicator, period in keys:
+            wanted.setdefault(ticker, set()).add((indicator, period))
+
+        for ticker in list(self._series):
+            if ticker not in wanted:
+                del self._series[ticker]
+
+        for ticker, needed in wanted.items():
+            series = self._series.get(ticker)
+            if series is None:
+                series = self._series[ticker] = TickerSeries()
+            for key in list(series.states):
+                if key not in needed:
+                    del series.states[key]
+            for indicator, period in needed:
+                if (indicator, period) not in series.states:
+                    series.add_state(indicator, period)
+
+        return [ticker for ticker, series in self._series.items() if not series.warmed]
+
+    async def warm(self, tickers: Iterable[str]):
+        """Carrega o histórico intraday (uma chamada por ticker)"""
+        from .market_data import market_data_service
+
+        for ticker in tickers:
+            series = self._series.get(ticker)
+            if series is None or series.warmed:
+                continue
+            data = await market_data_service.get_intraday(ticker, BAR_INTERVAL, outputsize=WARMUP_OUTPUTSIZE)
+            if not data:
+                # Sem histórico: os estados aquecem com as barras ao vivo
+                logger.debug("⚠️ Sem intraday para %s, aquecendo com cotações", ticker)
+                series.warmed = True
+                continue
+            series.load_history(_parse_intraday(data))
+
+    async def warm_active(self):
+        """Aquece os indicadores de todos os alertas ativos (startup)"""
+        from ..core.database import SessionLocal
+
+        try:
+            db = SessionLocal()
+            try:
+                keys = active_indicator_keys(db)
+            finally:
+                db.close()
+
+            pending = self.sync(keys)
+            if pending:
+                await self.warm(pending)
+                logger.info("📈 Indicadores aquecidos: %d tickers, %d estados", len(pending), len(keys))
+        except Exception as e:
+            # O scheduler tenta de novo a cada ciclo
+            logger.error(f"❌ Erro ao aquecer indicadores: {e}")
+
+    def on_quote(self, ticker: str, quote: Dict):
+        """Atualiza a barra em formação com a cotação do ciclo"""
+        series = self._series.get(ticker)
+        if series is None or quote.get("_mock"):
+            return
+        try:
+            price = float(quote["price"])
+            volume = float(quote.get("volume") or 0)
+        except (KeyError, TypeError, ValueError):
+            return
+        series.on_quote(price, volume, datetime.now(timezone.utc))
+
+    def value(self, ticker: str, indicator: str, period: Optional[int]) -> Optional[float]:
+        series = self._series.get(ticker)
+        if series is None:
+            return None
+        state = series.states.get((indicator, period))
+        return state.value(series.pending) if state is not None else None
+
+    def alert_value(self, ticker: str, indicator: str, period: Optional[int], price: float) -> Optional[float]:
+        """
+        Valor comparado com o target_value do alerta
+        RSI é o próprio indicador; SMA, EMA e VWAP viram a distância
+        percentual do preço até o indicador (ex.: > 0 = preço acima da média).
+        """
+        value = self.value(ticker, indicator, period)
+        if value is None:
+            return None
+        if indicator == "rsi":
+            return value
+        if value <= 0 or not math.isfinite(value):
+            return None
+        return (price / value - 1) * 100
+
+    def stats(self) -> Dict:
+        return {
+            "tickers": len(self._series),
+            "states": sum(len(series.states) for series in self._series.values()),
+            "warming": sum(1 for series in self._series.values() if not series.warmed)
+        }
+
+
+def active_indicator_keys(db: Session) -> List[IndicatorKey]:
+    from ..models.alert import Alert
+    from .rules import RULE_TYPE, RuleError, compile_rule
+
+    keys = {tuple(row) for row in db.query(Alert.ticker, Alert.alert_type, Alert.period).filter(
+        Alert.is_active == True,
+        Alert.triggered == False,
+        Alert.alert_type.in_(INDICATOR_TYPES)
+    ).distinct()}
+
+    # Indicadores citados em regras compostas
+    expressions = db.query(Alert.expression).filter(
+        Alert.is_active == True,
+        Alert.triggered == False,
+        Alert.alert_type == RULE_TYPE
+    ).distinct()
+    for (expression,) in expressions:
+        try:
+            predicates = compile_rule(expression).predicates
+        except RuleError:
+            continue
+        keys.update(key[:3] for key in predicates if key[1] in INDICATOR_TYPES)
+    return list(keys)
+
+
+# Instância global
+indicator_store = IndicatorStore()
@@ -1,50 +1,515 @@
-import httpx
+import asyncio
 import logging
-from typing import Optional, Dict
-from datetime import datetime, timedelta
+import random
+import time
+from abc import ABC, abstractmethod
+from collections import deque
+from typing import TYPE_CHECKING, Deque, Dict, List, Optional, Tuple
+from datetime import datetime
 from ..core.config import settings
 from ..core.cache import cache_get, cache_set
+from ..core.metrics import (
+    CIRCUIT_STATE, CIRCUIT_TRANSITIONS, MARKET_DATA_HEDGES, MARKET_DATA_PROVIDER_HEALTH, QUOTE_CACHE,
+    UPSTREAM_DURATION, UPSTREAM_ERRORS
+)
+
+if TYPE_CHECKING:
+    # httpx só é importado na primeira chamada à API (não pesa no boot do worker)
+    import httpx
 
 logger = logging.getLogger(__name__)
 
+_CACHE_HIT = QUOTE_CACHE.labels("hit")
+_CACHE_MISS = QUOTE_CACHE.labels("miss")
+
+# Latências (s) das últimas respostas boas de cada provedor, base do p95
+LATENCY_WINDOW = 200
+# Abaixo disso o p95 não é confiável e o hedge usa DEFAULT_HEDGE_DELAY
+MIN_LATENCY_SAMPLES = 20
+DEFAULT_HEDGE_DELAY = 1.0
+MIN_HEDGE_DELAY = 0.05
+# Média móvel exponencial de sucesso (1) / falha (0) por provedor
+HEALTH_ALPHA = 0.2
+# Provedor doente ainda recebe um pouco de tráfego, senão nunca se recupera
+MIN_HEALTH_WEIGHT = 0.02
+# Perder o hedge pesa na saúde como meia falha
+HEDGE_LOSS_PENALTY = 0.5
+
+
+class ProviderError(Exception):
+    """Resposta inválida de um provedor (HTTP != 200, erro da API, dados incompletos)"""
+
+
+class CircuitOpenError(ProviderError):
+    """Circuito aberto: a chamada nem foi feita"""
+
+
+class CircuitBreaker:
+    """
+    Circuit breaker de um endpoint de um provedor (ex.: twelvedata /quote)
+
+    - closed: chamadas passam; failure_threshold falhas seguidas abrem o circuito
+    - open: chamadas falham na hora (CircuitOpenError) por recovery_seconds
+    - half_open: até half_open_probes chamadas de prova passam; se todas
+      derem certo o circuito fecha, qualquer falha reabre
+    Falha = timeout, erro de conexão, HTTP 5xx ou 429, inclusive quando vêm
+    no corpo de uma resposta 200 (QuoteProvider.api_failure). Tudo roda no
+    event loop, então não precisa de lock.
+    """
+    CLOSED, OPEN, HALF_OPEN = "closed", "open", "half_open"
+    _STATE_VALUES = {CLOSED: 0, HALF_OPEN: 1, OPEN: 2}
+
+    def __init__(self, provider: str, endpoint: str, failure_threshold: int,
+                 recovery_seconds: float, half_open_probes: int):
+        self.provider = provider
+        self.endpoint = endpoint
+        self.failure_threshold = failure_threshold
+        self.recovery_seconds = recovery_seconds
+        self.half_open_probes = half_open_probes
+        self.state = self.CLOSED
+        self.consecutive_failures = 0
+        self.opened_at = 0.0
+        self.probes_in_flight = 0
+        self.probe_successes = 0
+        self.rejected = 0
+        self._gauge = CIRCUIT_STATE.labels(provider, endpoint)
+        self._gauge.set(0)
+
+    def _transition(self, state: str):
+        if state == self.state:
+            return
+        logger.warning(f"🔌 Circuito {self.provider}/{self.endpoint}: {self.state} -> {state}")
+        self.state = state
+        self._gauge.set(self._STATE_VALUES[state])
+        CIRCUIT_TRANSITIONS.labels(self.provider, self.endpoint, state).inc()
+        if state == self.OPEN:
+            self.opened_at = time.monotonic()
+        if state != self.CLOSED:
+            self.probes_in_flight = 0
+            self.probe_successes = 0
+        else:
+            self.consecutive_failures = 0
+
+    def allow(self) -> bool:
+        """Reserva a chamada (prova, se half-open); False = falhar na hora"""
+        if self.state == self.OPEN:
+            if time.monotonic() - self.opened_at < self.recovery_seconds:
+                self.rejected += 1
+                return False
+            self._transition(self.HALF_OPEN)
+        if self.state == self.HALF_OPEN:
+            if self.probes_in_flight >= self.half_open_probes:
+                self.rejected += 1
+                return False
+            self.probes_in_flight += 1
+        return True
+
+    def record_success(self):
+        if self.state == self.HALF_OPEN:
+            self.probes_in_flight = max(0, self.probes_in_flight - 1)
+            self.probe_successes += 1
+            if self.probe_successes >= self.half_open_probes:
+                self._transition(self.CLOSED)
+        else:
+            self.consecutive_failures = 0
+
+    def record_failure(self):
+        if self.state == self.HALF_OPEN:
+            self._transition(self.OPEN)
+            return
+        self.consecutive_failures += 1
+        if self.state == self.CLOSED and self.consecutive_failures >= self.failure_threshold:
+            self._transition(self.OPEN)
+
+    def release(self):
+        """Chamada cancelada antes do fim (ex.: perdeu o hedge): devolve a vaga de prova"""
+        if self.state == self.HALF_OPEN and self.probes_in_flight > 0:
+            self.probes_in_flight -= 1
+
+    def snapshot(self) -> Dict:
+        retry_in = None
+        if self.state == self.OPEN:
+            retry_in = max(0.0, self.recovery_seconds - (time.monotonic() - self.opened_at))
+        return {
+            "state": self.state,
+            "consecutive_failures": self.consecutive_failures,
+            "rejected": self.rejected,
+            "retry_in_s": round(retry_in, 1) if retry_in is not None else None,
+        }
+
+
+class ProviderStats:
+    """Saúde e latência observadas de um provedor"""
+
+    def __init__(self):
+        self.latencies: Deque[float] = deque(maxlen=LATENCY_WINDOW)
+        self.health = 1.0
+        self.successes = 0
+        self.failures = 0
+        self.hedge_losses = 0
+
+    def record_success(self, elapsed: float):
+        self.latencies.append(elapsed)
+        self.successes += 1
+        self.health += HEALTH_ALPHA * (1.0 - self.health)
+
+    def record_failure(self):
+        self.failures += 1
+        self.health -= HEALTH_ALPHA * self.health
+    
+    def record_hedge_loss(self, elapsed: float):
+        """Cancelado porque outro provedor respondeu antes: levou pelo menos elapsed"""
+        self.latencies.append(elapsed)
+        self.hedge_losses += 1
+        self.health -= HEALTH_ALPHA * HEDGE_LOSS_PENALTY * self.health
+
+    def p95(self) -> Optional[float]:
+        if len(self.latencies) < MIN_LATENCY_SAMPLES:
+            return None
+        ordered = sorted(self.latencies)
+        return ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))]
+
+    def hedge_delay(self, timeout: float) -> float:
+        """Quanto esperar antes de pedir a outro provedor: o p95 observado"""
+        p95 = self.p95()
+        delay = DEFAULT_HEDGE_DELAY if p95 is None else p95
+        return min(max(delay, MIN_HEDGE_DELAY), timeout)
+
+    def weight(self) -> float:
+        # Quadrado: um provedor com metade da saúde recebe um quarto do tráfego
+        return max(self.health, MIN_HEALTH_WEIGHT) ** 2
+
+    def snapshot(self) -> Dict:
+        p95 = self.p95()
+        return {
+            "health": round(self.health, 3),
+            "successes": self.successes,
+            "failures": self.failures,
+            "hedge_losses": self.hedge_losses,
+            "p95_ms": round(p95 * 1000, 1) if p95 is not None else None,
+        }
+
+
+class QuoteProvider(ABC):
+    """
+    Um provedor de cotações: como pedir e como ler a cotação de um ticker
+    Cada provedor tem o próprio mapeamento de tickers (B3 -> símbolo da API).
+    """
+    name = ""
+    ticker_mapping: Dict[str, str] = {}
+
+    def __init__(self, base_url: str, api_key: str):
+        self.base_url = base_url.rstrip("/")
+        self.api_key = api_key
+        # Transporte httpx opcional (ex.: ASGITransport apontando para um stub nos benchmarks/testes)
+        self.transport: Optional["httpx.AsyncBaseTransport"] = None
+        self.stats = ProviderStats()
+
+    def api_ticker(self, ticker: str) -> str:
+        # Remove .SA se vier com ele
+        clean_ticker = ticker.upper().replace(".SA", "")
+        return self.ticker_mapping.get(clean_ticker, clean_ticker)
+
+    def api_failure(self, data) -> Optional[str]:
+        """Mensagem de erro se o corpo de uma resposta 200 indica falha do provedor (conta no circuito)"""
+        return None
+    
+    @abstractmethod
+    def quote_request(self, ticker: str) -> Tuple[str, Dict]:
+        """(caminho, query string) da cotação"""
+
+    @abstractmethod
+    def parse_quote(self, ticker: str, data: Dict) -> Dict:
+        """Corpo da resposta -> cotação no formato do serviço (levanta ProviderError)"""
+
+
+class TwelveDataProvider(QuoteProvider):
+    name = "twelvedata"
+    # Formato correto: PETR4, VALE3 (sem .SA)
+    ticker_mapping = {
+        "PETR4": "PETR4",
+        "PETR3": "PETR3",
+        "VALE3": "VALE3",
+        "VALE5": "VALE5",
+        "ITUB4": "ITUB4",
+        "ITUB3": "ITUB3",
+        "BBDC4": "BBDC4",
+        "BBDC3": "BBDC3",
+        "MGLU3": "MGLU3",
+        "B3SA3": "B3SA3",
+        "WEGE3": "WEGE3",
+        "RENT3": "RENT3",
+        "ABEV3": "ABEV3",
+        "BBAS3": "BBAS3",
+    }
+
+    def api_failure(self, data) -> Optional[str]:
+        # Limite de requisições e erros internos também vêm com status 200 e {"code": ...}
+        code = data.get("code") if isinstance(data, dict) else None
+        if isinstance(code, int) and (code == 429 or code >= 500):
+            return f"API error {code}: {data.get('message', 'Unknown error')}"
+        return None
+    
+    def quote_request(self, ticker: str) -> Tuple[str, Dict]:
+        return "quote", {"symbol": self.api_ticker(ticker), "apikey": self.api_key}
+
+    def parse_quote(self, ticker: str, data: Dict) -> Dict:
+        # Erros da API vêm com status 200 e {"code": ...}
+        if "code" in data and data["code"] != 200:
+            UPSTREAM_ERRORS.labels(self.name, "quote", "api_error").inc()
+            raise ProviderError(f"API error: {data.get('message', 'Unknown error')}")
+        if "close" not in data and "price" not in data:
+            raise ProviderError("dados incompletos")
+        return {
+            "ticker": ticker,
+            "price": float(data.get("close", data.get("price", 0))),
+            "volume": int(float(data.get("volume", 0))),
+            "change_percent": float(data.get("percent_change", 0)),
+        }
+
+
+class BrapiProvider(QuoteProvider):
+    """brapi.dev: API brasileira, sem o sufixo .SA e com o token opcional"""
+    name = "brapi"
+    # Ativos que a brapi só conhece pelo código atual
+    ticker_mapping = {
+        "VALE5": "VALE3",
+    }
+
+    def quote_request(self, ticker: str) -> Tuple[str, Dict]:
+        params = {"token": self.api_key} if self.api_key else {}
+        return f"quote/{self.api_ticker(ticker)}", params
+
+    def parse_quote(self, ticker: str, data: Dict) -> Dict:
+        if data.get("error"):
+            UPSTREAM_ERRORS.labels(self.name, "quote", "api_error").inc()
+            raise ProviderError(f"API error: {data.get('message', 'Unknown error')}")
+        results = data.get("results") or []
+        if not results or results[0].get("regularMarketPrice") is None:
+            raise ProviderError("dados incompletos")
+        item = results[0]
+        return {
+            "ticker": ticker,
+            "price": float(item["regularMarketPrice"]),
+            "volume": int(item.get("regularMarketVolume") or 0),
+            "change_percent": float(item.get("regularMarketChangePercent") or 0),
+        }
+
+
+PROVIDER_TYPES = {
+    TwelveDataProvider.name: lambda: TwelveDataProvider(settings.TWELVE_DATA_BASE_URL, settings.TWELVE_DATA_API_KEY),
+    BrapiProvider.name: lambda: BrapiProvider(settings.BRAPI_BASE_URL, settings.BRAPI_API_KEY),
+}
+
+
 class MarketDataService:
-    """Serviço para buscar dados de mercado com cache e fallbacks"""
+    """
+    Serviço para buscar dados de mercado com cache, hedge e failover entre provedores
+    
+    Cotações: o provedor principal é sorteado com peso pela saúde de cada um;
+    se ele passar do próprio p95 sem responder, a mesma cotação é pedida ao
+    próximo provedor e vale a primeira resposta boa. Erro em um provedor
+    passa direto para o próximo. Intraday e busca de tickers são só da Twelve Data.
+    """
     
     def __init__(self):
-        self.api_key = settings.TWELVE_DATA_API_KEY
-        self.base_url = "https://api.twelvedata.com"
         self.timeout = 10.0
+        self.twelvedata = TwelveDataProvider(settings.TWELVE_DATA_BASE_URL, settings.TWELVE_DATA_API_KEY)
+        self.providers: List[QuoteProvider] = []
+        for name in settings.MARKET_DATA_PROVIDERS:
+            if name == TwelveDataProvider.name:
+                self.providers.append(self.twelvedata)
+            elif name in PROVIDER_TYPES:
+                self.providers.append(PROVIDER_TYPES[name]())
+            else:
+                logger.warning(f"⚠️ Provedor de cotações desconhecido: {name}")
+        # Sem nenhum provedor respondendo, só usa mock se configurado (desenvolvimento)
+        self.mock_fallback = settings.MARKET_DATA_MOCK_FALLBACK
+        self.random = random.Random()
+        # Um circuit breaker por (provedor, endpoint), criado na primeira chamada
+        self.breakers: Dict[Tuple[str, str], CircuitBreaker] = {}
+    
+    def _client(self, provider: QuoteProvider) -> "httpx.AsyncClient":
+        import httpx
+        return httpx.AsyncClient(timeout=self.timeout, transport=provider.transport)
+    
+    def breaker(self, provider: QuoteProvider, endpoint: str) -> CircuitBreaker:
+        key = (provider.name, endpoint)
+        breaker = self.breakers.get(key)
+        if breaker is None:
+            breaker = self.breakers[key] = CircuitBreaker(
+                provider.name, endpoint,
+                failure_threshold=settings.CIRCUIT_FAILURE_THRESHOLD,
+                recovery_seconds=settings.CIRCUIT_RECOVERY_SECONDS,
+                half_open_probes=settings.CIRCUIT_HALF_OPEN_PROBES
+            )
+        return breaker
+    
+    async def _request(self, client: "httpx.AsyncClient", provider: QuoteProvider, endpoint: str,
+                       params: dict, path: Optional[str] = None):
+        """
+        GET no endpoint do provedor registrando latência e erros; devolve o JSON da resposta
+        Com o circuito aberto levanta CircuitOpenError sem fazer a chamada;
+        status != 200 ou erro da API no corpo levantam ProviderError.
+        """
+        import httpx
+        breaker = self.breaker(provider, endpoint)
+        if not breaker.allow():
+            UPSTREAM_ERRORS.labels(provider.name, endpoint, "circuit_open").inc()
+            raise CircuitOpenError(f"circuito {provider.name}/{endpoint} aberto")
         
-        # Mapeamento de tickers brasileiros
-        # Formato correto: PETR4, VALE3 (sem .SA)
-        self.ticker_mapping = {
-            "PETR4": "PETR4",
-            "PETR3": "PETR3", 
-            "VALE3": "VALE3",
-            "VALE5": "VALE5",
-            "ITUB4": "ITUB4",
-            "ITUB3": "ITUB3",
-            "BBDC4": "BBDC4",
-            "BBDC3": "BBDC3",
-            "MGLU3": "MGLU3",
-            "B3SA3": "B3SA3",
-            "WEGE3": "WEGE3",
-            "RENT3": "RENT3",
-            "ABEV3": "ABEV3",
-            "BBAS3": "BBAS3",
-        }
+        started = time.perf_counter()
+        try:
+            response = await client.get(f"{provider.base_url}/{path or endpoint}", params=params)
+        except httpx.TimeoutException:
+            UPSTREAM_ERRORS.labels(provider.name, endpoint, "timeout").inc()
+            breaker.record_failure()
+            raise
+        except Exception:
+            UPSTREAM_ERRORS.labels(provider.name, endpoint, "error").inc()
+            breaker.record_failure()
+            raise
+        except BaseException:
+            # Cancelada (hedge decidido por outro provedor): não conta nem como falha nem como sucesso
+            breaker.release()
+            raise
+        finally:
+            UPSTREAM_DURATION.labels(provider.name, endpoint).observe(time.perf_counter() - started)
+        
+        if response.status_code != 200:
+            UPSTREAM_ERRORS.labels(provider.name, endpoint, f"http_{response.status_code}").inc()
+            if response.status_code >= 500 or response.status_code == 429:
+                breaker.record_failure()
+            else:
+                # 4xx (ex.: ticker desconhecido) é problema da chamada, não do provedor
+                breaker.record_success()
+            raise ProviderError(f"status {response.status_code}")
+        
+        try:
+            data = response.json()
+        except ValueError:
+            UPSTREAM_ERRORS.labels(provider.name, endpoint, "invalid_json").inc()
+            breaker.record_failure()
+            raise ProviderError("resposta não é JSON")
+        
+        failure = provider.api_failure(data)
+        if failure:
+            UPSTREAM_ERRORS.labels(provider.name, endpoint, "api_error").inc()
+            breaker.record_failure()
+            raise ProviderError(failure)
+        breaker.record_success()
+        return data
     
     def get_api_ticker(self, ticker: str) -> str:
-        """Converte ticker BR para formato da API"""
-        # Remove .SA se vier com ele
-        clean_ticker = ticker.replace(".SA", "")
-        return self.ticker_mapping.get(clean_ticker, clean_ticker)
+        """Converte ticker BR para formato da API (Twelve Data)"""
+        return self.twelvedata.api_ticker(ticker)
+    
+    def _provider_order(self) -> List[QuoteProvider]:
+        """Principal sorteado pelo peso de saúde; os demais, do mais saudável ao menos"""
+        if len(self.providers) < 2:
+            return list(self.providers)
+        weights = [provider.stats.weight() for provider in self.providers]
+        primary = self.random.choices(self.providers, weights=weights)[0]
+        others = sorted(
+            (provider for provider in self.providers if provider is not primary),
+            key=lambda provider: provider.stats.weight(), reverse=True
+        )
+        return [primary, *others]
+    
+    def _record(self, provider: QuoteProvider, elapsed: Optional[float]):
+        """elapsed None = falha"""
+        if elapsed is None:
+            provider.stats.record_failure()
+        else:
+            provider.stats.record_success(elapsed)
+        MARKET_DATA_PROVIDER_HEALTH.labels(provider.name).set(provider.stats.health)
+    
+    def _record_hedge_losses(self, tasks: Dict[asyncio.Task, QuoteProvider], launched: Dict[asyncio.Task, float]):
+        """
+        Quem ainda não respondeu quando outro ganhou o hedge é cancelado;
+        o tempo até ali entra no p95 (é um piso) e a saúde cai um pouco
+        """
+        now = time.perf_counter()
+        for task, provider in tasks.items():
+            provider.stats.record_hedge_loss(now - launched[task])
+            MARKET_DATA_PROVIDER_HEALTH.labels(provider.name).set(provider.stats.health)
+    
+    async def _quote_from(self, provider: QuoteProvider, ticker: str) -> Optional[Dict]:
+        """Cotação de um provedor; None (e falha na saúde dele) se não deu certo"""
+        started = time.perf_counter()
+        try:
+            path, params = provider.quote_request(ticker)
+            async with self._client(provider) as client:
+                data = await self._request(client, provider, "quote", params, path=path)
+                quote = provider.parse_quote(ticker, data)
+        except CircuitOpenError:
+            # Já contado no circuito; passa direto para o próximo provedor
+            logger.debug("🔌 %s com circuito aberto, pulando %s", provider.name, ticker)
+            return None
+        except Exception as e:
+            logger.warning(f"⚠️ {provider.name} falhou para {ticker}: {e!r}")
+            self._record(provider, None)
+            return None
+        
+        self._record(provider, time.perf_counter() - started)
+        quote["timestamp"] = datetime.utcnow().isoformat()
+        quote["_provider"] = provider.name
+        return quote
+    
+    async def _fetch_quote(self, ticker: str) -> Optional[Dict]:
+        """
+        Pede ao principal; passado o p95 dele (ou em caso de erro), pede ao
+        próximo sem cancelar o primeiro. Devolve a primeira cotação boa.
+        """
+        order = self._provider_order()
+        if not order:
+            return None
+        
+        hedge_delay = order[0].stats.hedge_delay(self.timeout)
+        remaining = order[1:]
+        tasks: Dict[asyncio.Task, QuoteProvider] = {}
+        launched: Dict[asyncio.Task, float] = {}
+        
+        def launch(provider: QuoteProvider):
+            task = asyncio.create_task(self._quote_from(provider, ticker))
+            tasks[task] = provider
+            launched[task] = time.perf_counter()
+        
+        launch(order[0])
+        try:
+            while tasks:
+                done, _ = await asyncio.wait(
+                    tasks, timeout=hedge_delay if remaining else None, return_when=asyncio.FIRST_COMPLETED
+                )
+                if not done:
+                    # Mais lento que o p95: hedge no próximo provedor
+                    provider = remaining.pop(0)
+                    MARKET_DATA_HEDGES.labels(provider.name, "launched").inc()
+                    launch(provider)
+                    continue
+                
+                for task in done:
+                    provider = tasks.pop(task)
+                    quote = task.result()
+                    if quote is not None:
+                        if provider is not order[0]:
+                            MARKET_DATA_HEDGES.labels(provider.name, "won").inc()
+                        self._record_hedge_losses(tasks, launched)
+                        return quote
+                
+                # Falhou: failover imediato
+                if remaining:
+                    launch(remaining.pop(0))
+            return None
+        finally:
+            for task in tasks:
+                task.cancel()
     
     async def get_quote(self, ticker: str) -> Optional[Dict]:
         """
         Busca cotação de um ativo com cache e tratamento de erros
         
-        Retorna:
+        Retorna (ou None se nenhum provedor respondeu):
         {
             "ticker": str,
             "price": float,
@@ -58,69 +523,53 @@ class MarketDataService:
             cache_key = f"quote:{ticker}"
             cached = cache_get(cache_key)
             if cached:
-                logger.info(f"📦 Cache hit para {ticker}")
+                _CACHE_HIT.inc()
+                logger.debug("📦 Cache hit para %s", ticker)
+                cached["_source"] = "cache"
                 return cached
             
-            # Busca dados da API
-            api_ticker = self.get_api_ticker(ticker)
+            _CACHE_MISS.inc()
             
-            logger.info(f"🔄 Buscando cotação para {ticker} (API: {api_ticker})")
+            logger.debug("🔄 Buscando cotação para %s", ticker)
+            result = await self._fetch_quote(ticker)
             
-            async with httpx.AsyncClient(timeout=self.timeout) as client:
-                response = await client.get(
-                    f"{self.base_url}/quote",
-                    params={
-                        "symbol": api_ticker,
-                        "apikey": self.api_key
-                    }
-                )
-                
-                if response.status_code != 200:
-                    logger.error(f"❌ API retornou status {response.status_code} para {ticker}")
-                    return self._get_mock_data(ticker)
-                
-                data = response.json()
-                
-                # Verifica se há erro na resposta
-                if "code" in data and data["code"] != 200:
-                    logger.warning(f"⚠️ API error para {ticker}: {data.get('message', 'Unknown error')}")
-                    logger.warning(f"⚠️ Response: {data}")
-                    return self._get_mock_data(ticker)
-                
-                # Valida e formata dados
-                if "close" not in data and "price" not in data:
-                    logger.warning(f"⚠️ Dados incompletos para {ticker}")
-                    return self._get_mock_data(ticker)
-                
-                result = {
-                    "ticker": ticker,
-                    "price": float(data.get("close", data.get("price", 0))),
-                    "volume": int(data.get("volume", 0)),
-                    "change_percent": float(data.get("percent_change", 0)),
-                    "timestamp": datetime.utcnow().isoformat()
-                }
-                
-                # Salva no cache por 60 segundos
-                cache_set(cache_key, result, expire=60)
-                
-                logger.info(f"✅ Cotação obtida: {ticker} = R$ {result['price']:.2f}")
-                return result
-                
-        except httpx.TimeoutException:
-            logger.error(f"⏱️ Timeout ao buscar {ticker}")
-            return self._get_mock_data(ticker)
+            if result is None:
+                logger.error(f"❌ Nenhum provedor retornou cotação para {ticker}")
+                return self._get_mock_data(ticker) if self.mock_fallback else None
+            
+            # Salva no cache por 60 segundos
+            cache_set(cache_key, result, expire=60)
+            
+            logger.debug("✅ Cotação obtida (%s): %s = R$ %.2f", result["_provider"], ticker, result['price'])
+            result["_source"] = "upstream"
+            return result
         
         except Exception as e:
             logger.error(f"❌ Erro ao buscar cotação de {ticker}: {e}")
-            return self._get_mock_data(ticker)
+            return self._get_mock_data(ticker) if self.mock_fallback else None
+    
+    def provider_stats(self) -> Dict:
+        """Saúde, p95 e circuitos de cada provedor (para o monitoramento)"""
+        stats = {}
+        providers = [self.twelvedata, *(p for p in self.providers if p is not self.twelvedata)]
+        for provider in providers:
+            circuits = {
+                endpoint: breaker.snapshot()
+                for (name, endpoint), breaker in self.breakers.items()
+                if name == provider.name
+            }
+            stats[provider.name] = {
+                **provider.stats.snapshot(),
+                "active": provider in self.providers,
+                "circuits": circuits,
+            }
+        return stats
     
     def _get_mock_data(self, ticker: str) -> Dict:
         """
         Retorna dados mockados para desenvolvimento/testes
-        Em produção, você pode remover isso ou buscar de uma API alternativa
+        Só usado com MARKET_DATA_MOCK_FALLBACK=true (ex.: chave "demo" da Twelve Data)
         """
-        import random
-        
         # Dados base fictícios
         base_prices = {
             "PETR4": 38.50,
@@ -139,7 +588,7 @@ class MarketDataService:
         variation = random.uniform(-0.05, 0.05)
         current_price = base_price * (1 + variation)
         
-        logger.warning(f"⚠️ Usando dados mockados para {ticker}")
+        logger.debug("⚠️ Usando dados mockados para %s", ticker)
         
         return {
             "ticker": ticker,
@@ -147,43 +596,46 @@ class MarketDataService:
             "volume": random.randint(1000000, 50000000),
             "change_percent": round(variation * 100, 2),
             "timestamp": datetime.utcnow().isoformat(),
-            "_mock": True  # Indica que são dados mockados
+            "_mock": True,  # Indica que são dados mockados
+            "_source": "mock"
         }
     
-    async def get_intraday(self, ticker: str, interval: str = "5min") -> Optional[Dict]:
+    async def get_intraday(self, ticker: str, interval: str = "5min", outputsize: int = 30) -> Optional[Dict]:
         """
         Busca dados intraday (para gráficos)
         
         Intervalos: 1min, 5min, 15min, 30min, 45min, 1h
         """
+        provider = self.twelvedata
         try:
-            api_ticker = self.get_api_ticker(ticker)
-            
-            async with httpx.AsyncClient(timeout=self.timeout) as client:
-                response = await client.get(
-                    f"{self.base_url}/time_series",
+            async with self._client(provider) as client:
+                data = await self._request(
+                    client,
+                    provider,
+                    "time_series",
                     params={
-                        "symbol": api_ticker,
+                        "symbol": provider.api_ticker(ticker),
                         "interval": interval,
-                        "apikey": self.api_key,
-                        "outputsize": 30  # Últimos 30 pontos
+                        "apikey": provider.api_key,
+                        "outputsize": outputsize  # Últimos N pontos
                     }
                 )
                 
-                if response.status_code != 200:
-                    return None
-                
-                data = response.json()
-                
                 if "values" not in data:
                     return None
                 
                 return {
                     "ticker": ticker,
                     "interval": interval,
+                    # Horários dos pontos são no fuso da bolsa
+                    "timezone": data.get("meta", {}).get("exchange_timezone"),
                     "values": data["values"]
                 }
-                
+        
+        except ProviderError as e:
+            # Já contado nas métricas e no circuito
+            logger.debug("🔌 Intraday de %s indisponível: %s", ticker, e)
+            return None
         except Exception as e:
             logger.error(f"❌ Erro ao buscar dados intraday de {ticker}: {e}")
             return None
@@ -193,21 +645,19 @@ class MarketDataService:
         Busca tickers por nome ou código
         Útil para autocompletar
         """
+        provider = self.twelvedata
         try:
-            async with httpx.AsyncClient(timeout=self.timeout) as client:
-                response = await client.get(
-                    f"{self.base_url}/symbol_search",
+            async with self._client(provider) as client:
+                data = await self._request(
+                    client,
+                    provider,
+                    "symbol_search",
                     params={
                         "symbol": query,
-                        "apikey": self.api_key
+                        "apikey": provider.api_key
                     }
                 )
                 
-                if response.status_code != 200:
-                    return []
-                
-                data = response.json()
-                
                 # Filtra apenas ações brasileiras (.SA)
                 results = [
                     {
@@ -220,10 +670,12 @@ class MarketDataService:
                 ]
                 
                 return results[:10]  # Top 10 resultados
-                
+        
+        except ProviderError:
+            return []
         except Exception as e:
             logger.error(f"❌ Erro ao buscar tickers: {e}")
             return []
 
 # Instância global do serviço
-market_data_service = MarketDataService()
\ No newline at end of file
+market_data_service = MarketDataService()
@@ -0,0 +1,268 @@
+"""
+Outbox transacional de notificações
+
+O disparo grava uma linha por alerta no mesmo commit que marca o alerta
+como disparado, então um crash entre o disparo e o envio não perde o aviso.
+O drain reivindica lotes (FOR UPDATE SKIP LOCKED no Postgres), agrupa as
+linhas por destinatário em resumos, envia e marca como enviadas; falhas
+voltam para a fila com backoff exponencial até MAX_ATTEMPTS.
+
+Reivindicar uma linha empurra next_attempt_at para frente (lease): se o
+worker morrer no meio do envio, a linha volta sozinha depois do lease.
+A chave de idempotência impede linhas duplicadas para o mesmo disparo e
+segue no custom_args do SendGrid para deduplicar eventos de entrega.
+"""
+
+import asyncio
+import logging
+import random
+from collections import defaultdict
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from typing import Dict, Iterable, List
+
+from sqlalchemy import delete, func, insert, select, update
+from sqlalchemy.orm import Session
+
+from ..core.database import SessionLocal
+from ..core.metrics import NOTIFICATION_QUEUE_DEPTH, NOTIFICATIONS
+from ..models.outbox import NotificationOutbox
+from .email_templates import MAX_DIGEST_ROWS, AlertNotice
+from .notification import notification_service
+
+logger = logging.getLogger(__name__)
+
+# Linhas por lote reivindicado e lotes por execução do drain
+OUTBOX_BATCH = 500
+MAX_BATCHES_PER_DRAIN = 20
+# Tempo que uma linha reivindicada fica invisível para outros workers
+LEASE_SECONDS = 120
+MAX_ATTEMPTS = 8
+BACKOFF_BASE_SECONDS = 30
+BACKOFF_MAX_SECONDS = 3600
+# Linhas enviadas ou esgotadas ficam esse tempo para auditoria
+RETENTION_DAYS = 7
+
+_sent = NOTIFICATIONS.labels("sent")
+_retry = NOTIFICATIONS.labels("retry")
+_failed = NOTIFICATIONS.labels("failed")
+
+
+@dataclass
+class ClaimedNotification:
+    id: int
+    idempotency_key: str
+    to_email: str
+    payload: Dict
+    attempts: int
+
+
+def idempotency_key(alert_id: int, triggered_at: datetime) -> str:
+    """Uma chave por disparo: o mesmo alerta reativado e disparado de novo gera outra"""
+    return f"alert-{alert_id}-{triggered_at.strftime('%Y%m%d%H%M%S%f')}"
+
+
+def enqueue(db: Session, rows: Iterable[Dict]):
+    """
+    Acumula as notificações na sessão; o commit é de quem chamou, junto com o disparo
+    Cada linha: idempotency_key, user_id, alert_id, to_email, payload.
+    Chaves repetidas são ignoradas (ON CONFLICT DO NOTHING em Postgres e SQLite).
+    """
+    rows = [
+        {"status": "pending", "attempts": 0, "next_attempt_at": datetime.utcnow(), **row}
+        for row in rows
+    ]
+    if not rows:
+        return
+
+    dialect = db.get_bind().dialect.name
+    if dialect == "postgresql":
+        from sqlalchemy.dialects.postgresql import insert as dialect_insert
+    elif dialect == "sqlite":
+        from sqlalchemy.dialects.sqlite import insert as dialect_insert
+    else:
+        db.execute(insert(NotificationOutbox), rows)
+        return
+
+    stmt = dialect_insert(NotificationOutbox).on_conflict_do_nothing(index_elements=["idempotency_key"])
+    db.execute(stmt, rows)
+
+
+def backoff(attempts: int) -> timedelta:
+    """Exponencial com jitter de ±20% para os workers não baterem juntos"""
+    seconds = min(BACKOFF_MAX_SECONDS, BACKOFF_BASE_SECONDS * 2 ** max(0, attempts - 1))
+    return timedelta(seconds=seconds * random.uniform(0.8, 1.2))
+
+
+def claim_batch(db: Session, limit: int = OUTBOX_BATCH) -> List[ClaimedNotification]:
+    """
+    Reivindica até `limit` linhas vencidas e já faz o commit do lease
+    SKIP LOCKED deixa vários workers drenarem em paralelo sem pegar a mesma
+    linha; no SQLite (um escritor só) a cláusula é ignorada.
+    """
+    now = datetime.utcnow()
+    rows = db.execute(
+        select(
+            NotificationOutbox.id,
+            NotificationOutbox.idempotency_key,
+            NotificationOutbox.to_email,
+            NotificationOutbox.payload,
+            NotificationOutbox.attempts
+        )
+        .where(NotificationOutbox.status == "pending", NotificationOutbox.next_attempt_at <= now)
+        .order_by(NotificationOutbox.next_attempt_at, NotificationOutbox.id)
+        .limit(limit)
+        .with_for_update(skip_locked=True)
+    ).all()
+    if not rows:
+        db.rollback()
+        return []
+
+    db.execute(
+        update(NotificationOutbox)
+        .where(NotificationOutbox.id.in_([row.id for row in rows]))
+        .values(
+            next_attempt_at=now + timedelta(seconds=LEASE_SECONDS),
+            attempts=NotificationOutbox.attempts + 1
+        )
+    )
+    db.commit()
+    return [
+        ClaimedNotification(row.id, row.idempotency_key, row.to_email, row.payload, row.attempts + 1)
+        for row in rows
+    ]
+
+
+def _record_results(db: Session, claimed: List[ClaimedNotification], accepted: Iterable[str]) -> int:
+    """Marca enviadas, reagenda com backoff ou desiste depois de MAX_ATTEMPTS; retorna as enviadas"""
+    accepted = set(accepted)
+    now = datetime.utcnow()
+    sent_ids = []
+    failed_ids = []
+    # Mesmo número de tentativas = mesmo backoff: um UPDATE por grupo
+    retries: Dict[int, List[int]] = defaultdict(list)
+    for item in claimed:
+        if item.to_email in accepted:
+            sent_ids.append(item.id)
+        elif item.attempts >= MAX_ATTEMPTS:
+            failed_ids.append(item.id)
+        else:
+            retries[item.attempts].append(item.id)
+
+    if sent_ids:
+        db.execute(
+            update(NotificationOutbox)
+            .where(NotificationOutbox.id.in_(sent_ids))
+            .values(status="sent", sent_at=now, last_error=None)
+        )
+    if failed_ids:
+        db.execute(
+            update(NotificationOutbox)
+            .where(NotificationOutbox.id.in_(failed_ids))
+            .values(status="failed", last_error="Envio recusado: tentativas esgotadas")
+        )
+        logger.error("❌ %d notificações desistidas após %d tentativas", len(failed_ids), MAX_ATTEMPTS)
+    for attempts, ids in retries.items():
+        db.execute(
+            update(NotificationOutbox)
+            .where(NotificationOutbox.id.in_(ids))
+            .values(next_attempt_at=now + backoff(attempts), last_error="Envio recusado pelo SendGrid")
+        )
+    db.commit()
+
+    _sent.inc(len(sent_ids))
+    _failed.inc(len(failed_ids))
+    _retry.inc(sum(len(ids) for ids in retries.values()))
+    return len(sent_ids)
+
+
+def _deliver(claimed: List[ClaimedNotification]) -> List[str]:
+    """Agrupa as linhas por destinatário e envia os resumos; retorna os emails aceitos"""
+    # Alertas repetidos do mesmo usuário viram uma linha só (dict como conjunto ordenado)
+    digests: Dict[str, Dict[AlertNotice, None]] = defaultdict(dict)
+    keys: Dict[str, List[str]] = defaultdict(list)
+    for item in claimed:
+        digests[item.to_email][AlertNotice(**item.payload)] = None
+        keys[item.to_email].append(item.idempotency_key)
+
+    accepted = notification_service.send_digests(
+        {email: list(notices) for email, notices in digests.items()},
+        # custom_args tem limite de 10 KB: as chaves além das linhas do resumo ficam só na contagem
+        custom_args={
+            email: {"outbox_keys": ",".join(items[:MAX_DIGEST_ROWS]), "outbox_count": str(len(items))}
+            for email, items in keys.items()
+        }
+    )
+    if not notification_service.client:
+        # Modo log: o log já é a entrega
+        return list(digests)
+    return accepted
+
+
+async def drain_outbox() -> int:
+    """Job periódico (e acordado depois de cada disparo): envia o que estiver pendente"""
+    delivered = 0
+    try:
+        for _ in range(MAX_BATCHES_PER_DRAIN):
+            db = SessionLocal()
+            try:
+                claimed = claim_batch(db)
+                if not claimed:
+                    break
+                # Chamadas HTTP ao SendGrid ficam fora do event loop
+                accepted = await asyncio.to_thread(_deliver, claimed)
+                delivered += _record_results(db, claimed, accepted)
+            finally:
+                db.close()
+        NOTIFICATION_QUEUE_DEPTH.set(pending_count())
+    except Exception as e:
+        logger.error(f"❌ Erro ao drenar outbox de notificações: {e}")
+    if delivered:
+        logger.debug("📬 Outbox: %d notificações entregues", delivered)
+    return delivered
+
+
+def pending_count() -> int:
+    db = SessionLocal()
+    try:
+        return db.scalar(
+            select(func.count()).select_from(NotificationOutbox).where(NotificationOutbox.status == "pending")
+        )
+    finally:
+        db.close()
+
+
+def outbox_stats(db: Session) -> Dict:
+    counts = dict(
+        db.query(NotificationOutbox.status, func.count()).group_by(NotificationOutbox.status).all()
+    )
+    oldest = db.query(func.min(NotificationOutbox.created_at)).filter(
+        NotificationOutbox.status == "pending"
+    ).scalar()
+    return {
+        "pending": counts.get("pending", 0),
+        "sent": counts.get("sent", 0),
+        "failed": counts.get("failed", 0),
+        "oldest_pending": oldest.isoformat() if oldest else None
+    }
+
+
+def purge_outbox():
+    """Job periódico: remove linhas enviadas ou esgotadas mais antigas que RETENTION_DAYS"""
+    db = SessionLocal()
+    try:
+        cutoff = datetime.utcnow() - timedelta(days=RETENTION_DAYS)
+        result = db.execute(
+            delete(NotificationOutbox).where(
+                NotificationOutbox.status.in_(("sent", "failed")),
+                NotificationOutbox.created_at < cutoff
+            )
+        )
+        db.commit()
+        if result.rowcount:
+            logger.info("🧹 Outbox: %d notificações antigas removidas", result.rowcount)
+    except Exception as e:
+        logger.error(f"❌ Erro ao limpar outbox: {e}")
+        db.rollback()
+    finally:
+        db.close()
@@ -0,0 +1,110 @@
+"""
+Contagem de alertas ativos por ticker mantida em memória
+Atualizada na criação, remoção e disparo de alertas; o GROUP BY no banco
+fica apenas para reconstruir (periodicamente ou após invalidação) e como fallback.
+"""
+
+import heapq
+import logging
+import threading
+import time
+from typing import Dict, List, Optional, Tuple
+from sqlalchemy import func
+from sqlalchemy.orm import Session
+
+from ..models.alert import Alert
+
+logger = logging.getLogger(__name__)
+
+# Maior K servido pela visão ordenada em cache
+MAX_TOP_K = 50
+
+
+def query_top_tickers(db: Session, k: int) -> List[Tuple[str, int]]:
+    """Top-K direto no banco (GROUP BY)"""
+    rows = db.query(
+        Alert.ticker,
+        func.count().label('count')
+    ).filter(
+        Alert.is_active == True
+    ).group_by(Alert.ticker).order_by(
+        func.count().desc()
+    ).limit(k).all()
+    return [(ticker, count) for ticker, count in rows]
+
+
+class TickerPopularity:
+    """Contador por ticker com visão top-K ordenada e recalculada só quando muda"""
+
+    def __init__(self, rebuild_interval: int = 300):
+        # Outros workers também escrevem no banco; reconstruímos periodicamente
+        self.rebuild_interval = rebuild_interval
+        self._counts: Dict[str, int] = {}
+        self._top: Optional[List[Tuple[str, int]]] = None
+        self._loaded_at: Optional[float] = None
+        self._lock = threading.Lock()
+
+    def _is_stale(self) -> bool:
+        return self._loaded_at is None or time.monotonic() - self._loaded_at > self.rebuild_interval
+
+    def rebuild(self, db: Session):
+        """Recarrega todas as contagens a partir do banco"""
+        rows = db.query(
+            Alert.ticker,
+            func.count()
+        ).filter(
+            Alert.is_active == True
+        ).group_by(Alert.ticker).all()
+
+        with self._lock:
+            self._counts = {ticker: count for ticker, count in rows}
+            self._top = None
+            self._loaded_at = time.monotonic()
+
+        logger.debug(f"Popularidade reconstruída: {len(rows)} tickers")
+
+    def invalidate(self):
+        """Força reconstrução na próxima leitura"""
+        with self._lock:
+            self._loaded_at = None
+            self._top = None
+
+    def apply(self, deltas: Dict[str, int]):
+        """Aplica variações por ticker (ex.: {"PETR4": +3, "VALE3": -1}) de uma só vez"""
+        with self._lock:
+            # Sem contagem carregada, a próxima leitura reconstrói do banco
+            if self._loaded_at is None:
+                return
+            for ticker, delta in deltas.items():
+                count = self._counts.get(ticker, 0) + delta
+                if count > 0:
+                    self._counts[ticker] = count
+                else:
+                    self._counts.pop(ticker, None)
+            self._top = None
+
+    def increment(self, ticker: str, n: int = 1):
+        self.apply({ticker: n})
+
+    def decrement(self, ticker: str, n: int = 1):
+        self.apply({ticker: -n})
+
+    def top(self, db: Session, k: int = 10) -> List[Tuple[str, int]]:
+        """Retorna os K tickers com mais alertas ativos"""
+        if k > MAX_TOP_K:
+            return query_top_tickers(db, k)
+
+        if self._is_stale():
+            self.rebuild(db)
+
+        top = self._top
+        if top is None:
+            with self._lock:
+                top = heapq.nlargest(MAX_TOP_K, self._counts.items(), key=lambda item: item[1])
+                self._top = top
+
+        return top[:k]
+
+
+# Instância global
+ticker_popularity = TickerPopularity()
@@ -0,0 +1,92 @@
+"""
+Manutenção incremental dos rollups diários de alertas.
+As funções apenas acumulam os incrementos na sessão; o commit
+fica a cargo de quem chamou, junto com a escrita do próprio alerta.
+"""
+
+from datetime import date, datetime
+from typing import Dict, Optional, Tuple
+from sqlalchemy.orm import Session
+
+from ..models.rollup import AlertDailyRollup
+
+# {(user_id, day, alert_type): (created, triggered)}
+RollupIncrements = Dict[Tuple[int, date, str], Tuple[int, int]]
+
+
+def _day(when: Optional[datetime]) -> date:
+    return (when or datetime.utcnow()).date()
+
+
+def record_created(db: Session, user_id: int, alert_type: str, when: Optional[datetime] = None, count: int = 1):
+    """Contabiliza alertas criados no dia"""
+    apply_increments(db, {(user_id, _day(when), alert_type): (count, 0)})
+
+
+def record_triggered(db: Session, user_id: int, alert_type: str, when: Optional[datetime] = None, count: int = 1):
+    """Contabiliza alertas disparados no dia"""
+    apply_increments(db, {(user_id, _day(when), alert_type): (0, count)})
+
+
+def merge_increments(target: RollupIncrements, user_id: int, alert_type: str,
+                     when: Optional[datetime] = None, created: int = 0, triggered: int = 0):
+    """Acumula um incremento em memória (útil para operações em lote)"""
+    key = (user_id, _day(when), alert_type)
+    prev_created, prev_triggered = target.get(key, (0, 0))
+    target[key] = (prev_created + created, prev_triggered + triggered)
+
+
+def apply_increments(db: Session, increments: RollupIncrements):
+    """
+    Aplica os incrementos com upsert (um único statement por lote)
+    Em Postgres e SQLite usa ON CONFLICT; nos demais bancos faz UPDATE + INSERT.
+    """
+    if not increments:
+        return
+
+    rows = [
+        {
+            "user_id": user_id,
+            "day": day,
+            "alert_type": alert_type,
+            "created_count": created,
+            "triggered_count": triggered,
+        }
+        for (user_id, day, alert_type), (created, triggered) in increments.items()
+    ]
+
+    dialect = db.get_bind().dialect.name
+    if dialect == "postgresql":
+        from sqlalchemy.dialects.postgresql import insert
+    elif dialect == "sqlite":
+        from sqlalchemy.dialects.sqlite import insert
+    else:
+        _apply_increments_generic(db, rows)
+        return
+
+    stmt = insert(AlertDailyRollup)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=["user_id", "day", "alert_type"],
+        set_={
+            "created_count": AlertDailyRollup.created_count + stmt.excluded.created_count,
+            "triggered_count": AlertDailyRollup.triggered_count + stmt.excluded.triggered_count,
+        }
+    )
+    db.execute(stmt, rows)
+
+
+def _apply_increments_generic(db: Session, rows: list):
+    for row in rows:
+        updated = db.query(AlertDailyRollup).filter(
+            AlertDailyRollup.user_id == row["user_id"],
+            AlertDailyRollup.day == row["day"],
+            AlertDailyRollup.alert_type == row["alert_type"]
+        ).update({
+            AlertDailyRollup.created_count: AlertDailyRollup.created_count + row["created_count"],
+            AlertDailyRollup.triggered_count: AlertDailyRollup.triggered_count + row["triggered_count"],
+        }, synchronize_session=False)
+
+        if not updated:
+            db.add(AlertDailyRollup(**row))
+            db.flush()
+
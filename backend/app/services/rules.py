@@ -0,0 +1,482 @@
+"""
+Regras compostas de alerta (ex.: "PETR4.price < 30 AND PETR4.volume > 10M")
+
+Cada regra é validada e normalizada uma única vez, na criação; o texto
+normalizado (com os tickers explícitos) é o que fica no banco. Na primeira
+vez que o scheduler vê a regra ela vira um plano pós-fixo pequeno sobre
+predicados; planos iguais são compartilhados entre usuários.
+
+Os predicados (ticker, métrica, período, operador, limiar) são internados
+num registro global: cada predicado distinto é avaliado uma vez por ciclo,
+e só quando o valor de entrada mudou. Um índice de dependências liga
+entrada -> predicados -> regras, então só as regras com algum predicado
+alterado são reavaliadas.
+
+Sintaxe:
+    [TICKER.]métrica[(período)] operador número[K|M|B]
+combinadas com AND, OR, NOT e parênteses. Métricas: price, percentage,
+volume, sma, ema, rsi, vwap (mesma semântica dos alertas simples).
+"""
+
+import logging
+import re
+from collections import Counter
+from dataclasses import dataclass
+from decimal import Decimal
+from functools import lru_cache
+from typing import Dict, Iterable, List, Mapping, Optional, Set, Tuple, Union
+
+from .indicators import DEFAULT_PERIODS, INDICATOR_TYPES, MAX_PERIOD, IndicatorKey
+
+logger = logging.getLogger(__name__)
+
+RULE_TYPE = "compound"
+METRICS = ("price", "percentage", "volume", *INDICATOR_TYPES)
+
+MAX_EXPRESSION_LENGTH = 500
+MAX_PREDICATES = 10
+MAX_TICKERS = 5
+
+_SUFFIXES = {"K": 10 ** 3, "M": 10 ** 6, "B": 10 ** 9}
+_KEYWORDS = ("AND", "OR", "NOT")
+
+_TOKEN = re.compile(
+    r"""\s*(?:
+        (?P<number>-?\d+(?:\.\d+)?[kmb]?)(?![\w.])
+      | (?P<name>[a-z][a-z0-9]*(?:\.[a-z]+)?)
+      | (?P<op>>=|<=|>|<)
+      | (?P<lparen>\()
+      | (?P<rparen>\))
+    )""",
+    re.IGNORECASE | re.VERBOSE
+)
+_TICKER = re.compile(r"^[A-Z][A-Z0-9]{1,9}$")
+
+# (ticker, métrica, período)
+InputKey = Tuple[str, str, Optional[int]]
+# (ticker, métrica, período, operador, limiar)
+PredicateKey = Tuple[str, str, Optional[int], str, float]
+
+
+class RuleError(ValueError):
+    """Expressão inválida; a mensagem vai direto para o usuário"""
+
+
+# AST: predicado ou (operador, filhos)
+Node = Union[PredicateKey, Tuple[str, Tuple["Node", ...]]]
+
+
+def _tokenize(text: str) -> List[Tuple[str, str]]:
+    tokens = []
+    position = 0
+    text = text.rstrip()
+    while position < len(text):
+        match = _TOKEN.match(text, position)
+        if not match:
+            raise RuleError(f"Expressão inválida perto de '{text[position:position + 15].strip()}'")
+        kind = match.lastgroup
+        tokens.append((kind, match.group(kind)))
+        position = match.end()
+    return tokens
+
+
+def _parse_number(text: str) -> float:
+    scale = _SUFFIXES.get(text[-1].upper())
+    if scale:
+        # Decimal evita 1.1M virar 1100000.0000000002
+        return float(Decimal(text[:-1]) * scale)
+    return float(text)
+
+
+class _Parser:
+    """Descida recursiva: or -> and -> not -> átomo"""
+
+    def __init__(self, text: str, default_ticker: Optional[str]):
+        self.tokens = _tokenize(text)
+        self.position = 0
+        self.default_ticker = default_ticker
+
+    def peek(self) -> Tuple[Optional[str], Optional[str]]:
+        if self.position < len(self.tokens):
+            return self.tokens[self.position]
+        return None, None
+
+    def take(self, kind: str, message: str) -> str:
+        token_kind, value = self.peek()
+        if token_kind != kind:
+            raise RuleError(message)
+        self.position += 1
+        return value
+
+    def keyword(self, word: str) -> bool:
+        kind, value = self.peek()
+        if kind == "name" and value.upper() == word:
+            self.position += 1
+            return True
+        return False
+
+    def parse(self) -> Node:
+        if not self.tokens:
+            raise RuleError("Expressão vazia")
+        node = self.parse_or()
+        if self.position != len(self.tokens):
+            raise RuleError(f"Trecho inesperado: '{self.peek()[1]}'")
+        return node
+
+    def parse_or(self) -> Node:
+        children = [self.parse_and()]
+        while self.keyword("OR"):
+            children.append(self.parse_and())
+        return _combine("OR", children)
+
+    def parse_and(self) -> Node:
+        children = [self.parse_not()]
+        while self.keyword("AND"):
+            children.append(self.parse_not())
+        return _combine("AND", children)
+
+    def parse_not(self) -> Node:
+        if self.keyword("NOT"):
+            return ("NOT", (self.parse_not(),))
+        return self.parse_atom()
+
+    def parse_atom(self) -> Node:
+        kind, _ = self.peek()
+        if kind == "lparen":
+            self.position += 1
+            node = self.parse_or()
+            self.take("rparen", "Parêntese não fechado")
+            return node
+        return self.parse_predicate()
+
+    def parse_predicate(self) -> PredicateKey:
+        name = self.take("name", "Esperado um predicado como 'price < 30'")
+        if name.upper() in _KEYWORDS:
+            raise RuleError(f"Operador '{name.upper()}' fora de lugar")
+
+        if "." in name:
+            ticker, metric = name.split(".")
+        else:
+            ticker, metric = self.default_ticker, name
+        metric = metric.lower()
+        if metric not in METRICS:
+            raise RuleError(f"Métrica '{metric}' inválida. Use: {', '.join(METRICS)}")
+        if not ticker:
+            raise RuleError(f"Informe o ticker de '{metric}' (ex.: PETR4.{metric})")
+        ticker = ticker.upper()
+        if not _TICKER.match(ticker):
+            raise RuleError(f"Ticker '{ticker}' inválido")
+
+        period = None
+        if self.peek()[0] == "lparen":
+            self.position += 1
+            raw = self.take("number", f"Período de {metric} deve ser um inteiro")
+            self.take("rparen", "Parêntese do período não fechado")
+            if DEFAULT_PERIODS.get(metric) is None:
+                raise RuleError(f"Período só se aplica a: {', '.join(t for t, p in DEFAULT_PERIODS.items() if p)}")
+            if not raw.isdigit() or not 2 <= int(raw) <= MAX_PERIOD:
+                raise RuleError(f"Período deve ser inteiro entre 2 e {MAX_PERIOD}")
+            period = int(raw)
+        elif metric in DEFAULT_PERIODS:
+            period = DEFAULT_PERIODS[metric]
+
+        op = self.take("op", f"Esperado um operador (>, <, >=, <=) depois de {metric}")
+        threshold = _parse_number(self.take("number", f"Esperado um número depois de '{op}'"))
+        return (ticker, metric, period, op, threshold)
+
+
+def _combine(op: str, children: List[Node]) -> Node:
+    """Achata operadores iguais aninhados: (a AND (b AND c)) -> AND(a, b, c)"""
+    if len(children) == 1:
+        return children[0]
+    flat = []
+    for child in children:
+        if _is_group(child) and child[0] == op:
+            flat.extend(child[1])
+        else:
+            flat.append(child)
+    return (op, tuple(flat))
+
+
+def _is_group(node: Node) -> bool:
+    return len(node) == 2
+
+
+def _predicates(node: Node) -> List[PredicateKey]:
+    if not _is_group(node):
+        return [node]
+    return [key for child in node[1] for key in _predicates(child)]
+
+
+def _plain(value: float) -> str:
+    return str(int(value)) if value.is_integer() else repr(value)
+
+
+def _format_number(value: float) -> str:
+    """Volta aos sufixos quando o número é redondo (10000000 -> 10M)"""
+    for suffix, scale in (("B", 1e9), ("M", 1e6), ("K", 1e3)):
+        scaled = value / scale
+        if abs(value) >= scale and round(scaled, 2) == scaled:
+            return f"{_plain(scaled)}{suffix}"
+    return _plain(value)
+
+
+def _render(node: Node, parent: Optional[str] = None) -> str:
+    if not _is_group(node):
+        ticker, metric, period, op, threshold = node
+        suffix = f"({period})" if period is not None else ""
+        return f"{ticker}.{metric}{suffix} {op} {_format_number(threshold)}"
+    op, children = node
+    if op == "NOT":
+        return f"NOT {_render(children[0], op)}"
+    text = f" {op} ".join(_render(child, op) for child in children)
+    # AND liga mais forte que OR: só precisa de parênteses quando o pai é diferente
+    return f"({text})" if parent is not None else text
+
+
+def normalize_rule(expression: str, default_ticker: Optional[str] = None) -> str:
+    """
+    Valida a expressão e devolve o texto normalizado que vai para o banco
+    Predicados sem ticker usam `default_ticker`. Levanta RuleError com a mensagem para o usuário.
+    """
+    if len(expression) > MAX_EXPRESSION_LENGTH:
+        raise RuleError(f"Expressão muito longa (máximo {MAX_EXPRESSION_LENGTH} caracteres)")
+    default = default_ticker.strip().upper() if default_ticker else None
+    node = _Parser(expression, default).parse()
+
+    predicates = _predicates(node)
+    if len(predicates) > MAX_PREDICATES:
+        raise RuleError(f"Máximo de {MAX_PREDICATES} condições por regra")
+    if len({key[0] for key in predicates}) > MAX_TICKERS:
+        raise RuleError(f"Máximo de {MAX_TICKERS} tickers por regra")
+    return _render(node)
+
+
+def rule_tickers(expression: str) -> List[str]:
+    """Tickers de uma expressão normalizada, na ordem em que aparecem"""
+    return list(dict.fromkeys(key[0] for key in compile_rule(expression).predicates))
+
+
+@dataclass(frozen=True)
+class CompiledRule:
+    """
+    Plano pós-fixo sobre os predicados distintos da regra
+    Instruções: ("p", slot), ("and", n), ("or", n), ("not", 1).
+    """
+    expression: str
+    predicates: Tuple[PredicateKey, ...]
+    plan: Tuple[Tuple[str, int], ...]
+
+
+@lru_cache(maxsize=4096)
+def compile_rule(expression: str) -> CompiledRule:
+    """Compila uma expressão normalizada (regras iguais compartilham o plano)"""
+    node = _Parser(expression, None).parse()
+    slots: Dict[PredicateKey, int] = {}
+    plan: List[Tuple[str, int]] = []
+
+    def emit(current: Node):
+        if not _is_group(current):
+            plan.append(("p", slots.setdefault(current, len(slots))))
+            return
+        op, children = current
+        for child in children:
+            emit(child)
+        plan.append((op.lower(), len(children)))
+
+    emit(node)
+    return CompiledRule(expression, tuple(slots), tuple(plan))
+
+
+def _compare(op: str, value: float, threshold: float) -> bool:
+    if op == ">":
+        return value > threshold
+    elif op == "<":
+        return value < threshold
+    elif op == ">=":
+        return value >= threshold
+    elif op == "<=":
+        return value <= threshold
+    return False
+
+
+def _run(plan: Tuple[Tuple[str, int], ...], values: List[Optional[bool]]) -> Optional[bool]:
+    """
+    Executa o plano com lógica de três valores
+    None = entrada indisponível (sem cotação, indicador aquecendo); a regra só dispara com True.
+    """
+    stack: List[Optional[bool]] = []
+    for instruction, argument in plan:
+        if instruction == "p":
+            stack.append(values[argument])
+            continue
+        if instruction == "not":
+            value = stack.pop()
+            stack.append(None if value is None else not value)
+            continue
+        operands = stack[-argument:]
+        del stack[-argument:]
+        if instruction == "and":
+            result = False if False in operands else (None if None in operands else True)
+        else:
+            result = True if True in operands else (None if None in operands else False)
+        stack.append(result)
+    return stack[0]
+
+
+@dataclass
+class _RuleEntry:
+    compiled: CompiledRule
+    predicate_ids: Tuple[int, ...]
+
+
+class RuleEngine:
+    """Registro de predicados internados e regras ativas com avaliação incremental"""
+
+    def __init__(self):
+        self._predicate_ids: Dict[PredicateKey, int] = {}
+        self._predicate_keys: Dict[int, PredicateKey] = {}
+        self._predicate_refs: Counter = Counter()
+        self._predicate_values: Dict[int, Optional[bool]] = {}
+        self._next_predicate = 0
+        # Índice de dependências: entrada -> predicados -> regras
+        self._by_input: Dict[InputKey, Set[int]] = {}
+        self._rules_by_predicate: Dict[int, Set[int]] = {}
+        # Último valor visto de cada entrada
+        self._inputs: Dict[InputKey, Optional[float]] = {}
+        self._rules: Dict[int, _RuleEntry] = {}
+        self._dirty: Set[int] = set()
+        self._true: Set[int] = set()
+        self._invalid: Set[int] = set()
+        self.last_cycle = {"inputs_changed": 0, "predicates_evaluated": 0, "rules_evaluated": 0}
+
+    def _intern(self, key: PredicateKey) -> int:
+        predicate_id = self._predicate_ids.get(key)
+        if predicate_id is None:
+            predicate_id = self._predicate_ids[key] = self._next_predicate
+            self._next_predicate += 1
+            self._predicate_keys[predicate_id] = key
+            self._predicate_values[predicate_id] = None
+            self._rules_by_predicate[predicate_id] = set()
+            input_key = key[:3]
+            self._by_input.setdefault(input_key, set()).add(predicate_id)
+            # Força a reavaliação da entrada para o predicado novo
+            self._inputs.pop(input_key, None)
+        self._predicate_refs[predicate_id] += 1
+        return predicate_id
+
+    def _release(self, predicate_id: int):
+        self._predicate_refs[predicate_id] -= 1
+        if self._predicate_refs[predicate_id] > 0:
+            return
+        del self._predicate_refs[predicate_id]
+        key = self._predicate_keys.pop(predicate_id)
+        del self._predicate_ids[key]
+        del self._predicate_values[predicate_id]
+        del self._rules_by_predicate[predicate_id]
+        input_key = key[:3]
+        dependents = self._by_input[input_key]
+        dependents.discard(predicate_id)
+        if not dependents:
+            del self._by_input[input_key]
+            self._inputs.pop(input_key, None)
+
+    def add(self, alert_id: int, expression: str):
+        compiled = compile_rule(expression)
+        predicate_ids = tuple(self._intern(key) for key in compiled.predicates)
+        for predicate_id in predicate_ids:
+            self._rules_by_predicate[predicate_id].add(alert_id)
+        self._rules[alert_id] = _RuleEntry(compiled, predicate_ids)
+        self._dirty.add(alert_id)
+
+    def remove(self, alert_id: int):
+        entry = self._rules.pop(alert_id, None)
+        if entry is None:
+            return
+        for predicate_id in entry.predicate_ids:
+            self._rules_by_predicate[predicate_id].discard(alert_id)
+            self._release(predicate_id)
+        self._dirty.discard(alert_id)
+        self._true.discard(alert_id)
+
+    def sync(self, rules: Iterable[Tuple[int, str]]):
+        """Mantém só as regras dos alertas ativos informados (id, expressão)"""
+        wanted = dict(rules)
+        for alert_id in list(self._rules):
+            entry = self._rules[alert_id]
+            if wanted.get(alert_id) != entry.compiled.expression:
+                self.remove(alert_id)
+        self._invalid.intersection_update(wanted)
+
+        for alert_id, expression in wanted.items():
+            if alert_id in self._rules or alert_id in self._invalid:
+                continue
+            try:
+                self.add(alert_id, expression)
+            except RuleError as e:
+                # Loga uma vez só; a regra fica fora até ser removida
+                self._invalid.add(alert_id)
+                logger.error(f"❌ Regra do alerta {alert_id} inválida: {e}")
+
+    def input_keys(self) -> List[InputKey]:
+        return list(self._by_input)
+
+    def tickers(self) -> Set[str]:
+        return {ticker for ticker, _, _ in self._by_input}
+
+    def indicator_keys(self) -> Set[IndicatorKey]:
+        return {key for key in self._by_input if key[1] in INDICATOR_TYPES}
+
+    def evaluate(self, values: Mapping[InputKey, Optional[float]]) -> List[int]:
+        """
+        Atualiza as entradas e reavalia só o que depende das que mudaram
+        Retorna os ids dos alertas cuja regra está verdadeira.
+        """
+        inputs_changed = predicates_evaluated = 0
+        dirty = self._dirty
+        self._dirty = set()
+
+        for input_key, predicate_ids in self._by_input.items():
+            value = values.get(input_key)
+            if input_key in self._inputs and self._inputs[input_key] == value:
+                continue
+            self._inputs[input_key] = value
+            inputs_changed += 1
+            for predicate_id in predicate_ids:
+                _, _, _, op, threshold = self._predicate_keys[predicate_id]
+                result = None if value is None else _compare(op, value, threshold)
+                predicates_evaluated += 1
+                if result != self._predicate_values[predicate_id]:
+                    self._predicate_values[predicate_id] = result
+                    dirty |= self._rules_by_predicate[predicate_id]
+
+        for alert_id in dirty:
+            entry = self._rules.get(alert_id)
+            if entry is None:
+                continue
+            values_by_slot = [self._predicate_values[pid] for pid in entry.predicate_ids]
+            if _run(entry.compiled.plan, values_by_slot):
+                self._true.add(alert_id)
+            else:
+                self._true.discard(alert_id)
+
+        self.last_cycle = {
+            "inputs_changed": inputs_changed,
+            "predicates_evaluated": predicates_evaluated,
+            "rules_evaluated": len(dirty)
+        }
+        return list(self._true)
+
+    def stats(self) -> Dict:
+        return {
+            "rules": len(self._rules),
+            "distinct_plans": len({id(entry.compiled) for entry in self._rules.values()}),
+            "predicates": len(self._predicate_ids),
+            "inputs": len(self._by_input),
+            "invalid": len(self._invalid),
+            "last_cycle": dict(self.last_cycle)
+        }
+
+
+# Instância global
+rule_engine = RuleEngine()
@@ -0,0 +1,170 @@
+"""
+Sketches de target_value por (ticker, alert_type)
+Mantidos em memória e atualizados incrementalmente. O banco é a fonte da
+verdade: reconstruímos com GROUP BY ao subir e periodicamente (deltas perdidos
+num crash, escritas que não passam pelos hooks). Os sketches gravados em
+target_value_sketches são só um cache morno até a primeira reconstrução.
+"""
+
+import json
+import logging
+import threading
+import time
+from typing import Dict, Iterable, Optional, Set, Tuple
+from sqlalchemy import func
+from sqlalchemy.orm import Session
+
+from ..core.database import SessionLocal
+from ..models.alert import Alert
+from ..models.sketch import TargetValueSketch
+from ..utils.sketch import QuantileSketch
+from .rules import RULE_TYPE
+
+logger = logging.getLogger(__name__)
+
+SketchKey = Tuple[str, str]
+
+# (ticker, alert_type, target_value, delta)
+SketchUpdate = Tuple[str, str, float, int]
+
+
+class ValueSketchStore:
+    """Um QuantileSketch por (ticker, alert_type), persistido de forma compacta"""
+
+    def __init__(self, rebuild_interval: int = 300):
+        # Mesmo intervalo da popularidade: outros workers também escrevem no banco
+        self.rebuild_interval = rebuild_interval
+        self._sketches: Dict[SketchKey, QuantileSketch] = {}
+        self._dirty: Set[SketchKey] = set()
+        self._loaded_at: Optional[float] = None
+        self._lock = threading.Lock()
+
+    def _is_stale(self) -> bool:
+        return self._loaded_at is None or time.monotonic() - self._loaded_at > self.rebuild_interval
+
+    def load(self, db: Session):
+        """
+        Carrega os sketches gravados como cache morno, válido até a próxima
+        reconstrução; sem nenhum gravado, reconstrói a partir dos alertas
+        """
+        rows = db.query(TargetValueSketch).all()
+        if not rows:
+            self.rebuild(db)
+            return
+
+        with self._lock:
+            self._sketches = {
+                (row.ticker, row.alert_type): QuantileSketch.from_dict(json.loads(row.payload))
+                for row in rows
+            }
+            self._dirty.clear()
+            self._loaded_at = time.monotonic()
+
+        logger.debug(f"Sketches carregados: {len(rows)}")
+
+    def rebuild(self, db: Session):
+        """Recalcula todos os sketches com GROUP BY sobre os alertas ativos (menos as regras compostas)"""
+        rows = db.query(
+            Alert.ticker,
+            Alert.alert_type,
+            Alert.target_value,
+            func.count()
+        ).filter(
+            Alert.is_active == True,
+            # Regras compostas não têm valor-alvo (target_value=0.0)
+            Alert.alert_type != RULE_TYPE
+        ).group_by(Alert.ticker, Alert.alert_type, Alert.target_value).all()
+
+        sketches: Dict[SketchKey, QuantileSketch] = {}
+        for ticker, alert_type, target_value, count in rows:
+            sketches.setdefault((ticker, alert_type), QuantileSketch()).add(target_value, count)
+
+        with self._lock:
+            self._sketches = sketches
+            self._dirty = set(sketches)
+            self._loaded_at = time.monotonic()
+
+        self.flush(db, replace=True)
+        logger.info(f"✅ Sketches reconstruídos: {len(sketches)}")
+
+    def apply(self, updates: Iterable[SketchUpdate]):
+        """Aplica inserções (delta > 0) e remoções (delta < 0) de target_value"""
+        with self._lock:
+            if self._loaded_at is None:
+                return
+            for ticker, alert_type, target_value, delta in updates:
+                key = (ticker, alert_type)
+                sketch = self._sketches.get(key)
+                if sketch is None:
+                    if delta <= 0:
+                        continue
+                    sketch = self._sketches[key] = QuantileSketch()
+                if delta > 0:
+                    sketch.add(target_value, delta)
+                else:
+                    sketch.remove(target_value, -delta)
+                self._dirty.add(key)
+
+    def get(self, db: Session, ticker: str, alert_type: str) -> Optional[QuantileSketch]:
+        if self._loaded_at is None:
+            self.load(db)
+        elif self._is_stale():
+            self.rebuild(db)
+        return self._sketches.get((ticker, alert_type))
+
+    def flush(self, db: Session, replace: bool = False):
+        """Grava os sketches alterados desde o último flush"""
+        with self._lock:
+            dirty = {key: self._sketches.get(key) for key in self._dirty}
+            self._dirty.clear()
+
+        if not dirty and not replace:
+            return
+
+        try:
+            if replace:
+                db.query(TargetValueSketch).delete(synchronize_session=False)
+            for (ticker, alert_type), sketch in dirty.items():
+                row = None if replace else db.get(TargetValueSketch, (ticker, alert_type))
+                if sketch is None or sketch.count <= 0:
+                    if row is not None:
+                        db.delete(row)
+                    continue
+                payload = json.dumps(sketch.to_dict(), separators=(",", ":"))
+                if row is None:
+                    db.add(TargetValueSketch(ticker=ticker, alert_type=alert_type, payload=payload))
+                else:
+                    row.payload = payload
+            db.commit()
+        except Exception:
+            db.rollback()
+            # Mantém as chaves como pendentes para o próximo flush
+            with self._lock:
+                self._dirty.update(dirty)
+            raise
+
+
+# Instância global
+value_sketches = ValueSketchStore()
+
+
+def rebuild_value_sketches():
+    """Job periódico (e ao subir): reconstrói os sketches a partir dos alertas ativos"""
+    db = SessionLocal()
+    try:
+        value_sketches.rebuild(db)
+    except Exception as e:
+        logger.error(f"❌ Erro ao reconstruir sketches: {e}")
+    finally:
+        db.close()
+
+
+def flush_value_sketches():
+    """Job periódico: persiste os sketches alterados"""
+    db = SessionLocal()
+    try:
+        value_sketches.flush(db)
+    except Exception as e:
+        logger.error(f"❌ Erro ao gravar sketches: {e}")
+    finally:
+        db.close()
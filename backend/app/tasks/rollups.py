@@ -0,0 +1,96 @@
+"""
+Backfill dos rollups diários a partir dos alertas (quentes e arquivados)
+
+Uso:
+    python -m app.tasks.rollups              # recalcula todos os usuários
+    python -m app.tasks.rollups --user-id 42 # recalcula um usuário
+"""
+
+import argparse
+import logging
+from datetime import date
+from typing import Optional
+from sqlalchemy import func, select, union_all
+from sqlalchemy.orm import Session
+
+from ..core.database import SessionLocal
+from ..models.alert import Alert, AlertArchive
+from ..models.rollup import AlertDailyRollup
+from ..services.rollups import RollupIncrements, apply_increments
+
+logger = logging.getLogger(__name__)
+
+
+def _as_date(value) -> date:
+    # SQLite devolve func.date() como string
+    return value if isinstance(value, date) else date.fromisoformat(str(value))
+
+
+def backfill_rollups(db: Session, user_id: Optional[int] = None) -> int:
+    """
+    Reconstrói os rollups com GROUP BY sobre alerts + alerts_archive
+    Criações por created_at, disparos por triggered_at. Não usa alert_events:
+    a retenção descarta os eventos antigos, o arquivo guarda tudo.
+    Retorna o número de linhas de rollup gravadas.
+    """
+    increments: RollupIncrements = {}
+
+    sources = []
+    for table in (Alert, AlertArchive):
+        source = select(table.user_id, table.alert_type, table.created_at, table.triggered, table.triggered_at)
+        if user_id is not None:
+            source = source.where(table.user_id == user_id)
+        sources.append(source)
+    alerts = union_all(*sources).subquery()
+
+    created_day = func.date(alerts.c.created_at)
+    created = db.query(
+        alerts.c.user_id, created_day, alerts.c.alert_type, func.count()
+    ).filter(alerts.c.created_at != None).group_by(alerts.c.user_id, created_day, alerts.c.alert_type)
+
+    triggered_day = func.date(alerts.c.triggered_at)
+    triggered = db.query(
+        alerts.c.user_id, triggered_day, alerts.c.alert_type, func.count()
+    ).filter(alerts.c.triggered == True, alerts.c.triggered_at != None)
+
+    rollups = db.query(AlertDailyRollup)
+
+    if user_id is not None:
+        rollups = rollups.filter(AlertDailyRollup.user_id == user_id)
+
+    for uid, day, alert_type, count in created:
+        key = (uid, _as_date(day), alert_type)
+        increments[key] = (count, increments.get(key, (0, 0))[1])
+
+    for uid, day, alert_type, count in triggered.group_by(alerts.c.user_id, triggered_day, alerts.c.alert_type):
+        key = (uid, _as_date(day), alert_type)
+        increments[key] = (increments.get(key, (0, 0))[0], count)
+
+    try:
+        rollups.delete(synchronize_session=False)
+        apply_increments(db, increments)
+        db.commit()
+    except Exception:
+        db.rollback()
+        raise
+
+    return len(increments)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Recalcula os rollups diários de alertas")
+    parser.add_argument("--user-id", type=int, default=None, help="Recalcula apenas este usuário")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+
+    db = SessionLocal()
+    try:
+        rows = backfill_rollups(db, user_id=args.user_id)
+        logger.info(f"✅ Backfill concluído: {rows} linhas de rollup")
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    main()
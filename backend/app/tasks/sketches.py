@@ -0,0 +1,27 @@
+"""
+Reconstrução dos sketches de sugestão de valores a partir dos alertas ativos
+
+Uso:
+    python -m app.tasks.sketches
+"""
+
+import logging
+
+from ..core.database import SessionLocal
+from ..services.value_sketches import value_sketches
+
+logger = logging.getLogger(__name__)
+
+
+def main():
+    logging.basicConfig(level=logging.INFO)
+
+    db = SessionLocal()
+    try:
+        value_sketches.rebuild(db)
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,65 @@
+"""
+Paginação por cursor (keyset) para listagens ordenadas de forma decrescente
+O cursor é opaco para o cliente: base64 de [valor_da_ordenação, id].
+"""
+
+import base64
+import json
+from datetime import datetime
+from typing import Any, Optional, Tuple
+from sqlalchemy import String, and_, literal, or_
+from sqlalchemy.orm import Session
+
+
+def encode_cursor(sort_value: Any, row_id: int) -> str:
+    """Gera o cursor a partir do último item da página"""
+    if isinstance(sort_value, datetime):
+        sort_value = sort_value.isoformat()
+    raw = json.dumps([sort_value, row_id], separators=(",", ":"))
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> Tuple[datetime, int]:
+    """
+    Decodifica um cursor de datetime gerado por encode_cursor
+    Levanta ValueError se o cursor for inválido.
+    """
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        sort_value, row_id = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        return datetime.fromisoformat(sort_value), int(row_id)
+    except Exception as e:
+        raise ValueError(f"Cursor inválido: {cursor}") from e
+
+
+def keyset_before(db: Session, sort_column, id_column, cursor: Optional[Tuple[datetime, int]]):
+    """
+    Filtro (sort_column, id) < cursor para ordenação DESC
+    Expandido em OR/AND para funcionar em qualquer banco usando o índice composto.
+    """
+    if cursor is None:
+        return None
+
+    sort_value, last_id = cursor
+
+    # SQLite guarda datetimes como texto em dois formatos: o SQLAlchemy grava sempre
+    # com fração ("...:57.000000") e o CURRENT_TIMESTAMP sem ("...:57")
+    if db.get_bind().dialect.name == "sqlite":
+        naive = sort_value.replace(tzinfo=None)
+        with_fraction = literal(naive.strftime("%Y-%m-%d %H:%M:%S.%f"), String)
+        if naive.microsecond:
+            return or_(
+                sort_column < with_fraction,
+                and_(sort_column == with_fraction, id_column < last_id)
+            )
+        # Segundo exato: "...:57" fica abaixo das duas formas do mesmo instante
+        whole = literal(naive.strftime("%Y-%m-%d %H:%M:%S"), String)
+        return or_(
+            sort_column < whole,
+            and_(or_(sort_column == whole, sort_column == with_fraction), id_column < last_id)
+        )
+
+    return or_(
+        sort_column < sort_value,
+        and_(sort_column == sort_value, id_column < last_id)
+    )
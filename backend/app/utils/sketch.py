@@ -0,0 +1,130 @@
+"""
+Sketch de quantis com erro relativo garantido (estilo DDSketch)
+Valores positivos caem em buckets logarítmicos de razão gamma; os negativos
+(ex.: distância percentual abaixo da média nos alertas sma/ema/vwap), num
+conjunto espelhado de buckets sobre |valor|. Isso dá:
+  - inserção e remoção exatas em O(1) (alertas são removidos, não só criados)
+  - merge trivial (soma de buckets)
+  - tamanho limitado pela faixa de valores, não pela quantidade de alertas
+"""
+
+import math
+from typing import Dict, List, Optional, Tuple
+
+
+class QuantileSketch:
+    """Histograma logarítmico com precisão relativa `relative_accuracy`"""
+
+    def __init__(self, relative_accuracy: float = 0.005):
+        self.relative_accuracy = relative_accuracy
+        self.gamma = (1 + relative_accuracy) / (1 - relative_accuracy)
+        self._log_gamma = math.log(self.gamma)
+        self.bins: Dict[int, int] = {}
+        # Buckets de |valor| para os valores negativos
+        self.negative_bins: Dict[int, int] = {}
+        self.zero_count = 0
+        self.count = 0
+        self.sum = 0.0
+        # (valor representativo, quantidade) em ordem crescente de valor
+        self._sorted: Optional[List[Tuple[float, int]]] = None
+
+    def _key(self, value: float) -> int:
+        return math.ceil(math.log(value) / self._log_gamma)
+
+    def _value(self, key: int) -> float:
+        # Ponto que minimiza o erro relativo dentro do bucket
+        return 2 * self.gamma ** key / (self.gamma + 1)
+
+    def _store(self, value: float) -> Dict[int, int]:
+        return self.bins if value > 0 else self.negative_bins
+
+    def add(self, value: float, n: int = 1):
+        if value == 0:
+            self.zero_count += n
+        else:
+            bins = self._store(value)
+            key = self._key(abs(value))
+            bins[key] = bins.get(key, 0) + n
+        self.count += n
+        self.sum += value * n
+        self._sorted = None
+
+    def remove(self, value: float, n: int = 1):
+        if value == 0:
+            removed = min(n, self.zero_count)
+            self.zero_count -= removed
+        else:
+            bins = self._store(value)
+            key = self._key(abs(value))
+            current = bins.get(key, 0)
+            removed = min(n, current)
+            if current - removed > 0:
+                bins[key] = current - removed
+            else:
+                bins.pop(key, None)
+        self.count -= removed
+        self.sum = self.sum - value * removed if self.count else 0.0
+        self._sorted = None
+
+    def merge(self, other: "QuantileSketch"):
+        if other.gamma != self.gamma:
+            raise ValueError("Sketches com precisões diferentes não podem ser combinados")
+        for key, n in other.bins.items():
+            self.bins[key] = self.bins.get(key, 0) + n
+        for key, n in other.negative_bins.items():
+            self.negative_bins[key] = self.negative_bins.get(key, 0) + n
+        self.zero_count += other.zero_count
+        self.count += other.count
+        self.sum += other.sum
+        self._sorted = None
+
+    def _sorted_bins(self) -> List[Tuple[float, int]]:
+        if self._sorted is None:
+            # Negativos do mais distante de zero ao mais próximo, zero, positivos
+            ordered = [(-self._value(key), n) for key, n in sorted(self.negative_bins.items(), reverse=True)]
+            if self.zero_count:
+                ordered.append((0.0, self.zero_count))
+            ordered.extend((self._value(key), n) for key, n in sorted(self.bins.items()))
+            self._sorted = ordered
+        return self._sorted
+
+    @property
+    def average(self) -> Optional[float]:
+        return self.sum / self.count if self.count else None
+
+    def quantile(self, q: float) -> Optional[float]:
+        """Valor aproximado no quantil q (0..1)"""
+        if self.count <= 0:
+            return None
+
+        rank = q * (self.count - 1)
+        seen = 0
+        for value, n in self._sorted_bins():
+            seen += n
+            if seen > rank:
+                return value
+        return self._sorted_bins()[-1][0]
+
+    def clusters(self, k: int = 3) -> List[Tuple[float, int]]:
+        """Os k buckets mais densos: (valor representativo, quantidade)"""
+        return sorted(self._sorted_bins(), key=lambda item: item[1], reverse=True)[:k]
+
+    def to_dict(self) -> dict:
+        return {
+            "a": self.relative_accuracy,
+            "b": {str(key): n for key, n in self.bins.items()},
+            "n": {str(key): n for key, n in self.negative_bins.items()},
+            "z": self.zero_count,
+            "c": self.count,
+            "s": self.sum,
+        }
+
+    @classmethod
+    def from_dict(cls, data: dict) -> "QuantileSketch":
+        sketch = cls(relative_accuracy=data.get("a", 0.005))
+        sketch.bins = {int(key): n for key, n in data.get("b", {}).items()}
+        sketch.negative_bins = {int(key): n for key, n in data.get("n", {}).items()}
+        sketch.zero_count = data.get("z", 0)
+        sketch.count = data.get("c", 0)
+        sketch.sum = data.get("s", 0.0)
+        return sketch
@@ -1,24 +1,38 @@
 from fastapi import WebSocket, WebSocketDisconnect
-from typing import Dict, List
-import json
+from typing import Dict, List, Tuple
+from .core.metrics import WEBSOCKET_CONNECTIONS
+from .core.serialization import HAS_MSGPACK, dumps, packb
 
 class ConnectionManager:
     def __init__(self):
-        self.active_connections: Dict[int, List[WebSocket]] = {}
-    
-    async def connect(self, websocket: WebSocket, user_id: int):
+        # (conexão, binária) — binária recebe msgpack em vez de texto JSON
+        self.active_connections: Dict[int, List[Tuple[WebSocket, bool]]] = {}
+
+    async def connect(self, websocket: WebSocket, user_id: int, binary: bool = False):
         await websocket.accept()
         if user_id not in self.active_connections:
             self.active_connections[user_id] = []
-        self.active_connections[user_id].append(websocket)
-    
+        self.active_connections[user_id].append((websocket, binary and HAS_MSGPACK))
+        WEBSOCKET_CONNECTIONS.inc()
+
     def disconnect(self, websocket: WebSocket, user_id: int):
-        if user_id in self.active_connections:
-            self.active_connections[user_id].remove(websocket)
-    
+        connections = self.active_connections.get(user_id, [])
+        for entry in connections:
+            if entry[0] is websocket:
+                connections.remove(entry)
+                WEBSOCKET_CONNECTIONS.dec()
+                break
+
     async def send_alert(self, user_id: int, message: dict):
         if user_id in self.active_connections:
-            for connection in self.active_connections[user_id]:
-                await connection.send_json(message)
+            # Serializa uma vez por formato, não por conexão
+            text, binary = None, None
+            for connection, is_binary in self.active_connections[user_id]:
+                if is_binary:
+                    binary = binary or packb(message)
+                    await connection.send_bytes(binary)
+                else:
+                    text = text or dumps(message).decode()
+                    await connection.send_text(text)
 
-manager = ConnectionManager()
\ No newline at end of file
+manager = ConnectionManager()
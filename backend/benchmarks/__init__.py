@@ -0,0 +1,6 @@
+"""
+Benchmarks reproduzíveis do Gatilho
+
+Rode sempre a partir de backend/, por exemplo:
+    python -m benchmarks.alert_pipeline --users 200 --alerts-per-user 10
+"""
@@ -0,0 +1,136 @@
+"""
+Utilidades compartilhadas pelos benchmarks: ambiente, contagem de queries,
+percentis e gravação dos resultados em JSON
+"""
+
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, List, Optional, Sequence
+
+RESULTS_DIR = Path(__file__).resolve().parent / "results"
+
+DEFAULT_DATABASE_URL = f"sqlite:///{Path(tempfile.gettempdir()) / 'gatilho-bench.db'}"
+
+
+def configure_environment(database_url: Optional[str] = None):
+    """
+    Define as variáveis que o Settings exige antes de importar o app
+    Precisa ser chamada antes de qualquer import de `app.*`.
+    """
+    if "app.core.config" in sys.modules:
+        raise RuntimeError("configure_environment() precisa rodar antes de importar o app")
+
+    os.environ["DATABASE_URL"] = database_url or os.environ.get("BENCH_DATABASE_URL", DEFAULT_DATABASE_URL)
+    os.environ.setdefault("REDIS_URL", "redis://localhost:6379/0")
+    os.environ.setdefault("SECRET_KEY", "benchmark-secret-key")
+    # Nunca manda email de verdade durante um benchmark
+    os.environ["SENDGRID_API_KEY"] = ""
+    # Erros injetados no stub gerariam uma linha de log por cotação
+    os.environ.setdefault("LOG_LEVEL", "CRITICAL")
+
+
+def reset_schema():
+    """Recria todas as tabelas do zero no banco configurado"""
+    from app.core.database import Base, engine
+    # Registra todos os modelos no metadata
+    from app.models import alert, event, outbox, rollup, sketch, user  # noqa: F401
+
+    Base.metadata.drop_all(bind=engine)
+    Base.metadata.create_all(bind=engine)
+
+
+def git_revision() -> Dict:
+    """Commit atual e se a árvore tem alterações não commitadas"""
+    try:
+        commit = subprocess.run(
+            ["git", "rev-parse", "HEAD"], capture_output=True, text=True, check=True
+        ).stdout.strip()
+        dirty = bool(subprocess.run(
+            ["git", "status", "--porcelain", "--untracked-files=no"],
+            capture_output=True, text=True, check=True
+        ).stdout.strip())
+    except (OSError, subprocess.CalledProcessError):
+        return {"commit": None, "dirty": None}
+    return {"commit": commit, "dirty": dirty}
+
+
+def environment_info() -> Dict:
+    from app.core.database import engine
+
+    return {
+        "git": git_revision(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+        "database": engine.dialect.name,
+        "timestamp": datetime.utcnow().isoformat()
+    }
+
+
+class QueryCounter:
+    """Conta os statements enviados ao banco enquanto está ativo"""
+
+    def __init__(self, engine):
+        self.engine = engine
+        self.count = 0
+
+    def _on_execute(self, conn, cursor, statement, parameters, context, executemany):
+        self.count += 1
+
+    def __enter__(self):
+        from sqlalchemy import event
+
+        self.count = 0
+        event.listen(self.engine, "before_cursor_execute", self._on_execute)
+        return self
+
+    def __exit__(self, *exc):
+        from sqlalchemy import event
+
+        event.remove(self.engine, "before_cursor_execute", self._on_execute)
+        return False
+
+
+def percentile(values: Sequence[float], q: float) -> Optional[float]:
+    """Percentil por interpolação linear (q entre 0 e 100)"""
+    if not values:
+        return None
+    ordered = sorted(values)
+    position = (len(ordered) - 1) * q / 100
+    lower = int(position)
+    upper = min(lower + 1, len(ordered) - 1)
+    return ordered[lower] + (ordered[upper] - ordered[lower]) * (position - lower)
+
+
+def summarize(values: List[float]) -> Dict:
+    if not values:
+        return {"count": 0}
+    return {
+        "count": len(values),
+        "min": round(min(values), 3),
+        "mean": round(sum(values) / len(values), 3),
+        "p50": round(percentile(values, 50), 3),
+        "p95": round(percentile(values, 95), 3),
+        "p99": round(percentile(values, 99), 3),
+        "max": round(max(values), 3)
+    }
+
+
+def write_results(name: str, payload: Dict, output: Optional[str] = None) -> Path:
+    """Grava o resultado em JSON; por padrão em benchmarks/results/<nome>-<data>-<commit>.json"""
+    if output:
+        path = Path(output)
+    else:
+        commit = (payload.get("environment", {}).get("git", {}).get("commit") or "nogit")[:8]
+        stamp = datetime.utcnow().strftime("%Y%m%dT%H%M%S")
+        path = RESULTS_DIR / f"{name}-{stamp}-{commit}.json"
+
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text(json.dumps(payload, indent=2, ensure_ascii=False))
+    return path
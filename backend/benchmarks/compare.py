@@ -0,0 +1,65 @@
+"""
+Compara dois resultados de benchmark (JSON) e mostra a variação das métricas
+
+Uso:
+    python -m benchmarks.compare results/antes.json results/depois.json
+"""
+
+import argparse
+import json
+from typing import Dict, Iterator, Tuple
+
+STATS = ("mean", "p50", "p95", "p99")
+
+
+def _flatten(summary: Dict, prefix: str = "") -> Iterator[Tuple[str, float]]:
+    for key, value in summary.items():
+        name = f"{prefix}{key}"
+        if isinstance(value, dict):
+            for stat in STATS:
+                if isinstance(value.get(stat), (int, float)):
+                    yield f"{name}.{stat}", value[stat]
+            # Resumos aninhados por rota (load test)
+            nested = {k: v for k, v in value.items() if isinstance(v, dict)}
+            if nested:
+                yield from _flatten(nested, prefix=f"{name}.")
+        elif isinstance(value, (int, float)) and not isinstance(value, bool):
+            yield name, value
+
+
+def compare(before: Dict, after: Dict):
+    old = dict(_flatten(before.get("summary", {})))
+    new = dict(_flatten(after.get("summary", {})))
+
+    print(f"antes:  {before.get('environment', {}).get('git', {}).get('commit')}")
+    print(f"depois: {after.get('environment', {}).get('git', {}).get('commit')}")
+    print()
+    print(f"{'métrica':<48} {'antes':>14} {'depois':>14} {'variação':>10}")
+    for name in sorted(set(old) | set(new)):
+        a, b = old.get(name), new.get(name)
+        if a is None or b is None:
+            change = "-"
+        elif a == 0:
+            change = "0%" if b == 0 else "novo"
+        else:
+            change = f"{(b - a) / a * 100:+.1f}%"
+        a_text = "-" if a is None else f"{a:.3f}"
+        b_text = "-" if b is None else f"{b:.3f}"
+        print(f"{name:<48} {a_text:>14} {b_text:>14} {change:>10}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compara dois resultados de benchmark")
+    parser.add_argument("before")
+    parser.add_argument("after")
+    args = parser.parse_args()
+
+    with open(args.before) as f:
+        before = json.load(f)
+    with open(args.after) as f:
+        after = json.load(f)
+    compare(before, after)
+
+
+if __name__ == "__main__":
+    main()
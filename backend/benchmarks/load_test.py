@@ -0,0 +1,449 @@
+"""
+Teste de carga da API HTTP com orçamento de latência por rota
+
+Dispara um mix realista de tráfego (login, dashboard, estatísticas,
+criação e remoção de alertas, WebSocket) com N usuários virtuais e
+reporta vazão e p50/p95/p99 por rota. Sai com código 1 se alguma rota
+estourar o orçamento de benchmarks/budgets.json.
+
+Em processo (ASGI, banco descartável populado direto no SQLAlchemy):
+    python -m benchmarks.load_test --users 50 --alerts-per-user 200 --duration 30
+
+Contra um servidor rodando (usuários e alertas criados pela própria API):
+    python -m benchmarks.load_test --base-url http://127.0.0.1:8000 --users 20
+"""
+
+import argparse
+import asyncio
+import json
+import random
+import sys
+import time
+from collections import defaultdict
+from pathlib import Path
+from typing import Dict, List, Optional
+from urllib.parse import urlencode
+
+from .common import configure_environment, summarize, write_results
+
+DEFAULT_BUDGETS = Path(__file__).resolve().parent / "budgets.json"
+
+PASSWORD = "benchmark123"
+
+# Peso relativo de cada operação no mix
+TRAFFIC_MIX = {
+    "dashboard": 35,
+    "dashboard_delta": 15,
+    "stats": 10,
+    "list_alerts": 10,
+    "create_alert": 10,
+    "delete_alert": 8,
+    "monitoring_status": 4,
+    "login": 4,
+    "websocket": 4,
+}
+
+TICKERS = ["PETR4", "VALE3", "ITUB4", "BBDC4", "BBAS3", "ABEV3", "WEGE3", "MGLU3"]
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Teste de carga da API com orçamento de latência")
+    parser.add_argument("--base-url", default=None, help="Servidor alvo; sem isso roda o app em processo")
+    parser.add_argument("--database-url", default=None, help="Banco descartável do modo em processo")
+    parser.add_argument("--users", type=int, default=20, help="Usuários virtuais concorrentes")
+    parser.add_argument("--alerts-per-user", type=int, default=100, help="Alertas pré-existentes por usuário")
+    parser.add_argument("--duration", type=float, default=20.0, help="Segundos de carga")
+    parser.add_argument("--think-ms", type=float, default=250.0, help="Pausa entre requisições de cada usuário")
+    parser.add_argument("--budgets", default=str(DEFAULT_BUDGETS), help="JSON com orçamento por rota")
+    parser.add_argument("--no-budgets", action="store_true", help="Só reporta, sem falhar")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--output", default=None, help="Arquivo JSON de saída")
+    return parser.parse_args(argv)
+
+
+class ASGIWebSocket:
+    """Cliente WebSocket mínimo que fala ASGI direto com o app (httpx não suporta WS)"""
+
+    def __init__(self, app, path: str, query: str = ""):
+        self.app = app
+        self.scope = {
+            "type": "websocket",
+            "asgi": {"version": "3.0"},
+            "scheme": "ws",
+            "path": path,
+            "raw_path": path.encode(),
+            "query_string": query.encode(),
+            "headers": [(b"host", b"testserver")],
+            "client": ("127.0.0.1", 0),
+            "server": ("testserver", 80),
+            "subprotocols": [],
+        }
+        self._to_app: asyncio.Queue = asyncio.Queue()
+        self._from_app: asyncio.Queue = asyncio.Queue()
+        self._task: Optional[asyncio.Task] = None
+
+    async def connect(self) -> bool:
+        self._task = asyncio.create_task(self.app(self.scope, self._to_app.get, self._from_app.put))
+        await self._to_app.put({"type": "websocket.connect"})
+        message = await self._from_app.get()
+        return message["type"] == "websocket.accept"
+
+    async def send_text(self, text: str):
+        await self._to_app.put({"type": "websocket.receive", "text": text})
+
+    async def receive_text(self) -> Optional[str]:
+        message = await self._from_app.get()
+        return message.get("text") if message["type"] == "websocket.send" else None
+
+    async def close(self):
+        await self._to_app.put({"type": "websocket.disconnect", "code": 1000})
+        if self._task is not None:
+            await self._task
+
+
+class VirtualUser:
+    def __init__(self, runner: "LoadRunner", user_id: int, email: str, token: str, rng: random.Random):
+        self.runner = runner
+        self.user_id = user_id
+        self.email = email
+        self.token = token
+        self.rng = rng
+        self.created: List[int] = []
+        self.sync_token: Optional[str] = None
+
+    @property
+    def headers(self) -> Dict[str, str]:
+        return {"Authorization": f"Bearer {self.token}"}
+
+    async def run(self, deadline: float):
+        operations = list(TRAFFIC_MIX)
+        weights = list(TRAFFIC_MIX.values())
+        while time.perf_counter() < deadline:
+            operation = self.rng.choices(operations, weights=weights)[0]
+            if operation == "delete_alert" and not self.created:
+                operation = "create_alert"
+            await getattr(self, operation)()
+            if self.runner.think_ms:
+                await asyncio.sleep(self.runner.think_ms / 1000)
+
+    async def dashboard(self):
+        response = await self.runner.call("GET /api/dashboard", "GET", "/api/dashboard", headers=self.headers)
+        if response is not None and response.status_code == 200:
+            self.sync_token = response.json().get("sync_token")
+
+    async def dashboard_delta(self):
+        if not self.sync_token:
+            return await self.dashboard()
+        response = await self.runner.call(
+            "GET /api/dashboard?since", "GET", "/api/dashboard",
+            params={"since": self.sync_token}, headers=self.headers
+        )
+        if response is not None and response.status_code == 200:
+            self.sync_token = response.json().get("sync_token")
+
+    async def stats(self):
+        await self.runner.call("GET /api/alerts/stats", "GET", "/api/alerts/stats", headers=self.headers)
+
+    async def list_alerts(self):
+        await self.runner.call(
+            "GET /api/alerts", "GET", "/api/alerts",
+            params={"active_only": "true", "limit": 50}, headers=self.headers
+        )
+
+    async def create_alert(self):
+        response = await self.runner.call(
+            "POST /api/alerts", "POST", "/api/alerts", headers=self.headers,
+            json={
+                "ticker": self.rng.choice(TICKERS),
+                "alert_type": "price",
+                "target_value": round(self.rng.uniform(1000, 2000), 2),
+                "condition": ">"
+            }
+        )
+        if response is not None and response.status_code == 201:
+            self.created.append(response.json()["id"])
+
+    async def delete_alert(self):
+        alert_id = self.created.pop()
+        await self.runner.call(
+            "DELETE /api/alerts/{alert_id}", "DELETE", f"/api/alerts/{alert_id}", headers=self.headers
+        )
+
+    async def monitoring_status(self):
+        await self.runner.call("GET /api/monitoring/status", "GET", "/api/monitoring/status")
+
+    async def login(self):
+        response = await self.runner.call(
+            "POST /api/auth/login", "POST", "/api/auth/login",
+            json={"email": self.email, "password": PASSWORD}
+        )
+        if response is not None and response.status_code == 200:
+            self.token = response.json()["access_token"]
+
+    async def websocket(self):
+        await self.runner.websocket_roundtrip(self.user_id, self.token)
+
+
+class LoadRunner:
+    def __init__(self, client, app=None, base_url: Optional[str] = None, think_ms: float = 0.0):
+        self.client = client
+        # App ASGI (modo em processo) ou URL do servidor para o WebSocket
+        self.app = app
+        self.base_url = base_url
+        self.think_ms = think_ms
+        self.latencies: Dict[str, List[float]] = defaultdict(list)
+        self.errors: Dict[str, int] = defaultdict(int)
+
+    async def call(self, route: str, method: str, path: str, **kwargs):
+        started = time.perf_counter()
+        try:
+            response = await self.client.request(method, path, **kwargs)
+        except Exception:
+            self.errors[route] += 1
+            self.latencies[route].append((time.perf_counter() - started) * 1000)
+            return None
+        self.latencies[route].append((time.perf_counter() - started) * 1000)
+        if response.status_code >= 400:
+            self.errors[route] += 1
+        return response
+
+    async def websocket_roundtrip(self, user_id: int, token: str):
+        """Conecta, troca um ping/pong e desconecta"""
+        route = "WS /ws/{user_id}"
+        path = f"/ws/{user_id}"
+        query = urlencode({"token": token})
+        started = time.perf_counter()
+        ok = False
+        try:
+            if self.app is not None:
+                ws = ASGIWebSocket(self.app, path, query)
+                if await ws.connect():
+                    await ws.send_text("ping")
+                    ok = await ws.receive_text() == "pong"
+                await ws.close()
+            else:
+                import websockets
+
+                url = self.base_url.replace("http", "ws", 1).rstrip("/") + f"{path}?{query}"
+                async with websockets.connect(url) as ws:
+                    await ws.send("ping")
+                    ok = await ws.recv() == "pong"
+        except Exception:
+            ok = False
+        self.latencies[route].append((time.perf_counter() - started) * 1000)
+        if not ok:
+            self.errors[route] += 1
+
+
+def seed_in_process(args) -> List[Dict]:
+    """Popula o banco descartável direto pelo SQLAlchemy e emite tokens"""
+    from app.core.database import SessionLocal
+    from app.core.security import _crypt_context, create_access_token
+    from app.core.config import settings
+    from app.models.user import User
+
+    from .common import reset_schema
+    from .seed import seed_database
+
+    reset_schema()
+    # Um único hash real: todos os usuários têm a mesma senha
+    password_hash = _crypt_context(settings.BCRYPT_ROUNDS).hash(PASSWORD)
+
+    db = SessionLocal()
+    try:
+        seed_database(db, args.users, args.alerts_per_user, tickers=40, seed=args.seed, password_hash=password_hash)
+        users = db.query(User.id, User.email).order_by(User.id).all()
+    finally:
+        db.close()
+
+    return [
+        {"id": user_id, "email": email, "token": create_access_token({"sub": str(user_id)})}
+        for user_id, email in users
+    ]
+
+
+async def seed_via_api(client, args) -> List[Dict]:
+    """Cria usuários e alertas pela própria API (servidor remoto)"""
+    from .seed import bench_email
+
+    rng = random.Random(args.seed)
+    run_id = int(time.time())
+    users = []
+    for i in range(args.users):
+        email = bench_email(f"{run_id}-{i}")
+        response = await client.post("/api/auth/signup", json={"email": email, "name": f"Bench {i}", "password": PASSWORD})
+        response.raise_for_status()
+        response = await client.post("/api/auth/login", json={"email": email, "password": PASSWORD})
+        response.raise_for_status()
+        body = response.json()
+        headers = {"Authorization": f"Bearer {body['access_token']}"}
+
+        remaining = args.alerts_per_user
+        while remaining > 0:
+            chunk = min(remaining, 1000)
+            rows = [
+                {
+                    "ticker": rng.choice(TICKERS),
+                    "alert_type": "price",
+                    "target_value": round(rng.uniform(1000, 2000), 2),
+                    "condition": ">"
+                }
+                for _ in range(chunk)
+            ]
+            (await client.post("/api/alerts/bulk", json=rows, headers=headers)).raise_for_status()
+            remaining -= chunk
+
+        users.append({"id": body["user_id"], "email": email, "token": body["access_token"]})
+    return users
+
+
+def check_budgets(routes: Dict, totals: Dict, budgets: Dict) -> List[str]:
+    """Lista as violações do orçamento (vazia se tudo passou)"""
+    violations = []
+    for route, limits in budgets.items():
+        if route == "*":
+            max_error_rate = limits.get("max_error_rate")
+            if max_error_rate is not None and totals["error_rate"] > max_error_rate:
+                violations.append(f"taxa de erro global {totals['error_rate']:.2%} > {max_error_rate:.2%}")
+            continue
+
+        stats = routes.get(route)
+        if not stats or not stats["latency_ms"].get("count"):
+            continue
+        for key, limit in limits.items():
+            if key.endswith("_ms"):
+                value = stats["latency_ms"].get(key[:-3])
+                if value is not None and value > limit:
+                    violations.append(f"{route}: {key[:-3]} = {value:.1f} ms > {limit} ms")
+            elif key == "max_error_rate" and stats["error_rate"] > limit:
+                violations.append(f"{route}: taxa de erro {stats['error_rate']:.2%} > {limit:.2%}")
+    return violations
+
+
+async def run_load(args) -> Dict:
+    import httpx
+
+    if args.base_url:
+        client = httpx.AsyncClient(base_url=args.base_url, timeout=30.0)
+        app = None
+    else:
+        from app.main import app
+        client = httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://testserver", timeout=30.0)
+
+    async with client:
+        if args.base_url:
+            users = await seed_via_api(client, args)
+        else:
+            users = await asyncio.to_thread(seed_in_process, args)
+        print(f"seed: {len(users)} usuários, {args.alerts_per_user} alertas cada", file=sys.stderr)
+
+        runner = LoadRunner(client, app=app, base_url=args.base_url, think_ms=args.think_ms)
+        rng = random.Random(args.seed)
+        virtual_users = [
+            VirtualUser(runner, u["id"], u["email"], u["token"], random.Random(rng.random()))
+            for u in users
+        ]
+
+        started = time.perf_counter()
+        deadline = started + args.duration
+        await asyncio.gather(*(vu.run(deadline) for vu in virtual_users))
+        elapsed = time.perf_counter() - started
+
+    routes = {}
+    total_requests = 0
+    total_errors = 0
+    for route, values in sorted(runner.latencies.items()):
+        errors = runner.errors.get(route, 0)
+        total_requests += len(values)
+        total_errors += errors
+        routes[route] = {
+            "requests": len(values),
+            "throughput_rps": round(len(values) / elapsed, 2),
+            "errors": errors,
+            "error_rate": round(errors / len(values), 4) if values else 0.0,
+            "latency_ms": summarize(values)
+        }
+
+    totals = {
+        "requests": total_requests,
+        "errors": total_errors,
+        "error_rate": round(total_errors / total_requests, 4) if total_requests else 0.0,
+        "throughput_rps": round(total_requests / elapsed, 2),
+        "elapsed_seconds": round(elapsed, 2)
+    }
+    return {"routes": routes, "totals": totals}
+
+
+def print_report(result: Dict):
+    print(f"{'rota':<34} {'req':>7} {'rps':>8} {'erros':>6} {'p50':>9} {'p95':>9} {'p99':>9}")
+    for route, stats in result["routes"].items():
+        latency = stats["latency_ms"]
+        print(
+            f"{route:<34} {stats['requests']:>7} {stats['throughput_rps']:>8.1f} {stats['errors']:>6} "
+            f"{latency['p50']:>9.1f} {latency['p95']:>9.1f} {latency['p99']:>9.1f}"
+        )
+    totals = result["totals"]
+    print(
+        f"\ntotal: {totals['requests']} requisições em {totals['elapsed_seconds']} s "
+        f"({totals['throughput_rps']} req/s), {totals['error_rate']:.2%} de erros"
+    )
+
+
+def main(argv=None) -> int:
+    args = parse_args(argv)
+    if not args.base_url:
+        configure_environment(args.database_url)
+
+    if not args.base_url:
+        from app.core.logging_config import setup_logging
+
+        from .common import environment_info
+        from .stubs import install_market_stub
+
+        setup_logging()
+        # Nenhuma chamada de cotação sai da máquina
+        install_market_stub()
+        environment = environment_info()
+    else:
+        from .common import git_revision
+        environment = {"git": git_revision(), "target": args.base_url}
+
+    result = asyncio.run(run_load(args))
+    print_report(result)
+
+    violations = []
+    budgets = {}
+    if not args.no_budgets:
+        with open(args.budgets) as f:
+            budgets = json.load(f)
+        violations = check_budgets(result["routes"], result["totals"], budgets)
+
+    payload = {
+        "benchmark": "load_test",
+        "environment": environment,
+        "params": vars(args),
+        "budgets": budgets,
+        "violations": violations,
+        "summary": {
+            "throughput_rps": result["totals"]["throughput_rps"],
+            "error_rate": result["totals"]["error_rate"],
+            "routes": {route: stats["latency_ms"] for route, stats in result["routes"].items()}
+        },
+        "routes": result["routes"],
+        "totals": result["totals"]
+    }
+    path = write_results("load_test", payload, args.output)
+    print(f"\nResultado gravado em {path}", file=sys.stderr)
+
+    if violations:
+        print("\n❌ Orçamento de latência estourado:", file=sys.stderr)
+        for violation in violations:
+            print(f"   - {violation}", file=sys.stderr)
+        return 1
+
+    print("✅ Dentro do orçamento" if budgets else "ℹ️ Sem orçamento configurado", file=sys.stderr)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
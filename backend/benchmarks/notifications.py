@@ -0,0 +1,144 @@
+"""
+Benchmark de envio de notificações contra o stub local do SendGrid
+
+Gera alertas disparados sintéticos (N usuários × M alertas) e compara:
+- digest: um resumo por usuário, até 1000 destinatários por chamada (send_digests)
+- per-alert: um email por alerta, como antes do resumo (send_alert_email)
+
+O stub roda num servidor uvicorn em thread, porque o SDK do SendGrid usa urllib.
+
+Uso (a partir de backend/):
+    python -m benchmarks.notifications --users 2000 --alerts-per-user 15 --latency-ms 150
+    python -m benchmarks.notifications --mode digest --users 20000
+"""
+
+import argparse
+import os
+import random
+import sys
+import time
+
+from .common import configure_environment, write_results
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark de envio de emails de alerta")
+    parser.add_argument("--users", type=int, default=1000)
+    parser.add_argument("--alerts-per-user", type=int, default=5)
+    parser.add_argument("--mode", choices=["both", "digest", "per-alert"], default="both")
+    parser.add_argument("--baseline-users", type=int, default=50,
+                        help="Usuários no modo per-alert (uma chamada por alerta fica lenta rápido)")
+    parser.add_argument("--latency-ms", type=float, default=100.0)
+    parser.add_argument("--jitter-ms", type=float, default=20.0)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--output", default=None, help="Arquivo JSON de saída")
+    return parser.parse_args(argv)
+
+
+def make_digests(users: int, alerts_per_user: int, seed: int):
+    from app.services.email_templates import AlertNotice
+
+    from .seed import bench_email, make_tickers
+    from .stubs import base_price
+
+    rng = random.Random(seed)
+    tickers = make_tickers(40)
+    digests = {}
+    for user in range(users):
+        notices = []
+        for ticker in rng.sample(tickers, min(alerts_per_user, len(tickers))):
+            price = base_price(ticker)
+            notices.append(AlertNotice(ticker, "price", ">", round(price * 0.95, 2), price))
+        digests[bench_email(user)] = notices
+    return digests
+
+
+def run_mode(mode: str, digests, stub) -> dict:
+    from app.services.email_templates import digest_substitutions
+    from app.services.notification import notification_service
+
+    before = stub.stats()
+    notices = sum(len(items) for items in digests.values())
+
+    # Só a montagem dos dados por destinatário (o layout não é renderizado aqui)
+    started = time.perf_counter()
+    for items in digests.values():
+        digest_substitutions(items)
+    render_seconds = time.perf_counter() - started
+
+    started = time.perf_counter()
+    if mode == "digest":
+        accepted = len(notification_service.send_digests(digests))
+    else:
+        accepted = sum(
+            notification_service.send_alert_email(
+                email, notice.ticker, notice.alert_type, notice.condition,
+                notice.target_value, notice.current_value
+            )
+            for email, items in digests.items()
+            for notice in items
+        )
+    elapsed = time.perf_counter() - started
+
+    after = stub.stats()
+    calls = after["requests"] - before["requests"]
+    result = {
+        "users": len(digests),
+        "notices": notices,
+        "emails_accepted": accepted,
+        "api_calls": calls,
+        "api_errors": after["errors"] - before["errors"],
+        "bytes_sent": after["bytes_received"] - before["bytes_received"],
+        "seconds": round(elapsed, 3),
+        "render_ms": round(render_seconds * 1000, 2),
+        "notices_per_second": round(notices / elapsed, 1) if elapsed else None,
+        "notices_per_call": round(notices / calls, 1) if calls else None
+    }
+    print(
+        f"{mode}: {notices} alertas em {elapsed:.2f}s, {calls} chamadas à API, "
+        f"{result['notices_per_second']} alertas/s",
+        file=sys.stderr
+    )
+    return result
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    configure_environment()
+
+    from .stubs import SendGridStub, serve_in_thread
+
+    stub = SendGridStub(
+        latency_ms=args.latency_ms, jitter_ms=args.jitter_ms, error_rate=args.error_rate, seed=args.seed
+    )
+    server, url = serve_in_thread(stub)
+    # Único benchmark que manda "email": sempre para o stub local
+    os.environ["SENDGRID_API_KEY"] = "benchmark"
+    os.environ["SENDGRID_API_HOST"] = url
+
+    from .common import environment_info
+
+    results = {}
+    try:
+        if args.mode in ("both", "digest"):
+            results["digest"] = run_mode("digest", make_digests(args.users, args.alerts_per_user, args.seed), stub)
+        if args.mode in ("both", "per-alert"):
+            baseline = make_digests(min(args.users, args.baseline_users), args.alerts_per_user, args.seed)
+            results["per_alert"] = run_mode("per-alert", baseline, stub)
+    finally:
+        server.should_exit = True
+
+    payload = {
+        "benchmark": "notifications",
+        "environment": environment_info(),
+        "params": vars(args),
+        "results": results
+    }
+    path = write_results("notifications", payload, args.output)
+    print(f"✅ Resultado gravado em {path}", file=sys.stderr)
+    return payload
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,127 @@
+"""
+Popula o banco com usuários, tickers e alertas sintéticos
+
+Os alvos são escolhidos a partir do preço base do stub, então a fração
+de alertas que dispara em cada ciclo é controlada por `trigger_ratio`.
+"""
+
+import random
+from datetime import datetime, timedelta
+from typing import Dict, List
+
+from sqlalchemy import insert, update
+from sqlalchemy.orm import Session
+
+from .stubs import MAX_CHANGE_PERCENT, base_price
+
+# Tickers reais primeiro; o resto é sintético
+B3_TICKERS = [
+    "PETR4", "VALE3", "ITUB4", "BBDC4", "BBAS3", "ABEV3", "WEGE3", "MGLU3",
+    "B3SA3", "RENT3", "PETR3", "ITUB3", "BBDC3", "SUZB3", "GGBR4", "ELET3"
+]
+
+# Hash fixo: bcrypt de verdade tornaria o seed lento e não é o que está sendo medido
+SEED_PASSWORD_HASH = "$2b$12$benchmarkbenchmarkbenchmarkbenchmarkbenchmarkbenchma"
+
+INSERT_BATCH = 5000
+
+
+def bench_email(suffix) -> str:
+    # Domínios reservados como .test são rejeitados pelo EmailStr do login
+    return f"bench{suffix}@bench.gatilho.app"
+
+
+def make_tickers(count: int) -> List[str]:
+    tickers = B3_TICKERS[:count]
+    tickers += [f"BM{i:03d}3" for i in range(count - len(tickers))]
+    return tickers
+
+
+def _alert_row(rng: random.Random, user_id: int, ticker: str, trigger: bool, now: datetime) -> Dict:
+    alert_type = rng.choices(["price", "percentage", "volume"], weights=[80, 15, 5])[0]
+
+    if alert_type == "price":
+        # Preço do stub fica em base ± MAX_CHANGE_PERCENT
+        base = base_price(ticker)
+        if trigger:
+            condition, target = ">", round(base * (1 - 2 * MAX_CHANGE_PERCENT / 100), 2)
+        else:
+            condition, target = rng.choice([(">", base * 1.5), ("<", base * 0.5)])
+            target = round(target, 2)
+    elif alert_type == "percentage":
+        # O scheduler compara |variação|, que nunca passa de MAX_CHANGE_PERCENT
+        condition, target = (">=", 0.0) if trigger else (">", MAX_CHANGE_PERCENT * 2)
+    else:
+        condition, target = (">", 0.0) if trigger else (">", 1e12)
+
+    created_at = now - timedelta(minutes=rng.randint(0, 60 * 24 * 90))
+    return {
+        "user_id": user_id,
+        "ticker": ticker,
+        "alert_type": alert_type,
+        "target_value": target,
+        "condition": condition,
+        "is_active": True,
+        "triggered": False,
+        "created_at": created_at,
+        "updated_at": created_at
+    }
+
+
+def seed_database(
+    db: Session,
+    users: int,
+    alerts_per_user: int,
+    tickers: int,
+    trigger_ratio: float = 0.05,
+    seed: int = 42,
+    password_hash: str = SEED_PASSWORD_HASH
+) -> Dict:
+    """
+    Insere usuários e alertas em lote
+    A popularidade dos tickers segue uma distribuição tipo Zipf, como em produção.
+    """
+    from app.models.alert import Alert
+    from app.models.user import User
+
+    rng = random.Random(seed)
+    now = datetime.utcnow()
+    ticker_list = make_tickers(tickers)
+    weights = [1 / (rank + 1) for rank in range(len(ticker_list))]
+
+    user_ids = db.scalars(
+        insert(User).returning(User.id),
+        [
+            {"email": bench_email(i), "name": f"Bench {i}", "hashed_password": password_hash}
+            for i in range(users)
+        ]
+    ).all()
+
+    batch = []
+    total = 0
+    for user_id in user_ids:
+        for ticker in rng.choices(ticker_list, weights=weights, k=alerts_per_user):
+            batch.append(_alert_row(rng, user_id, ticker, rng.random() < trigger_ratio, now))
+            if len(batch) >= INSERT_BATCH:
+                db.execute(insert(Alert), batch)
+                total += len(batch)
+                batch = []
+    if batch:
+        db.execute(insert(Alert), batch)
+        total += len(batch)
+
+    db.commit()
+    return {"users": len(user_ids), "alerts": total, "tickers": len(ticker_list)}
+
+
+def rearm_alerts(db: Session) -> int:
+    """Reativa os alertas disparados para o próximo ciclo medir o mesmo volume"""
+    from app.models.alert import Alert
+
+    result = db.execute(
+        update(Alert)
+        .where(Alert.triggered == True)
+        .values(is_active=True, triggered=False, triggered_at=None)
+    )
+    db.commit()
+    return result.rowcount
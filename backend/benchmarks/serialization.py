@@ -0,0 +1,166 @@
+"""
+Microbenchmark de serialização: custo por 1.000 alertas
+
+Compara, sobre as mesmas linhas sintéticas (tuplas na ordem de ALERT_FIELDS):
+- respostas de lista: modelo Pydantic com field_serializer, dicts com isoformat
+  passando pelo jsonable_encoder + json, e o caminho atual (tuplas -> orjson)
+- cache em memória: json da stdlib x cache_dumps/cache_loads (e msgpack, se instalado)
+- WebSocket: send_json (json da stdlib) x orjson (e msgpack, se instalado)
+
+Não usa banco nem rede. Uso (a partir de backend/):
+    python -m benchmarks.serialization --alerts 1000 --runs 200
+"""
+
+import argparse
+import json
+import random
+import sys
+import time
+from datetime import datetime, timedelta
+from typing import Callable, Dict, List, Optional
+
+from .common import configure_environment, summarize, write_results
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Mede o custo de serialização por 1.000 alertas")
+    parser.add_argument("--alerts", type=int, default=1000, help="Alertas por payload")
+    parser.add_argument("--runs", type=int, default=200)
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--output", default=None, help="Arquivo JSON de saída")
+    return parser.parse_args(argv)
+
+
+def make_rows(count: int, seed: int) -> List[tuple]:
+    """Linhas como as do SELECT de GET /api/alerts (ALERT_FIELDS)"""
+    rng = random.Random(seed)
+    now = datetime.utcnow()
+    rows = []
+    for index in range(count):
+        triggered = rng.random() < 0.3
+        created_at = now - timedelta(minutes=rng.randint(0, 60 * 24 * 90), microseconds=rng.randint(0, 999999))
+        rows.append((
+            index + 1, f"TICK{rng.randint(0, 80)}", rng.choice(["price", "percentage", "volume", "rsi"]),
+            round(rng.uniform(1, 100), 2), rng.choice([">", "<", ">=", "<="]),
+            14 if rng.random() < 0.2 else None, None,
+            not triggered, triggered, created_at,
+            created_at + timedelta(hours=rng.randint(1, 48)) if triggered else None,
+        ))
+    return rows
+
+
+def _time(fn: Callable[[], object], runs: int, scale: float) -> Dict:
+    """Milissegundos por execução, normalizados para 1.000 alertas"""
+    fn()
+    samples = []
+    for _ in range(runs):
+        started = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - started) * 1000 * scale)
+    return summarize(samples)
+
+
+def build_cases(rows: List[tuple]) -> Dict[str, Callable[[], object]]:
+    from fastapi.encoders import jsonable_encoder
+    from pydantic import BaseModel, field_serializer
+
+    from app.api.alerts import ALERT_FIELDS
+    from app.core.serialization import HAS_MSGPACK, cache_dumps, cache_loads, dumps, loads, packb, unpackb
+
+    class AlertModel(BaseModel):
+        # Forma do antigo AlertResponse
+        id: int
+        ticker: str
+        alert_type: str
+        target_value: float
+        condition: str
+        period: Optional[int] = None
+        expression: Optional[str] = None
+        is_active: bool
+        triggered: bool
+        created_at: datetime
+        triggered_at: Optional[datetime] = None
+
+        @field_serializer('created_at', 'triggered_at')
+        def serialize_datetime(self, dt: Optional[datetime], _info):
+            return dt.isoformat() if dt else None
+
+    fields = list(ALERT_FIELDS)
+
+    def iso(value):
+        return value.isoformat() if isinstance(value, datetime) else value
+
+    def stdlib(content) -> bytes:
+        # Mesmas opções da JSONResponse do Starlette
+        return json.dumps(content, ensure_ascii=False, allow_nan=False, separators=(",", ":")).encode()
+
+    payload = [dict(zip(fields, row)) for row in rows]
+    iso_payload = [{name: iso(value) for name, value in item.items()} for item in payload]
+    json_cached = json.dumps(iso_payload)
+    fast_cached = cache_dumps(payload)
+    message = {"type": "alerts", "alerts": payload}
+
+    cases = {
+        "response.pydantic_models": lambda: stdlib(jsonable_encoder(
+            [AlertModel(**item).model_dump() for item in payload]
+        )),
+        "response.dicts_jsonable_encoder": lambda: stdlib(jsonable_encoder(
+            [{name: iso(value) for name, value in zip(fields, row)} for row in rows]
+        )),
+        "response.rows_orjson": lambda: dumps([dict(zip(fields, row)) for row in rows]),
+        "cache.set_stdlib_json": lambda: json.dumps(iso_payload),
+        "cache.set_cache_dumps": lambda: cache_dumps(payload),
+        "cache.get_stdlib_json": lambda: json.loads(json_cached),
+        "cache.get_cache_loads": lambda: cache_loads(fast_cached),
+        "websocket.send_json": lambda: json.dumps({"type": "alerts", "alerts": iso_payload}, separators=(",", ":")),
+        "websocket.orjson_text": lambda: dumps(message).decode(),
+    }
+    if HAS_MSGPACK:
+        packed = packb(payload)
+        cases["cache.set_msgpack"] = lambda: packb(payload)
+        cases["cache.get_msgpack"] = lambda: unpackb(packed)
+        cases["websocket.msgpack"] = lambda: packb(message)
+
+    # Conferência: o caminho rápido gera o mesmo JSON que o antigo
+    assert loads(cases["response.rows_orjson"]()) == json.loads(cases["response.dicts_jsonable_encoder"]())
+    return cases
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    configure_environment()
+
+    rows = make_rows(args.alerts, args.seed)
+    cases = build_cases(rows)
+    scale = 1000 / args.alerts
+
+    results = {}
+    for name, fn in cases.items():
+        results[name] = _time(fn, args.runs, scale)
+        print(f"{name:36s} p50 {results[name]['p50']:8.3f} ms / 1.000 alertas", file=sys.stderr)
+
+    from .common import environment_info
+
+    sizes = {
+        "stdlib_json_bytes": len(cases["response.dicts_jsonable_encoder"]()),
+        "orjson_bytes": len(cases["response.rows_orjson"]()),
+    }
+    if "websocket.msgpack" in cases:
+        sizes["msgpack_bytes"] = len(cases["cache.set_msgpack"]())
+
+    payload = {
+        "benchmark": "serialization",
+        "environment": environment_info(),
+        "params": vars(args),
+        "unit": "ms por 1.000 alertas",
+        "summary": results,
+        "payload_sizes": sizes,
+    }
+    path = write_results("serialization", payload, args.output)
+    baseline = results["response.dicts_jsonable_encoder"]["p50"]
+    fast = results["response.rows_orjson"]["p50"]
+    print(f"✅ lista: {baseline:.2f} ms -> {fast:.2f} ms por 1.000 alertas — {path}", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,165 @@
+"""
+Benchmark de cold start do worker
+
+Cada execução roda num processo novo e mede:
+- import de app.main (e se abriu alguma conexão com o banco nesse momento)
+- startup do lifespan (logging, scheduler)
+- primeira resposta de /health
+- shutdown do lifespan
+
+Uso (a partir de backend/):
+    python -m benchmarks.startup --runs 10
+    python -m benchmarks.startup --runs 5 --importtime 15   # + módulos mais caros no import
+"""
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+import time
+from pathlib import Path
+from typing import Dict, List
+
+from .common import summarize, write_results
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Mede o tempo de cold start do app")
+    parser.add_argument("--runs", type=int, default=10)
+    parser.add_argument("--database-url", default=None)
+    parser.add_argument("--importtime", type=int, default=0, metavar="N",
+                        help="Lista os N módulos com maior tempo cumulativo de import")
+    parser.add_argument("--output", default=None, help="Arquivo JSON de saída")
+    parser.add_argument("--child", action="store_true", help=argparse.SUPPRESS)
+    return parser.parse_args(argv)
+
+
+def _child(database_url):
+    """Roda dentro do processo novo e imprime as medidas em JSON"""
+    from .common import configure_environment
+
+    configure_environment(database_url)
+
+    import asyncio
+    from sqlalchemy import event
+    from sqlalchemy.pool import Pool
+
+    connections = {"count": 0}
+
+    def _on_connect(*_):
+        connections["count"] += 1
+
+    # Qualquer conexão aberta durante o import aparece aqui
+    event.listen(Pool, "connect", _on_connect)
+
+    started = time.perf_counter()
+    from app.main import app
+    import_seconds = time.perf_counter() - started
+    import_connections = connections["count"]
+
+    async def serve_once():
+        import httpx
+
+        started = time.perf_counter()
+        async with app.router.lifespan_context(app):
+            startup_seconds = time.perf_counter() - started
+
+            started = time.perf_counter()
+            transport = httpx.ASGITransport(app=app)
+            async with httpx.AsyncClient(transport=transport, base_url="http://testserver") as client:
+                response = await client.get("/health")
+                response.raise_for_status()
+            first_request_seconds = time.perf_counter() - started
+
+            started = time.perf_counter()
+        shutdown_seconds = time.perf_counter() - started
+        return startup_seconds, first_request_seconds, shutdown_seconds
+
+    startup_seconds, first_request_seconds, shutdown_seconds = asyncio.run(serve_once())
+
+    print(json.dumps({
+        "import_ms": import_seconds * 1000,
+        "lifespan_startup_ms": startup_seconds * 1000,
+        "first_request_ms": first_request_seconds * 1000,
+        "lifespan_shutdown_ms": shutdown_seconds * 1000,
+        "ready_ms": (import_seconds + startup_seconds + first_request_seconds) * 1000,
+        "db_connections_during_import": import_connections,
+        "modules_loaded": len(sys.modules)
+    }))
+
+
+def _spawn(database_url, extra_flags: List[str] = ()) -> subprocess.CompletedProcess:
+    command = [sys.executable, *extra_flags, "-m", "benchmarks.startup", "--child"]
+    if database_url:
+        command += ["--database-url", database_url]
+    env = {k: v for k, v in os.environ.items() if k != "DATABASE_URL"}
+    return subprocess.run(command, cwd=BACKEND_DIR, env=env, capture_output=True, text=True, check=True)
+
+
+def slowest_imports(database_url, top: int, max_depth: int = 2) -> List[Dict]:
+    """Módulos com maior tempo cumulativo segundo -X importtime (até max_depth níveis de aninhamento)"""
+    stderr = _spawn(database_url, ["-X", "importtime"]).stderr
+    rows = []
+    for line in stderr.splitlines():
+        if not line.startswith("import time:"):
+            continue
+        _, cumulative, name = line.split("|")
+        if not cumulative.strip().isdigit():
+            continue
+        # Cada nível de aninhamento acrescenta dois espaços antes do nome
+        depth = (len(name) - len(name.lstrip()) - 1) // 2
+        if depth <= max_depth:
+            rows.append({
+                "module": name.strip(),
+                "depth": depth,
+                "cumulative_ms": round(int(cumulative) / 1000, 2)
+            })
+    rows.sort(key=lambda row: row["cumulative_ms"], reverse=True)
+    return rows[:top]
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    if args.child:
+        _child(args.database_url)
+        return
+
+    runs = []
+    for index in range(args.runs):
+        result = _spawn(args.database_url)
+        run = json.loads(result.stdout.strip().splitlines()[-1])
+        runs.append(run)
+        print(
+            f"execução {index + 1}/{args.runs}: import {run['import_ms']:.0f} ms, "
+            f"pronto em {run['ready_ms']:.0f} ms",
+            file=sys.stderr
+        )
+
+    from .common import git_revision
+
+    payload = {
+        "benchmark": "startup",
+        "environment": {"git": git_revision(), "python": sys.version.split()[0]},
+        "params": {k: v for k, v in vars(args).items() if k != "child"},
+        "summary": {
+            key: summarize([run[key] for run in runs])
+            for key in ("import_ms", "lifespan_startup_ms", "first_request_ms", "lifespan_shutdown_ms", "ready_ms")
+        },
+        "db_connections_during_import": max(run["db_connections_during_import"] for run in runs),
+        "runs": runs
+    }
+    if args.importtime:
+        payload["slowest_imports"] = slowest_imports(args.database_url, args.importtime)
+
+    path = write_results("startup", payload, args.output)
+    summary = payload["summary"]["ready_ms"]
+    print(f"✅ pronto em p50 {summary['p50']:.0f} ms / p95 {summary['p95']:.0f} ms — {path}", file=sys.stderr)
+    if payload["db_connections_during_import"]:
+        print("⚠️ O import do app abriu conexões com o banco", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
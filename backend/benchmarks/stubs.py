@@ -0,0 +1,333 @@
+"""
+Stubs locais das APIs externas (ASGI puro, sem dependências extras)
+
+TwelveDataStub responde /quote e /time_series com preços determinísticos
+por ticker; BrapiStub responde /quote/{ticker} da brapi.dev com os mesmos
+preços; SendGridStub aceita /v3/mail/send e conta chamadas, destinatários
+e bytes. Todos permitem injetar latência e erros e podem rodar em processo
+ou como servidor:
+
+    python -m benchmarks.stubs --port 8099 --latency-ms 80 --error-rate 0.02
+    TWELVE_DATA_BASE_URL=http://127.0.0.1:8099 uvicorn app.main:app
+
+    python -m benchmarks.stubs --service brapi --port 8097 --latency-ms 40
+    BRAPI_BASE_URL=http://127.0.0.1:8097 uvicorn app.main:app
+
+    python -m benchmarks.stubs --service sendgrid --port 8098 --latency-ms 150
+    SENDGRID_API_KEY=stub SENDGRID_API_HOST=http://127.0.0.1:8098 uvicorn app.main:app
+
+O SDK do SendGrid usa urllib, então o stub dele precisa de um servidor de
+verdade (veja serve_in_thread).
+"""
+
+import argparse
+import asyncio
+import json
+import random
+import socket
+import threading
+import time
+import zlib
+from collections import Counter
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional, Tuple
+from urllib.parse import parse_qs
+
+
+def base_price(ticker: str) -> float:
+    """Preço base determinístico do ticker (hash() do Python é aleatorizado por processo)"""
+    return 5 + (zlib.crc32(ticker.encode()) % 9500) / 100
+
+
+# Variação máxima (em %) aplicada pelo stub sobre o preço base
+MAX_CHANGE_PERCENT = 5.0
+
+
+class TwelveDataStub:
+    """App ASGI que imita os endpoints da Twelve Data usados pelo MarketDataService"""
+
+    def __init__(
+        self,
+        latency_ms: float = 0.0,
+        jitter_ms: float = 0.0,
+        error_rate: float = 0.0,
+        api_error_rate: float = 0.0,
+        seed: int = 42
+    ):
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+        # Fração de respostas HTTP 500
+        self.error_rate = error_rate
+        # Fração de respostas 200 com {"code": 429} (limite de requisições da API)
+        self.api_error_rate = api_error_rate
+        self.random = random.Random(seed)
+        self.requests = Counter()
+
+    def quote(self, ticker: str) -> Dict:
+        base = base_price(ticker)
+        change = self.random.uniform(-MAX_CHANGE_PERCENT, MAX_CHANGE_PERCENT)
+        return {
+            "symbol": ticker,
+            "close": f"{base * (1 + change / 100):.2f}",
+            "volume": str(self.random.randint(100_000, 50_000_000)),
+            "percent_change": f"{change:.4f}"
+        }
+
+    def time_series(self, ticker: str, interval: str, outputsize: int) -> Dict:
+        price = base_price(ticker)
+        step = {"1min": 1, "5min": 5, "15min": 15, "30min": 30, "45min": 45, "1h": 60}.get(interval, 5)
+        now = datetime.utcnow().replace(second=0, microsecond=0)
+        values = []
+        for i in range(outputsize):
+            close = price * (1 + self.random.uniform(-0.01, 0.01))
+            values.append({
+                "datetime": (now - timedelta(minutes=step * i)).strftime("%Y-%m-%d %H:%M:%S"),
+                "open": f"{price:.2f}",
+                "high": f"{max(price, close) * 1.002:.2f}",
+                "low": f"{min(price, close) * 0.998:.2f}",
+                "close": f"{close:.2f}",
+                "volume": str(self.random.randint(10_000, 500_000))
+            })
+            price = close
+        return {"meta": {"symbol": ticker, "interval": interval}, "values": values, "status": "ok"}
+
+    async def _delay(self):
+        if self.latency_ms or self.jitter_ms:
+            delay = max(0.0, self.random.gauss(self.latency_ms, self.jitter_ms))
+            await asyncio.sleep(delay / 1000)
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] == "lifespan":
+            while True:
+                message = await receive()
+                if message["type"] == "lifespan.startup":
+                    await send({"type": "lifespan.startup.complete"})
+                elif message["type"] == "lifespan.shutdown":
+                    await send({"type": "lifespan.shutdown.complete"})
+                    return
+
+        endpoint = scope["path"].strip("/")
+        params = {k: v[0] for k, v in parse_qs(scope.get("query_string", b"").decode()).items()}
+        self.requests[endpoint] += 1
+
+        await self._delay()
+
+        roll = self.random.random()
+        if roll < self.error_rate:
+            await self._respond(send, 500, {"status": "error", "message": "stub: erro injetado"})
+            return
+        if roll < self.error_rate + self.api_error_rate:
+            await self._respond(send, *self.api_error())
+            return
+
+        await self._respond(send, *self.route(endpoint, params))
+
+    def api_error(self) -> Tuple[int, Dict]:
+        return 200, {"code": 429, "message": "stub: limite de requisições", "status": "error"}
+
+    def route(self, endpoint: str, params: Dict) -> Tuple[int, Dict]:
+        symbol = params.get("symbol", "")
+        if endpoint == "quote":
+            return 200, self.quote(symbol)
+        if endpoint == "time_series":
+            return 200, self.time_series(symbol, params.get("interval", "5min"), int(params.get("outputsize", 30)))
+        return 404, {"code": 404, "message": f"stub: endpoint {endpoint} não suportado"}
+
+    async def _respond(self, send, status: int, payload: Dict):
+        body = json.dumps(payload).encode()
+        await send({
+            "type": "http.response.start",
+            "status": status,
+            "headers": [(b"content-type", b"application/json"), (b"content-length", str(len(body)).encode())]
+        })
+        await send({"type": "http.response.body", "body": body})
+
+
+class BrapiStub(TwelveDataStub):
+    """Mesmos preços e injeção de falhas, no formato da brapi.dev (GET /quote/{ticker})"""
+
+    def api_error(self) -> Tuple[int, Dict]:
+        return 429, {"error": True, "message": "stub: limite de requisições"}
+
+    def route(self, endpoint: str, params: Dict) -> Tuple[int, Dict]:
+        resource, _, symbol = endpoint.partition("/")
+        if resource != "quote" or not symbol:
+            return 404, {"error": True, "message": f"stub: endpoint {endpoint} não suportado"}
+        quote = self.quote(symbol)
+        return 200, {"results": [{
+            "symbol": symbol,
+            "regularMarketPrice": float(quote["close"]),
+            "regularMarketVolume": int(quote["volume"]),
+            "regularMarketChangePercent": float(quote["percent_change"]),
+        }]}
+
+
+def install_market_stub(stub: Optional[TwelveDataStub] = None, brapi: Optional[BrapiStub] = None) -> TwelveDataStub:
+    """
+    Aponta o market_data_service global para os stubs, em processo
+    Sem stub da brapi, só a Twelve Data fica como provedor: nada sai para a rede.
+    """
+    import httpx
+    from app.services.market_data import BrapiProvider, market_data_service
+
+    stub = stub or TwelveDataStub()
+    twelvedata = market_data_service.twelvedata
+    twelvedata.transport = httpx.ASGITransport(app=stub)
+    twelvedata.base_url = "http://twelvedata.stub"
+    providers = [twelvedata]
+
+    if brapi is not None:
+        provider = BrapiProvider("http://brapi.stub", "")
+        provider.transport = httpx.ASGITransport(app=brapi)
+        providers.append(provider)
+
+    market_data_service.providers = providers
+    return stub
+
+
+class SendGridStub:
+    """
+    App ASGI que imita o POST /v3/mail/send do SendGrid (responde 202 sem corpo)
+    Com keep_messages=True guarda o corpo de cada envio aceito em `messages`.
+    """
+
+    def __init__(
+        self, latency_ms: float = 0.0, jitter_ms: float = 0.0, error_rate: float = 0.0, seed: int = 42,
+        keep_messages: bool = False
+    ):
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+        self.error_rate = error_rate
+        self.random = random.Random(seed)
+        self.requests = 0
+        self.personalizations = 0
+        self.recipients = 0
+        self.bytes_received = 0
+        self.errors = 0
+        self.keep_messages = keep_messages
+        self.messages: List[Dict] = []
+        self._lock = threading.Lock()
+
+    def stats(self) -> Dict:
+        return {
+            "requests": self.requests,
+            "personalizations": self.personalizations,
+            "recipients": self.recipients,
+            "bytes_received": self.bytes_received,
+            "errors": self.errors
+        }
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] == "lifespan":
+            while True:
+                message = await receive()
+                if message["type"] == "lifespan.startup":
+                    await send({"type": "lifespan.startup.complete"})
+                elif message["type"] == "lifespan.shutdown":
+                    await send({"type": "lifespan.shutdown.complete"})
+                    return
+
+        body = b""
+        while True:
+            message = await receive()
+            body += message.get("body", b"")
+            if not message.get("more_body"):
+                break
+
+        if scope["method"] != "POST" or scope["path"].rstrip("/") != "/v3/mail/send":
+            await self._respond(send, 404, {"errors": [{"message": "stub: endpoint não suportado"}]})
+            return
+
+        with self._lock:
+            delay = max(0.0, self.random.gauss(self.latency_ms, self.jitter_ms)) if self.latency_ms or self.jitter_ms else 0.0
+            failed = self.random.random() < self.error_rate
+        if delay:
+            await asyncio.sleep(delay / 1000)
+
+        try:
+            message = json.loads(body)
+            personalizations = message["personalizations"]
+        except (ValueError, KeyError, TypeError):
+            await self._respond(send, 400, {"errors": [{"message": "stub: corpo inválido"}]})
+            return
+
+        with self._lock:
+            self.requests += 1
+            self.bytes_received += len(body)
+            if failed:
+                self.errors += 1
+            else:
+                self.personalizations += len(personalizations)
+                self.recipients += sum(len(p.get("to", [])) for p in personalizations)
+                if self.keep_messages:
+                    self.messages.append(message)
+
+        if failed:
+            await self._respond(send, 500, {"errors": [{"message": "stub: erro injetado"}]})
+        else:
+            await send({"type": "http.response.start", "status": 202, "headers": [(b"content-length", b"0")]})
+            await send({"type": "http.response.body", "body": b""})
+
+    async def _respond(self, send, status: int, payload: Dict):
+        body = json.dumps(payload).encode()
+        await send({
+            "type": "http.response.start",
+            "status": status,
+            "headers": [(b"content-type", b"application/json"), (b"content-length", str(len(body)).encode())]
+        })
+        await send({"type": "http.response.body", "body": body})
+
+
+def serve_in_thread(app, host: str = "127.0.0.1", port: int = 0) -> Tuple[object, str]:
+    """
+    Sobe o app ASGI num servidor uvicorn em thread daemon
+    Retorna (server, url); server.should_exit = True encerra.
+    """
+    import uvicorn
+
+    if not port:
+        with socket.socket() as probe:
+            probe.bind((host, 0))
+            port = probe.getsockname()[1]
+
+    server = uvicorn.Server(uvicorn.Config(app, host=host, port=port, log_level="warning", lifespan="off"))
+    threading.Thread(target=server.run, daemon=True).start()
+    while not server.started:
+        time.sleep(0.01)
+    return server, f"http://{host}:{port}"
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Servidor stub das APIs externas")
+    parser.add_argument("--service", choices=["twelvedata", "brapi", "sendgrid"], default="twelvedata")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8099)
+    parser.add_argument("--latency-ms", type=float, default=0.0)
+    parser.add_argument("--jitter-ms", type=float, default=0.0)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--api-error-rate", type=float, default=0.0)
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    import uvicorn
+
+    if args.service == "sendgrid":
+        stub = SendGridStub(
+            latency_ms=args.latency_ms,
+            jitter_ms=args.jitter_ms,
+            error_rate=args.error_rate,
+            seed=args.seed
+        )
+    else:
+        stub = (BrapiStub if args.service == "brapi" else TwelveDataStub)(
+            latency_ms=args.latency_ms,
+            jitter_ms=args.jitter_ms,
+            error_rate=args.error_rate,
+            api_error_rate=args.api_error_rate,
+            seed=args.seed
+        )
+    uvicorn.run(stub, host=args.host, port=args.port, log_level="warning")
+
+
+if __name__ == "__main__":
+    main()
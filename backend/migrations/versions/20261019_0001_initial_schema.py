@@ -0,0 +1,63 @@
+"""initial schema
+
+Schema de antes de qualquer migração: usuários e alertas, exatamente como
+o antigo create_all do startup criava. Bancos criados assim devem ser
+marcados com `alembic stamp 0001`; as revisões seguintes trazem o que
+veio depois (updated_at, rollups, sketches, índices).
+
+Revision ID: 0001
+Revises:
+Create Date: 2026-10-19 12:34:31.204588
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+revision: str = '0001'
+down_revision: Union[str, None] = None
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        'users',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('email', sa.String(), nullable=False),
+        sa.Column('name', sa.String(), nullable=True),
+        sa.Column('hashed_password', sa.String(), nullable=False),
+        sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.func.now(), nullable=True),
+        sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index('ix_users_email', 'users', ['email'], unique=True)
+    op.create_index('ix_users_id', 'users', ['id'])
+
+    op.create_table(
+        'alerts',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('user_id', sa.Integer(), nullable=False),
+        sa.Column('ticker', sa.String(), nullable=False),
+        sa.Column('alert_type', sa.String(), nullable=False),
+        sa.Column('target_value', sa.Float(), nullable=False),
+        sa.Column('condition', sa.String(), nullable=False),
+        sa.Column('is_active', sa.Boolean(), nullable=True),
+        sa.Column('triggered', sa.Boolean(), nullable=True),
+        sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.func.now(), nullable=True),
+        sa.Column('triggered_at', sa.DateTime(timezone=True), nullable=True),
+        sa.ForeignKeyConstraint(['user_id'], ['users.id']),
+        sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index('ix_alerts_id', 'alerts', ['id'])
+    op.create_index('ix_alerts_ticker', 'alerts', ['ticker'])
+    op.create_index('idx_user_active', 'alerts', ['user_id', 'is_active'])
+    op.create_index('idx_ticker_type', 'alerts', ['ticker', 'alert_type'])
+    op.create_index('idx_triggered_at', 'alerts', ['triggered_at'])
+
+
+def downgrade() -> None:
+    op.drop_table('alerts')
+    op.drop_index('ix_users_id', table_name='users')
+    op.drop_index('ix_users_email', table_name='users')
+    op.drop_table('users')
@@ -0,0 +1,49 @@
+"""alerts.updated_at for dashboard delta sync
+
+Revision ID: 0001a
+Revises: 0001
+Create Date: 2026-10-19 12:40:00.000000
+
+O create_all nunca adicionou colunas a tabelas existentes, então bancos
+anteriores ao delta-sync não têm `updated_at`. A coluna entra anulável,
+recebe o último momento conhecido de cada alerta (disparo ou criação) e
+só então passa a NOT NULL, com default no servidor para escritas de fora
+do ORM.
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+revision: str = '0001a'
+down_revision: Union[str, None] = '0001'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    with op.batch_alter_table('alerts') as batch_op:
+        batch_op.add_column(sa.Column('updated_at', sa.DateTime(timezone=True), nullable=True))
+
+    alerts = sa.table('alerts', sa.column('created_at'), sa.column('triggered_at'), sa.column('updated_at'))
+    op.execute(
+        alerts.update().values(
+            updated_at=sa.func.coalesce(alerts.c.triggered_at, alerts.c.created_at, sa.func.now())
+        )
+    )
+
+    with op.batch_alter_table('alerts') as batch_op:
+        batch_op.alter_column(
+            'updated_at',
+            existing_type=sa.DateTime(timezone=True),
+            nullable=False,
+            server_default=sa.func.now(),
+        )
+    op.create_index('idx_user_updated', 'alerts', ['user_id', 'updated_at'])
+
+
+def downgrade() -> None:
+    op.drop_index('idx_user_updated', table_name='alerts')
+    with op.batch_alter_table('alerts') as batch_op:
+        batch_op.drop_column('updated_at')
@@ -0,0 +1,69 @@
+"""daily rollups for analytics
+
+Revision ID: 0001b
+Revises: 0001a
+Create Date: 2026-10-19 12:45:00.000000
+
+Cria alert_daily_rollups e preenche com um GROUP BY sobre os alertas
+existentes (criações por created_at, disparos por triggered_at). Bancos em
+que o antigo create_all já criou a tabela mantêm os contadores que têm;
+`python -m app.tasks.rollups` recalcula tudo se preciso.
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+revision: str = '0001b'
+down_revision: Union[str, None] = '0001a'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    if sa.inspect(op.get_bind()).has_table('alert_daily_rollups'):
+        return
+
+    op.create_table(
+        'alert_daily_rollups',
+        sa.Column('user_id', sa.Integer(), nullable=False),
+        sa.Column('day', sa.Date(), nullable=False),
+        sa.Column('alert_type', sa.String(), nullable=False),
+        sa.Column('created_count', sa.Integer(), nullable=False),
+        sa.Column('triggered_count', sa.Integer(), nullable=False),
+        sa.ForeignKeyConstraint(['user_id'], ['users.id']),
+        sa.PrimaryKeyConstraint('user_id', 'day', 'alert_type')
+    )
+
+    alerts = sa.table(
+        'alerts', sa.column('user_id'), sa.column('alert_type'), sa.column('created_at'), sa.column('triggered_at')
+    )
+    rollups = sa.table(
+        'alert_daily_rollups', sa.column('user_id'), sa.column('day'), sa.column('alert_type'),
+        sa.column('created_count'), sa.column('triggered_count')
+    )
+    # Uma linha por criação e uma por disparo, somadas por (usuário, dia, tipo)
+    events = sa.union_all(
+        sa.select(
+            alerts.c.user_id, sa.func.date(alerts.c.created_at).label('day'), alerts.c.alert_type,
+            sa.literal(1).label('created'), sa.literal(0).label('triggered')
+        ).where(alerts.c.created_at.isnot(None)),
+        sa.select(
+            alerts.c.user_id, sa.func.date(alerts.c.triggered_at).label('day'), alerts.c.alert_type,
+            sa.literal(0).label('created'), sa.literal(1).label('triggered')
+        ).where(alerts.c.triggered_at.isnot(None)),
+    ).subquery()
+    op.execute(
+        rollups.insert().from_select(
+            ['user_id', 'day', 'alert_type', 'created_count', 'triggered_count'],
+            sa.select(
+                events.c.user_id, events.c.day, events.c.alert_type,
+                sa.func.sum(events.c.created), sa.func.sum(events.c.triggered)
+            ).group_by(events.c.user_id, events.c.day, events.c.alert_type)
+        )
+    )
+
+
+def downgrade() -> None:
+    op.drop_table('alert_daily_rollups')
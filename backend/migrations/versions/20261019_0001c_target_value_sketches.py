@@ -0,0 +1,38 @@
+"""target value sketches for suggestions
+
+Revision ID: 0001c
+Revises: 0001b
+Create Date: 2026-10-19 12:50:00.000000
+
+Só a tabela, sem backfill: com ela vazia, o ValueSketchStore
+(services/value_sketches.py) reconstrói os sketches a partir dos alertas vivos.
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+revision: str = '0001c'
+down_revision: Union[str, None] = '0001b'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # Bancos em que o antigo create_all já criou a tabela
+    if sa.inspect(op.get_bind()).has_table('target_value_sketches'):
+        return
+
+    op.create_table(
+        'target_value_sketches',
+        sa.Column('ticker', sa.String(), nullable=False),
+        sa.Column('alert_type', sa.String(), nullable=False),
+        sa.Column('payload', sa.Text(), nullable=False),
+        sa.Column('updated_at', sa.DateTime(timezone=True), server_default=sa.func.now(), nullable=True),
+        sa.PrimaryKeyConstraint('ticker', 'alert_type')
+    )
+
+
+def downgrade() -> None:
+    op.drop_table('target_value_sketches')
@@ -0,0 +1,30 @@
+"""indexes for keyset pagination and history
+
+Revision ID: 0001d
+Revises: 0001c
+Create Date: 2026-10-19 12:55:00.000000
+
+Índices da paginação por cursor das listagens de alertas. O create_all só
+criava índices junto com tabelas novas, então nenhum banco antigo os tem.
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+
+revision: str = '0001d'
+down_revision: Union[str, None] = '0001c'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_index('idx_user_created', 'alerts', ['user_id', 'created_at', 'id'])
+    op.create_index('idx_user_active_created', 'alerts', ['user_id', 'is_active', 'created_at', 'id'])
+    op.create_index('idx_user_triggered', 'alerts', ['user_id', 'triggered_at', 'id'])
+
+
+def downgrade() -> None:
+    op.drop_index('idx_user_triggered', table_name='alerts')
+    op.drop_index('idx_user_active_created', table_name='alerts')
+    op.drop_index('idx_user_created', table_name='alerts')
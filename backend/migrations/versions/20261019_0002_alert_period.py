@@ -0,0 +1,26 @@
+"""alert period for indicator alerts
+
+Revision ID: 0002
+Revises: 0001d
+Create Date: 2026-10-19 13:05:00.000000
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+revision: str = '0002'
+down_revision: Union[str, None] = '0001d'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    with op.batch_alter_table('alerts') as batch_op:
+        batch_op.add_column(sa.Column('period', sa.Integer(), nullable=True))
+
+
+def downgrade() -> None:
+    with op.batch_alter_table('alerts') as batch_op:
+        batch_op.drop_column('period')
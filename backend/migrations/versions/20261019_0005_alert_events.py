@@ -0,0 +1,164 @@
+"""alert events log and alerts archive
+
+Revision ID: 0005
+Revises: 0004
+Create Date: 2026-10-19 19:30:00.000000
+
+No Postgres, alert_events é particionada por mês (RANGE em triggered_at),
+com uma partição por mês desde o disparo mais antigo até dois meses à
+frente e uma partição default. As seguintes são criadas pelo job diário
+(services/events.py). Os disparos já existentes em `alerts` são copiados
+para o log (sem preço: ele não era guardado).
+"""
+from datetime import date
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+revision: str = '0005'
+down_revision: Union[str, None] = '0004'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+MONTHS_AHEAD = 2
+
+EVENT_COLUMNS = (
+    "triggered_at", "user_id", "alert_id", "ticker", "alert_type", "condition",
+    "target_value", "period", "expression", "alert_created_at",
+)
+
+
+def _add_months(month: date, months: int) -> date:
+    index = month.year * 12 + month.month - 1 + months
+    return date(index // 12, index % 12 + 1, 1)
+
+
+def _create_partitioned_events(bind) -> None:
+    op.execute("""
+        CREATE TABLE alert_events (
+            id BIGSERIAL NOT NULL,
+            triggered_at TIMESTAMP WITH TIME ZONE NOT NULL,
+            user_id INTEGER NOT NULL REFERENCES users (id),
+            alert_id INTEGER NOT NULL,
+            ticker VARCHAR NOT NULL,
+            alert_type VARCHAR NOT NULL,
+            condition VARCHAR NOT NULL,
+            target_value DOUBLE PRECISION NOT NULL,
+            period INTEGER,
+            expression VARCHAR,
+            trigger_value DOUBLE PRECISION,
+            price DOUBLE PRECISION,
+            alert_created_at TIMESTAMP WITH TIME ZONE,
+            PRIMARY KEY (id, triggered_at)
+        ) PARTITION BY RANGE (triggered_at)
+    """)
+    op.execute("CREATE TABLE alert_events_default PARTITION OF alert_events DEFAULT")
+
+    oldest = bind.scalar(sa.text("SELECT min(triggered_at) FROM alerts WHERE triggered_at IS NOT NULL"))
+    current = date.today().replace(day=1)
+    month = date(oldest.year, oldest.month, 1) if oldest else current
+    last = _add_months(current, MONTHS_AHEAD)
+    while month <= last:
+        following = _add_months(month, 1)
+        op.execute(
+            f"CREATE TABLE alert_events_y{month.year:04d}m{month.month:02d} PARTITION OF alert_events "
+            f"FOR VALUES FROM ('{month.isoformat()}') TO ('{following.isoformat()}')"
+        )
+        month = following
+
+
+def upgrade() -> None:
+    bind = op.get_bind()
+
+    if bind.dialect.name == "postgresql":
+        _create_partitioned_events(bind)
+    else:
+        op.create_table(
+            'alert_events',
+            sa.Column('id', sa.BigInteger().with_variant(sa.Integer(), 'sqlite'), nullable=False),
+            sa.Column('triggered_at', sa.DateTime(timezone=True), nullable=False),
+            sa.Column('user_id', sa.Integer(), nullable=False),
+            sa.Column('alert_id', sa.Integer(), nullable=False),
+            sa.Column('ticker', sa.String(), nullable=False),
+            sa.Column('alert_type', sa.String(), nullable=False),
+            sa.Column('condition', sa.String(), nullable=False),
+            sa.Column('target_value', sa.Float(), nullable=False),
+            sa.Column('period', sa.Integer(), nullable=True),
+            sa.Column('expression', sa.String(), nullable=True),
+            sa.Column('trigger_value', sa.Float(), nullable=True),
+            sa.Column('price', sa.Float(), nullable=True),
+            sa.Column('alert_created_at', sa.DateTime(timezone=True), nullable=True),
+            sa.ForeignKeyConstraint(['user_id'], ['users.id']),
+            sa.PrimaryKeyConstraint('id')
+        )
+    # Criados na tabela pai, os índices valem para todas as partições
+    op.create_index('idx_events_user_triggered', 'alert_events', ['user_id', 'triggered_at', 'id'])
+    op.create_index('idx_events_triggered_at', 'alert_events', ['triggered_at'])
+
+    op.create_table(
+        'alerts_archive',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('user_id', sa.Integer(), nullable=False),
+        sa.Column('ticker', sa.String(), nullable=False),
+        sa.Column('alert_type', sa.String(), nullable=False),
+        sa.Column('target_value', sa.Float(), nullable=False),
+        sa.Column('condition', sa.String(), nullable=False),
+        sa.Column('period', sa.Integer(), nullable=True),
+        sa.Column('expression', sa.String(), nullable=True),
+        sa.Column('triggered', sa.Boolean(), nullable=True),
+        sa.Column('created_at', sa.DateTime(timezone=True), nullable=True),
+        sa.Column('triggered_at', sa.DateTime(timezone=True), nullable=True),
+        sa.Column('updated_at', sa.DateTime(timezone=True), nullable=True),
+        sa.Column('archived_at', sa.DateTime(timezone=True), nullable=False),
+        sa.ForeignKeyConstraint(['user_id'], ['users.id']),
+        sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index('ix_alerts_archive_user_id', 'alerts_archive', ['user_id'])
+
+    # Disparos anteriores ao log
+    alerts = sa.table(
+        'alerts',
+        *[sa.column(name) for name in (
+            "id", "user_id", "ticker", "alert_type", "condition", "target_value",
+            "period", "expression", "triggered", "created_at", "triggered_at",
+        )]
+    )
+    events = sa.table('alert_events', *[sa.column(name) for name in EVENT_COLUMNS])
+    op.execute(
+        events.insert().from_select(
+            list(EVENT_COLUMNS),
+            sa.select(
+                alerts.c.triggered_at, alerts.c.user_id, alerts.c.id, alerts.c.ticker,
+                alerts.c.alert_type, alerts.c.condition, alerts.c.target_value,
+                alerts.c.period, alerts.c.expression, alerts.c.created_at
+            ).where(alerts.c.triggered == sa.true(), alerts.c.triggered_at.isnot(None))
+        )
+    )
+
+
+def downgrade() -> None:
+    # Alertas arquivados voltam para a tabela quente (inativos)
+    columns = (
+        "id", "user_id", "ticker", "alert_type", "target_value", "condition", "period",
+        "expression", "triggered", "created_at", "triggered_at", "updated_at",
+    )
+    archive = sa.table('alerts_archive', *[sa.column(name) for name in columns], sa.column('archived_at'))
+    alerts = sa.table('alerts', *[sa.column(name) for name in columns], sa.column('is_active'))
+    op.execute(
+        alerts.insert().from_select(
+            [*columns, "is_active"],
+            sa.select(
+                *[archive.c[name] for name in columns if name != "updated_at"],
+                sa.func.coalesce(archive.c.updated_at, archive.c.archived_at),
+                sa.false()
+            )
+        )
+    )
+    op.drop_index('ix_alerts_archive_user_id', table_name='alerts_archive')
+    op.drop_table('alerts_archive')
+    op.drop_index('idx_events_triggered_at', table_name='alert_events')
+    op.drop_index('idx_events_user_triggered', table_name='alert_events')
+    # No Postgres as partições caem junto com a tabela pai
+    op.drop_table('alert_events')
@@ -0,0 +1,55 @@
+"""partial and covering indexes for hot alert queries
+
+Revision ID: 0006
+Revises: 0005
+Create Date: 2026-10-19 21:00:00.000000
+
+Troca os índices de `alerts` que cobriam linhas inativas por índices parciais
+sobre os alertas vivos/pendentes. idx_user_active era prefixo de
+idx_user_active_created; idx_triggered_at e idx_user_triggered ficaram sem
+uso quando o histórico passou para alert_events.
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+revision: str = '0006'
+down_revision: Union[str, None] = '0005'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# Mesmo texto que o SQLAlchemy gera nas consultas (o SQLite compara termo a termo)
+PENDING = {
+    "sqlite_where": sa.text("is_active = 1 AND triggered = 0"),
+    "postgresql_where": sa.text("is_active = true AND triggered = false"),
+}
+LIVE = {
+    "sqlite_where": sa.text("is_active = 1"),
+    "postgresql_where": sa.text("is_active = true"),
+}
+
+
+def upgrade() -> None:
+    op.create_index('idx_alerts_pending', 'alerts', ['alert_type', 'ticker', 'period'], **PENDING)
+    op.create_index('idx_alerts_live_created', 'alerts', ['user_id', 'created_at', 'id'], **LIVE)
+    op.create_index('idx_alerts_live_covering', 'alerts', ['user_id', 'alert_type', 'ticker'], **LIVE)
+    op.create_index('idx_alerts_live_ticker', 'alerts', ['ticker', 'alert_type', 'target_value'], **LIVE)
+
+    op.drop_index('idx_user_active', table_name='alerts')
+    op.drop_index('idx_user_active_created', table_name='alerts')
+    op.drop_index('idx_triggered_at', table_name='alerts')
+    op.drop_index('idx_user_triggered', table_name='alerts')
+
+
+def downgrade() -> None:
+    op.create_index('idx_user_triggered', 'alerts', ['user_id', 'triggered_at', 'id'])
+    op.create_index('idx_triggered_at', 'alerts', ['triggered_at'])
+    op.create_index('idx_user_active_created', 'alerts', ['user_id', 'is_active', 'created_at', 'id'])
+    op.create_index('idx_user_active', 'alerts', ['user_id', 'is_active'])
+
+    op.drop_index('idx_alerts_live_ticker', table_name='alerts')
+    op.drop_index('idx_alerts_live_covering', table_name='alerts')
+    op.drop_index('idx_alerts_live_created', table_name='alerts')
+    op.drop_index('idx_alerts_pending', table_name='alerts')
@@ -0,0 +1,29 @@
+"""users.tokens_valid_after for token revocation
+
+Revision ID: 0007
+Revises: 0006
+Create Date: 2026-10-19 22:10:00.000000
+
+Revogação de tokens por usuário (logout, troca de senha) gravada no banco,
+para valer em todos os processos e sobreviver a restarts.
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+revision: str = '0007'
+down_revision: Union[str, None] = '0006'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    with op.batch_alter_table('users') as batch_op:
+        batch_op.add_column(sa.Column('tokens_valid_after', sa.Float(), nullable=True))
+
+
+def downgrade() -> None:
+    with op.batch_alter_table('users') as batch_op:
+        batch_op.drop_column('tokens_valid_after')
@@ -0,0 +1,56 @@
+"""
+POST /api/alerts/bulk: cada linha válida devolve o id do alerta criado a partir dela
+"""
+
+from fastapi.testclient import TestClient
+from sqlalchemy import delete, select
+
+from app.core.cache import cache_clear
+from app.core.database import SessionLocal
+from app.core.security import create_access_token
+from app.main import app
+from app.models.alert import Alert
+from app.tasks.rollups import backfill_rollups
+
+USER_ID = 43
+
+
+def test_bulk_maps_each_row_to_its_alert(plan_engine):
+    cache_clear()
+    client = TestClient(app, headers={"Authorization": f"Bearer {create_access_token({'sub': str(USER_ID)})}"})
+    payload = []
+    for index in range(60):
+        if index % 7 == 3:
+            payload.append({"ticker": "PETR4", "alert_type": "price", "target_value": 10, "condition": "??"})
+        else:
+            payload.append({
+                "ticker": f"BULK{index}", "alert_type": "price",
+                "target_value": 100 + index, "condition": ">",
+            })
+
+    response = client.post("/api/alerts/bulk", json=payload)
+    assert response.status_code == 201, response.text
+    body = response.json()
+
+    invalid = [index + 1 for index in range(60) if index % 7 == 3]
+    assert [error["row"] for error in body["errors"]] == invalid
+    assert body["created"] == 60 - len(invalid)
+
+    db = SessionLocal()
+    try:
+        ids = [item["id"] for item in body["alerts"]]
+        created = {
+            alert_id: (ticker, target_value)
+            for alert_id, ticker, target_value in db.execute(
+                select(Alert.id, Alert.ticker, Alert.target_value).where(Alert.id.in_(ids))
+            )
+        }
+        for item in body["alerts"]:
+            row = payload[item["row"] - 1]
+            assert created[item["id"]] == (row["ticker"], row["target_value"])
+    finally:
+        db.execute(delete(Alert).where(Alert.user_id == USER_ID, Alert.ticker.like("BULK%")))
+        db.commit()
+        backfill_rollups(db, user_id=USER_ID)
+        db.close()
+        cache_clear()
@@ -0,0 +1,95 @@
+"""
+Resumos por email: agrupamento por destinatário, lotes de personalizations e
+limites de linhas/bytes do resumo, contra o SendGridStub
+"""
+
+from app.services.email_templates import (
+    MAX_DIGEST_ROWS, MAX_PERSONALIZATIONS, MAX_ROWS_BYTES, OVERFLOW_ROW, AlertNotice, digest_substitutions,
+    render_row
+)
+from app.services.notification import notification_service
+from app.services.outbox import ClaimedNotification, _deliver
+
+
+def _notice(ticker: str = "PETR4", condition: str = ">") -> AlertNotice:
+    return AlertNotice(
+        ticker=ticker, alert_type="price", condition=condition, target_value=30.0, current_value=31.2
+    )
+
+
+def _payload(notice: AlertNotice) -> dict:
+    return {
+        "ticker": notice.ticker, "alert_type": notice.alert_type, "condition": notice.condition,
+        "target_value": notice.target_value, "current_value": notice.current_value,
+    }
+
+
+def test_outbox_rows_are_grouped_into_one_digest_per_recipient(sendgrid_stub):
+    claimed = [
+        ClaimedNotification(1, "k1", "a@gatilho.app", _payload(_notice("PETR4")), 1),
+        ClaimedNotification(2, "k2", "b@gatilho.app", _payload(_notice("VALE3")), 1),
+        ClaimedNotification(3, "k3", "a@gatilho.app", _payload(_notice("ITUB4")), 1),
+    ]
+
+    assert sorted(_deliver(claimed)) == ["a@gatilho.app", "b@gatilho.app"]
+    assert sendgrid_stub.requests == 1
+    [message] = sendgrid_stub.messages
+    by_email = {p["to"][0]["email"]: p for p in message["personalizations"]}
+    assert set(by_email) == {"a@gatilho.app", "b@gatilho.app"}
+    assert by_email["a@gatilho.app"]["subject"] == "🔔 2 alertas disparados: PETR4, ITUB4"
+    rows = by_email["a@gatilho.app"]["substitutions"]["-rows-"]
+    assert "PETR4" in rows and "ITUB4" in rows and "VALE3" not in rows
+    assert by_email["b@gatilho.app"]["subject"] == "🔔 Alerta Disparado: VALE3"
+
+
+def test_recipients_are_split_into_batches_of_max_personalizations(sendgrid_stub):
+    digests = {f"user{i}@gatilho.app": [_notice()] for i in range(MAX_PERSONALIZATIONS + 1)}
+
+    accepted = notification_service.send_digests(digests)
+
+    assert accepted == list(digests)
+    assert sendgrid_stub.requests == 2
+    assert [len(m["personalizations"]) for m in sendgrid_stub.messages] == [MAX_PERSONALIZATIONS, 1]
+    assert sendgrid_stub.personalizations == MAX_PERSONALIZATIONS + 1
+
+
+def test_failed_batch_is_not_reported_as_accepted(sendgrid_stub):
+    sendgrid_stub.error_rate = 1.0
+    assert notification_service.send_digests({"a@gatilho.app": [_notice()]}) == []
+    assert sendgrid_stub.errors == 1
+
+
+def test_max_rows_fit_under_the_byte_cap():
+    longest = render_row(AlertNotice("TICK11", "percentage", ">=", -100000.0, -100000.0))
+    assert MAX_DIGEST_ROWS * len(longest.encode()) <= MAX_ROWS_BYTES
+
+
+def test_digest_is_truncated_to_max_rows():
+    notices = [_notice(f"TICK{i}") for i in range(MAX_DIGEST_ROWS + 5)]
+
+    rows = digest_substitutions(notices)["-rows-"]
+
+    assert rows.count("<tr>") == MAX_DIGEST_ROWS + 1
+    assert f"TICK{MAX_DIGEST_ROWS - 1}" in rows
+    assert f"TICK{MAX_DIGEST_ROWS}<" not in rows
+    assert rows.endswith(OVERFLOW_ROW.render(count=5))
+
+
+def test_digest_rows_stay_under_the_byte_cap():
+    # Expressões longas estouram os bytes antes do limite de linhas
+    notices = [_notice(f"TICK{i}", condition="X" * 1500) for i in range(MAX_DIGEST_ROWS)]
+    row_bytes = len(render_row(notices[0]).encode())
+    fits = MAX_ROWS_BYTES // row_bytes
+    assert fits < MAX_DIGEST_ROWS
+
+    rows = digest_substitutions(notices)["-rows-"]
+
+    overflow = OVERFLOW_ROW.render(count=MAX_DIGEST_ROWS - fits)
+    assert rows.endswith(overflow)
+    assert rows.count("<tr>") == fits + 1
+    assert len(rows[:-len(overflow)].encode()) <= MAX_ROWS_BYTES
+
+
+def test_single_notice_digest_has_no_overflow_row():
+    rows = digest_substitutions([_notice()])["-rows-"]
+    assert rows == render_row(_notice())
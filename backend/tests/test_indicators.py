@@ -0,0 +1,159 @@
+"""
+Indicadores incrementais contra um cálculo de referência sobre série fixa,
+reinício do VWAP na virada do dia e montagem das barras a partir das cotações
+"""
+
+import math
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+from app.services.indicators import BAR_SECONDS, Bar, EMAState, RSIState, SMAState, TickerSeries, VWAPState
+
+START = datetime(2025, 3, 3, 13, 0, tzinfo=timezone.utc)
+STEP = timedelta(seconds=BAR_SECONDS)
+
+# Série do exemplo clássico do RSI de Wilder (período 14)
+WILDER_CLOSES = [
+    44.34, 44.09, 44.15, 43.61, 44.33, 44.83, 45.10, 45.42, 45.84, 46.08,
+    45.89, 46.03, 45.61, 46.28, 46.28, 46.00, 46.03, 46.41, 46.22, 45.64
+]
+WILDER_RSI = [70.53, 66.32, 66.55, 69.41, 66.36, 57.97]
+
+CLOSES = [round(20 + 3 * math.sin(i / 4) + 0.05 * i, 2) for i in range(80)]
+
+
+def _bars(closes, start=START):
+    return [Bar(start + i * STEP, close + 0.5, close - 0.5, close, 100.0 + i) for i, close in enumerate(closes)]
+
+
+def _sma(closes, period):
+    return [
+        sum(closes[i + 1 - period:i + 1]) / period if i + 1 >= period else None
+        for i in range(len(closes))
+    ]
+
+
+def _ema(closes, period):
+    alpha = 2 / (period + 1)
+    values, ema = [], None
+    for i, close in enumerate(closes):
+        if i + 1 == period:
+            ema = sum(closes[:period]) / period
+        elif ema is not None:
+            ema = alpha * close + (1 - alpha) * ema
+        values.append(ema)
+    return values
+
+
+def _rsi(closes, period):
+    changes = [b - a for a, b in zip(closes, closes[1:])]
+    values = [None] * period
+    avg_gain = sum(max(c, 0) for c in changes[:period]) / period
+    avg_loss = sum(max(-c, 0) for c in changes[:period]) / period
+    for i in range(period, len(closes)):
+        if i > period:
+            change = changes[i - 1]
+            avg_gain = (avg_gain * (period - 1) + max(change, 0)) / period
+            avg_loss = (avg_loss * (period - 1) + max(-change, 0)) / period
+        values.append(100 - 100 / (1 + avg_gain / avg_loss) if avg_loss else 100.0)
+    return values
+
+
+@pytest.mark.parametrize("state_class, reference, period", [
+    (SMAState, _sma, 20),
+    (EMAState, _ema, 20),
+    (RSIState, _rsi, 14),
+    (SMAState, _sma, 5),
+    (EMAState, _ema, 9),
+])
+def test_incremental_state_matches_reference(state_class, reference, period):
+    expected = reference(CLOSES, period)
+    bars = _bars(CLOSES)
+    state = state_class(period)
+    for i, bar in enumerate(bars):
+        if state.value(None) is not None:
+            # A barra em formação entra na leitura como se já estivesse fechada
+            assert state.value(bar) == pytest.approx(expected[i])
+        state.update(bar)
+        if expected[i] is None:
+            assert state.value(None) is None
+        else:
+            assert state.value(None) == pytest.approx(expected[i])
+
+
+def test_rsi_matches_wilder_example():
+    values = []
+    state = RSIState(14)
+    for bar in _bars(WILDER_CLOSES):
+        state.update(bar)
+        if state.value(None) is not None:
+            values.append(state.value(None))
+    assert values == pytest.approx(WILDER_RSI, abs=0.1)
+
+
+def test_vwap_resets_at_day_boundary():
+    state = VWAPState()
+    state.update(Bar(START, 11.0, 9.0, 10.0, 100.0))
+    state.update(Bar(START + STEP, 13.0, 11.0, 12.0, 300.0))
+    assert state.value(None) == pytest.approx((10 * 100 + 12 * 300) / 400)
+
+    next_day = START + timedelta(days=1)
+    pending = Bar(next_day, 21.0, 19.0, 20.0, 50.0)
+    # A barra em formação do dia seguinte não mistura com a sessão anterior
+    assert state.value(pending) == pytest.approx(20.0)
+
+    state.update(pending)
+    state.update(Bar(next_day + STEP, 31.0, 29.0, 30.0, 150.0))
+    assert state.value(None) == pytest.approx((20 * 50 + 30 * 150) / 200)
+
+
+def test_bar_volume_is_derived_from_cumulative_volume():
+    series = TickerSeries()
+    series.on_quote(10.0, 1000, START)
+    series.on_quote(10.4, 1500, START + timedelta(minutes=1))
+    # Cotação atrasada com acumulado menor não desconta volume
+    series.on_quote(10.2, 1400, START + timedelta(minutes=2))
+    assert (series.pending.high, series.pending.low, series.pending.close) == (10.4, 10.0, 10.2)
+    assert series.pending.volume == 1500
+
+    series.on_quote(10.1, 1800, START + STEP)
+    assert [bar.volume for bar in series.history] == [1500]
+    assert series.pending.volume == 300
+
+    # Novo dia: o acumulado do provedor recomeça
+    series.on_quote(11.0, 200, START + timedelta(days=1))
+    assert [bar.volume for bar in series.history] == [1500, 300]
+    assert series.pending.volume == 200
+
+
+def test_load_history_merges_intraday_before_live_bars():
+    series = TickerSeries()
+    series.add_state("sma", 5)
+    live_start = START + 6 * STEP
+    for i, close in enumerate([30.0, 31.0, 32.0]):
+        series.on_quote(close, 100 * (i + 1), live_start + i * STEP)
+    assert len(series.history) == 2
+
+    # O intraday cobre as mesmas barras já montadas ao vivo, com outros valores
+    intraday = _bars([20.0 + i for i in range(9)])
+    series.load_history(intraday)
+
+    starts = [bar.start for bar in series.history]
+    assert starts == sorted(set(starts))
+    assert starts == [START + i * STEP for i in range(8)]
+    assert [bar.close for bar in series.history][-3:] == [25.0, 30.0, 31.0]
+    assert series.warmed
+    # O estado é refeito sobre a série combinada
+    assert series.states[("sma", 5)].value(None) == pytest.approx((23 + 24 + 25 + 30 + 31) / 5)
+    assert series.states[("sma", 5)].value(series.pending) == pytest.approx((24 + 25 + 30 + 31 + 32) / 5)
+
+
+def test_load_history_before_first_live_bar_closes():
+    series = TickerSeries()
+    series.on_quote(30.0, 100, START + 3 * STEP)
+
+    series.load_history(_bars([20.0, 21.0, 22.0, 23.0, 24.0]))
+
+    assert [bar.start for bar in series.history] == [START, START + STEP, START + 2 * STEP]
+    assert series.pending.close == 30.0
@@ -0,0 +1,195 @@
+"""
+Hedge e failover entre provedores de cotação, contra os stubs locais
+(Twelve Data e brapi em processo, sem rede)
+"""
+
+import asyncio
+import time
+
+import httpx
+import pytest
+
+from app.core.cache import cache_clear
+from app.services import market_data
+from app.services.market_data import BrapiProvider, MarketDataService, TwelveDataProvider
+from benchmarks.stubs import BrapiStub, TwelveDataStub
+
+
+def _service(twelvedata: TwelveDataStub, brapi: BrapiStub) -> MarketDataService:
+    service = MarketDataService()
+    service.twelvedata.transport = httpx.ASGITransport(app=twelvedata)
+    service.twelvedata.base_url = "http://twelvedata.stub"
+    provider = BrapiProvider("http://brapi.stub", "")
+    provider.transport = httpx.ASGITransport(app=brapi)
+    service.providers = [service.twelvedata, provider]
+    # Ordem fixa: Twelve Data principal, brapi no hedge
+    service._provider_order = lambda: list(service.providers)
+    return service
+
+
+@pytest.fixture(autouse=True)
+def fresh_cache():
+    cache_clear()
+    yield
+    cache_clear()
+
+
+def test_hedges_to_second_provider_after_p95(monkeypatch):
+    monkeypatch.setattr(market_data, "DEFAULT_HEDGE_DELAY", 0.05)
+    service = _service(TwelveDataStub(latency_ms=2000), BrapiStub(latency_ms=5))
+
+    started = time.perf_counter()
+    quote = asyncio.run(service.get_quote("PETR4"))
+    elapsed = time.perf_counter() - started
+
+    assert quote["_provider"] == "brapi"
+    assert quote["price"] > 0
+    assert elapsed < 1.0
+    # A chamada lenta foi cancelada: não conta como falha da Twelve Data
+    assert service.twelvedata.stats.failures == 0
+
+
+def test_hedge_losers_lose_health_and_feed_p95(monkeypatch):
+    monkeypatch.setattr(market_data, "DEFAULT_HEDGE_DELAY", 0.05)
+    service = _service(TwelveDataStub(latency_ms=2000), BrapiStub(latency_ms=5))
+    stats = service.twelvedata.stats
+
+    async def cycle():
+        for index in range(5):
+            assert (await service.get_quote(f"TICK{index}"))["_provider"] == "brapi"
+
+    asyncio.run(cycle())
+    assert stats.hedge_losses == 5
+    # O tempo até o cancelamento é um piso da latência real
+    assert min(stats.latencies) >= 0.05
+    assert stats.weight() < service.providers[1].stats.weight()
+    assert service.provider_stats()["twelvedata"]["hedge_losses"] == 5
+
+
+def test_hedge_delay_follows_observed_p95():
+    stats = market_data.ProviderStats()
+    assert stats.hedge_delay(10.0) == market_data.DEFAULT_HEDGE_DELAY
+    for index in range(100):
+        stats.record_success(0.1 + index / 1000)
+    assert stats.hedge_delay(10.0) == pytest.approx(0.195)
+    assert stats.hedge_delay(0.15) == 0.15
+
+
+def test_fails_over_without_waiting_for_hedge_delay():
+    service = _service(TwelveDataStub(error_rate=1.0), BrapiStub())
+
+    started = time.perf_counter()
+    quote = asyncio.run(service.get_quote("VALE3"))
+
+    assert quote["_provider"] == "brapi"
+    assert time.perf_counter() - started < market_data.DEFAULT_HEDGE_DELAY
+    assert service.twelvedata.stats.failures == 1
+
+
+def test_no_mock_when_every_provider_fails():
+    service = _service(TwelveDataStub(api_error_rate=1.0), BrapiStub(api_error_rate=1.0))
+    assert asyncio.run(service.get_quote("ITUB4")) is None
+
+    service.mock_fallback = True
+    assert asyncio.run(service.get_quote("ITUB4"))["_mock"] is True
+
+
+def test_selection_is_weighted_by_health():
+    service = MarketDataService()
+    twelvedata, brapi = TwelveDataProvider("http://a", ""), BrapiProvider("http://b", "")
+    service.providers = [twelvedata, brapi]
+    for _ in range(10):
+        twelvedata.stats.record_failure()
+
+    primaries = [service._provider_order()[0] for _ in range(1000)]
+    assert primaries.count(brapi) > 900
+    # O doente ainda recebe tráfego para poder se recuperar
+    assert primaries.count(twelvedata) > 0
+
+
+def test_each_provider_maps_tickers():
+    assert TwelveDataProvider("http://a", "key").quote_request("petr4.SA") == (
+        "quote", {"symbol": "PETR4", "apikey": "key"}
+    )
+    assert BrapiProvider("http://b", "").quote_request("VALE5") == ("quote/VALE3", {})
+
+
+def _single_provider(stub: TwelveDataStub, monkeypatch, **settings) -> MarketDataService:
+    for name, value in settings.items():
+        monkeypatch.setattr(market_data.settings, name, value)
+    service = MarketDataService()
+    service.twelvedata.transport = httpx.ASGITransport(app=stub)
+    service.twelvedata.base_url = "http://twelvedata.stub"
+    service.providers = [service.twelvedata]
+    return service
+
+
+def test_circuit_opens_and_fails_fast(monkeypatch):
+    stub = TwelveDataStub(error_rate=1.0)
+    service = _single_provider(stub, monkeypatch, CIRCUIT_FAILURE_THRESHOLD=3, CIRCUIT_RECOVERY_SECONDS=60)
+
+    async def cycle():
+        for index in range(10):
+            assert await service.get_quote(f"TICK{index}") is None
+
+    asyncio.run(cycle())
+    breaker = service.breakers[("twelvedata", "quote")]
+    assert breaker.state == breaker.OPEN
+    # Só as chamadas até abrir chegaram ao provedor
+    assert stub.requests["quote"] == 3
+    assert breaker.rejected == 7
+    # Cada endpoint tem o próprio circuito
+    assert ("twelvedata", "time_series") not in service.breakers
+
+
+def test_api_errors_in_200_responses_open_circuit(monkeypatch):
+    # Twelve Data responde o limite de requisições com status 200 e {"code": 429}
+    stub = TwelveDataStub(api_error_rate=1.0)
+    service = _single_provider(stub, monkeypatch, CIRCUIT_FAILURE_THRESHOLD=3, CIRCUIT_RECOVERY_SECONDS=60)
+
+    async def cycle():
+        for index in range(10):
+            assert await service.get_quote(f"TICK{index}") is None
+
+    asyncio.run(cycle())
+    breaker = service.breakers[("twelvedata", "quote")]
+    assert breaker.state == breaker.OPEN
+    assert stub.requests["quote"] == 3
+
+
+def test_circuit_half_open_probe_closes_or_reopens(monkeypatch):
+    stub = TwelveDataStub(error_rate=1.0)
+    service = _single_provider(
+        stub, monkeypatch,
+        CIRCUIT_FAILURE_THRESHOLD=2, CIRCUIT_RECOVERY_SECONDS=0.05, CIRCUIT_HALF_OPEN_PROBES=1
+    )
+    breaker = service.breaker(service.twelvedata, "quote")
+
+    async def scenario():
+        for ticker in ("A", "B"):
+            await service.get_quote(ticker)
+        assert breaker.state == breaker.OPEN
+
+        # Passado o tempo de recuperação, uma prova; ainda falhando, reabre
+        await asyncio.sleep(0.06)
+        await service.get_quote("C")
+        assert breaker.state == breaker.OPEN
+        assert stub.requests["quote"] == 3
+
+        # Provedor de volta: a prova passa e o circuito fecha
+        stub.error_rate = 0.0
+        await asyncio.sleep(0.06)
+        assert (await service.get_quote("D"))["_provider"] == "twelvedata"
+        assert breaker.state == breaker.CLOSED
+
+    asyncio.run(scenario())
+    assert service.provider_stats()["twelvedata"]["circuits"]["quote"]["state"] == "closed"
+
+
+def test_client_errors_do_not_open_circuit(monkeypatch):
+    service = _single_provider(TwelveDataStub(), monkeypatch, CIRCUIT_FAILURE_THRESHOLD=2)
+    # symbol_search não existe no stub (404): problema da chamada, não do provedor
+    for _ in range(3):
+        assert asyncio.run(service.search_ticker("PETR")) == []
+    breaker = service.breakers[("twelvedata", "symbol_search")]
+    assert breaker.state == breaker.CLOSED
@@ -0,0 +1,89 @@
+"""
+Caminho de atualização documentado no README para bancos criados pelo antigo
+create_all: `alembic stamp 0001 && alembic upgrade head`
+"""
+
+from datetime import datetime
+
+from alembic import command
+from sqlalchemy import (
+    Boolean, Column, DateTime, Float, ForeignKey, Index, Integer, MetaData, String, Table,
+    create_engine, inspect, text
+)
+from sqlalchemy.sql import func
+
+from conftest import alembic_config
+
+# Schema que o create_all do startup criava antes das migrações (usuários e alertas)
+baseline = MetaData()
+
+Table(
+    "users", baseline,
+    Column("id", Integer, primary_key=True, index=True),
+    Column("email", String, unique=True, index=True, nullable=False),
+    Column("name", String, nullable=True),
+    Column("hashed_password", String, nullable=False),
+    Column("created_at", DateTime(timezone=True), server_default=func.now()),
+)
+
+Table(
+    "alerts", baseline,
+    Column("id", Integer, primary_key=True, index=True),
+    Column("user_id", Integer, ForeignKey("users.id"), nullable=False),
+    Column("ticker", String, nullable=False, index=True),
+    Column("alert_type", String, nullable=False),
+    Column("target_value", Float, nullable=False),
+    Column("condition", String, nullable=False),
+    Column("is_active", Boolean, default=True),
+    Column("triggered", Boolean, default=False),
+    Column("created_at", DateTime(timezone=True), server_default=func.now()),
+    Column("triggered_at", DateTime(timezone=True), nullable=True),
+    Index("idx_user_active", "user_id", "is_active"),
+    Index("idx_ticker_type", "ticker", "alert_type"),
+    Index("idx_triggered_at", "triggered_at"),
+)
+
+CREATED = datetime(2026, 9, 1, 10, 0)
+TRIGGERED = datetime(2026, 9, 3, 15, 30)
+
+
+def test_stamp_and_upgrade_baseline_database(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'legacy.db'}")
+    baseline.create_all(engine)
+    with engine.begin() as connection:
+        connection.execute(baseline.tables["users"].insert(), [
+            {"id": 1, "email": "a@gatilho.app", "hashed_password": "x"},
+        ])
+        connection.execute(baseline.tables["alerts"].insert(), [
+            {"id": 1, "user_id": 1, "ticker": "PETR4", "alert_type": "price", "target_value": 30.0,
+             "condition": ">", "is_active": True, "triggered": False, "created_at": CREATED,
+             "triggered_at": None},
+            {"id": 2, "user_id": 1, "ticker": "VALE3", "alert_type": "price", "target_value": 60.0,
+             "condition": "<", "is_active": False, "triggered": True, "created_at": CREATED,
+             "triggered_at": TRIGGERED},
+        ])
+
+    with engine.begin() as connection:
+        config = alembic_config(connection)
+        command.stamp(config, "0001")
+        command.upgrade(config, "head")
+        # Nada mais a migrar: o banco bate com os modelos
+        command.check(config)
+
+    with engine.connect() as connection:
+        updated = dict(connection.execute(text("SELECT id, updated_at FROM alerts")).all())
+        rollups = connection.execute(text(
+            "SELECT day, created_count, triggered_count FROM alert_daily_rollups ORDER BY day"
+        )).all()
+        events = connection.execute(text("SELECT alert_id FROM alert_events")).scalars().all()
+
+    # updated_at vem do último momento conhecido de cada alerta
+    assert str(updated[1]).startswith("2026-09-01 10:00")
+    assert str(updated[2]).startswith("2026-09-03 15:30")
+    assert [tuple(row) for row in rollups] == [("2026-09-01", 2, 0), ("2026-09-03", 0, 1)]
+    assert events == [2]
+
+    indexes = {index["name"] for index in inspect(engine).get_indexes("alerts")}
+    assert {"idx_user_updated", "idx_user_created", "idx_alerts_pending"} <= indexes
+    assert "idx_user_active" not in indexes
+    engine.dispose()
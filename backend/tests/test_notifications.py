@@ -0,0 +1,48 @@
+"""
+Notificações de alertas disparados: payload do outbox e resumo por email
+"""
+
+import asyncio
+
+from sqlalchemy import delete, select
+
+from app.core.database import SessionLocal
+from app.models.alert import Alert
+from app.models.event import AlertEvent
+from app.models.outbox import NotificationOutbox
+from app.scheduler import alert_checker
+from app.services.email_templates import AlertNotice, digest_substitutions
+from app.services.rules import RULE_TYPE
+from app.tasks.rollups import backfill_rollups
+
+USER_ID = 44
+
+
+def test_compound_rule_notice_has_no_current_value(plan_engine):
+    db = SessionLocal()
+    alert = Alert(
+        user_id=USER_ID, ticker="PETR4", alert_type=RULE_TYPE, target_value=0.0, condition="",
+        expression="PETR4.price > 1 AND PETR4.volume > 1M", is_active=True, triggered=False
+    )
+    db.add(alert)
+    db.commit()
+    try:
+        assert asyncio.run(alert_checker._trigger_alerts([(alert, None, 31.5, [alert])], db)) == 1
+
+        payload = db.scalar(select(NotificationOutbox.payload).where(NotificationOutbox.alert_id == alert.id))
+        assert payload["current_value"] is None
+        event = db.scalar(select(AlertEvent).where(AlertEvent.alert_id == alert.id))
+        assert event.trigger_value is None
+        assert event.price == 31.5
+
+        rows = digest_substitutions([AlertNotice(**payload)])["-rows-"]
+        assert "PETR4.price &gt; 1 AND PETR4.volume &gt; 1M" in rows
+        assert "Condições atendidas" in rows
+        assert "1.0" not in rows
+    finally:
+        db.execute(delete(NotificationOutbox).where(NotificationOutbox.alert_id == alert.id))
+        db.execute(delete(AlertEvent).where(AlertEvent.alert_id == alert.id))
+        db.execute(delete(Alert).where(Alert.id == alert.id))
+        db.commit()
+        backfill_rollups(db, user_id=USER_ID)
+        db.close()
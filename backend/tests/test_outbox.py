@@ -0,0 +1,189 @@
+"""
+Outbox de notificações: idempotência, lease, backoff, desistência e limpeza
+
+Cada teste usa um banco migrado e vazio (o da suíte de planos tem milhares de
+linhas pendentes no outbox).
+"""
+
+import asyncio
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy import create_engine, insert, select, update
+
+from app.core.database import SessionLocal
+from app.models.outbox import NotificationOutbox
+from app.models.user import User
+from app.services import outbox
+from app.services.outbox import (
+    LEASE_SECONDS, MAX_ATTEMPTS, RETENTION_DAYS, _record_results, claim_batch, drain_outbox, enqueue,
+    purge_outbox
+)
+from conftest import migrate
+
+USER_ID = 1
+
+
+@pytest.fixture
+def db(tmp_path, monkeypatch):
+    engine = create_engine(f"sqlite:///{tmp_path / 'outbox.db'}")
+    migrate(engine)
+    bind = SessionLocal.kw.get("bind")
+    SessionLocal.configure(bind=engine)
+    session = SessionLocal()
+    session.execute(insert(User).values(id=USER_ID, email="a@gatilho.app", hashed_password="x"))
+    session.commit()
+    # Backoff sem jitter para os tempos serem exatos
+    monkeypatch.setattr(outbox.random, "uniform", lambda low, high: 1.0)
+    try:
+        yield session
+    finally:
+        session.close()
+        SessionLocal.configure(bind=bind)
+        engine.dispose()
+
+
+def _notification(key: str, email: str = "a@gatilho.app") -> dict:
+    return {
+        "idempotency_key": key,
+        "user_id": USER_ID,
+        "alert_id": None,
+        "to_email": email,
+        "payload": {
+            "ticker": "PETR4", "alert_type": "price", "condition": ">",
+            "target_value": 30.0, "current_value": 31.2,
+        },
+    }
+
+
+def _row(db, key: str) -> NotificationOutbox:
+    db.expire_all()
+    return db.scalar(select(NotificationOutbox).where(NotificationOutbox.idempotency_key == key))
+
+
+def _expire_lease(db, key: str):
+    db.execute(
+        update(NotificationOutbox)
+        .where(NotificationOutbox.idempotency_key == key)
+        .values(next_attempt_at=datetime.utcnow() - timedelta(seconds=1))
+    )
+    db.commit()
+
+
+def test_enqueue_is_idempotent(db):
+    enqueue(db, [_notification("k1"), _notification("k1")])
+    db.commit()
+    enqueue(db, [_notification("k1"), _notification("k2")])
+    db.commit()
+    assert sorted(db.scalars(select(NotificationOutbox.idempotency_key))) == ["k1", "k2"]
+
+
+def test_claim_leases_rows_and_counts_attempts(db):
+    enqueue(db, [_notification("k1")])
+    db.commit()
+
+    before = datetime.utcnow()
+    claimed = claim_batch(db)
+    assert [(item.idempotency_key, item.attempts) for item in claimed] == [("k1", 1)]
+    row = _row(db, "k1")
+    assert row.attempts == 1
+    assert row.status == "pending"
+    assert row.next_attempt_at >= before + timedelta(seconds=LEASE_SECONDS)
+
+    # Dentro do lease ninguém mais pega a linha
+    assert claim_batch(db) == []
+
+
+def test_expired_lease_is_claimed_again(db):
+    enqueue(db, [_notification("k1")])
+    db.commit()
+    assert len(claim_batch(db)) == 1
+
+    # Worker morreu sem registrar o resultado: passado o lease, a linha volta
+    _expire_lease(db, "k1")
+    assert [item.attempts for item in claim_batch(db)] == [2]
+
+
+def test_failed_send_backs_off_exponentially(db):
+    enqueue(db, [_notification("k1")])
+    db.commit()
+
+    delays = []
+    for _ in range(3):
+        claimed = claim_batch(db)
+        started = datetime.utcnow()
+        assert _record_results(db, claimed, accepted=[]) == 0
+        row = _row(db, "k1")
+        assert row.status == "pending"
+        assert row.last_error
+        delays.append(round((row.next_attempt_at - started).total_seconds()))
+        _expire_lease(db, "k1")
+    assert delays == [30, 60, 120]
+
+
+def test_rows_past_max_attempts_are_not_claimed(db):
+    enqueue(db, [_notification("k1")])
+    db.commit()
+    db.execute(update(NotificationOutbox).values(attempts=MAX_ATTEMPTS - 1))
+    db.commit()
+
+    claimed = claim_batch(db)
+    assert claimed[0].attempts == MAX_ATTEMPTS
+    _record_results(db, claimed, accepted=[])
+    assert _row(db, "k1").status == "failed"
+
+    _expire_lease(db, "k1")
+    assert claim_batch(db) == []
+
+
+def test_accepted_rows_are_marked_sent(db):
+    enqueue(db, [_notification("k1"), _notification("k2", email="b@gatilho.app")])
+    db.commit()
+
+    claimed = claim_batch(db)
+    assert _record_results(db, claimed, accepted=["a@gatilho.app"]) == 1
+    assert _row(db, "k1").status == "sent"
+    assert _row(db, "k1").sent_at is not None
+    assert _row(db, "k2").status == "pending"
+
+
+def test_purge_removes_only_resolved_rows_past_retention(db):
+    old = datetime.utcnow() - timedelta(days=RETENTION_DAYS + 1)
+    recent = datetime.utcnow() - timedelta(days=RETENTION_DAYS - 1)
+    db.execute(insert(NotificationOutbox), [
+        {**_notification(key), "status": status, "attempts": 1, "next_attempt_at": created, "created_at": created}
+        for key, status, created in (
+            ("sent-old", "sent", old),
+            ("failed-old", "failed", old),
+            ("pending-old", "pending", old),
+            ("sent-recent", "sent", recent),
+        )
+    ])
+    db.commit()
+
+    purge_outbox()
+    db.expire_all()
+    assert sorted(db.scalars(select(NotificationOutbox.idempotency_key))) == ["pending-old", "sent-recent"]
+
+
+def test_drain_sends_one_digest_per_recipient(db, sendgrid_stub):
+    enqueue(db, [
+        _notification("k1"), _notification("k2"), _notification("k3", email="b@gatilho.app")
+    ])
+    db.commit()
+
+    assert asyncio.run(drain_outbox()) == 3
+    assert sendgrid_stub.requests == 1
+    assert sendgrid_stub.personalizations == 2
+    assert {row.status for row in db.scalars(select(NotificationOutbox))} == {"sent"}
+
+
+def test_drain_reschedules_when_sendgrid_fails(db, sendgrid_stub):
+    sendgrid_stub.error_rate = 1.0
+    enqueue(db, [_notification("k1")])
+    db.commit()
+
+    assert asyncio.run(drain_outbox()) == 0
+    row = _row(db, "k1")
+    assert (row.status, row.attempts) == ("pending", 1)
+    assert row.next_attempt_at > datetime.utcnow()
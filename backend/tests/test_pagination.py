@@ -0,0 +1,58 @@
+"""
+Cursor (keyset) no SQLite com datetimes gravados com e sem fração de segundo
+"""
+
+import pytest
+from sqlalchemy import Column, DateTime, Integer, MetaData, Table, create_engine, select, text
+from sqlalchemy.orm import Session
+
+from app.utils.pagination import decode_cursor, encode_cursor, keyset_before
+
+metadata = MetaData()
+rows = Table(
+    "rows", metadata,
+    Column("id", Integer, primary_key=True),
+    Column("created_at", DateTime(timezone=True), nullable=False),
+)
+
+# Como o SQLite guarda: SQLAlchemy sempre com fração, CURRENT_TIMESTAMP sem
+STORED = [
+    (1, "2025-03-03 10:00:00"),
+    (2, "2025-03-03 10:00:01.000000"),
+    (3, "2025-03-03 10:00:01.000000"),
+    (4, "2025-03-03 10:00:01.000000"),
+    (5, "2025-03-03 10:00:01.500000"),
+    (6, "2025-03-03 10:00:02"),
+    (7, "2025-03-03 10:00:02"),
+    (8, "2025-03-03 10:00:03.000000"),
+]
+EXPECTED = [8, 7, 6, 5, 4, 3, 2, 1]
+
+
+@pytest.fixture
+def db():
+    engine = create_engine("sqlite://")
+    metadata.create_all(engine)
+    with Session(engine) as session:
+        session.execute(
+            text("INSERT INTO rows (id, created_at) VALUES (:id, :created_at)"),
+            [{"id": row_id, "created_at": stored} for row_id, stored in STORED]
+        )
+        session.commit()
+        yield session
+    engine.dispose()
+
+
+@pytest.mark.parametrize("page_size", [1, 2, 3])
+def test_pages_cover_exact_second_boundaries(db, page_size):
+    seen, after = [], None
+    while True:
+        query = select(rows.c.id, rows.c.created_at).order_by(rows.c.created_at.desc(), rows.c.id.desc())
+        if after is not None:
+            query = query.where(keyset_before(db, rows.c.created_at, rows.c.id, after))
+        page = db.execute(query.limit(page_size)).all()
+        seen.extend(row.id for row in page)
+        if len(page) < page_size:
+            break
+        after = decode_cursor(encode_cursor(page[-1].created_at, page[-1].id))
+    assert seen == EXPECTED
@@ -0,0 +1,227 @@
+"""
+Regressão de planos: as consultas quentes não podem varrer tabelas inteiras
+
+Cada caso executa o código de verdade (endpoint ou job) capturando os SELECTs
+emitidos e roda EXPLAIN em cada um, com os mesmos parâmetros. Falha quando
+o plano lê uma tabela inteira: SCAN sem índice no SQLite, Seq Scan no
+Postgres, ou varredura completa de um índice que não é parcial. Percorrer um
+índice parcial inteiro é aceito: ele só contém as linhas que a consulta quer.
+
+No Postgres o EXPLAIN roda com enable_seqscan = off: numa base de teste
+pequena o Seq Scan é sempre o mais barato, e o que interessa aqui é se
+existe um índice utilizável.
+"""
+
+import asyncio
+import json
+import re
+from datetime import datetime, timedelta
+from typing import List, Tuple
+
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy import event, select
+
+from app.core.cache import cache_clear
+from app.core.database import Base, SessionLocal
+from app.core.security import create_access_token
+from app.main import app
+from app.models.alert import Alert
+
+USER_ID = 42
+# Pequena o bastante para o usuário do teste ter mais de uma página em todas as listas
+PAGE_SIZE = 5
+
+_SQLITE_SCAN = re.compile(r"^SCAN (?:TABLE )?(\w+)(.*)$")
+
+
+def _partial_indexes() -> set:
+    return {
+        index.name
+        for table in Base.metadata.tables.values()
+        for index in table.indexes
+        if index.dialect_options["sqlite"].get("where") is not None
+        or index.dialect_options["postgresql"].get("where") is not None
+    }
+
+
+def _owner_table(relation: str) -> str:
+    """Partições (alert_events_y2026m10, alert_events_default) contam como a tabela pai"""
+    for table in Base.metadata.tables:
+        if relation == table or relation.startswith(f"{table}_y") or relation == f"{table}_default":
+            return table
+    return relation
+
+
+class QueryCapture:
+    """Guarda os SELECTs executados no engine enquanto o bloco roda"""
+
+    def __init__(self, engine):
+        self.engine = engine
+        self.statements: List[Tuple[str, object]] = []
+
+    def _on_execute(self, conn, cursor, statement, parameters, context, executemany):
+        if not executemany and statement.lstrip().upper().startswith("SELECT"):
+            self.statements.append((statement, parameters))
+
+    def __enter__(self):
+        event.listen(self.engine, "before_cursor_execute", self._on_execute)
+        return self
+
+    def __exit__(self, *exc):
+        event.remove(self.engine, "before_cursor_execute", self._on_execute)
+
+
+def full_scans(engine, statement: str, parameters) -> List[str]:
+    """Leituras completas de tabela (ou de índice não parcial) no plano do statement"""
+    tables = set(Base.metadata.tables)
+    partial = _partial_indexes()
+    problems = []
+
+    with engine.connect() as connection:
+        if engine.dialect.name == "sqlite":
+            for row in connection.exec_driver_sql(f"EXPLAIN QUERY PLAN {statement}", parameters):
+                match = _SQLITE_SCAN.match(row[3])
+                if not match or match.group(1) not in tables:
+                    continue
+                index = re.search(r"USING (?:COVERING )?INDEX (\w+)", match.group(2))
+                if index is None or index.group(1) not in partial:
+                    problems.append(row[3])
+            return problems
+
+        # LOCAL: vale só para esta transação, a conexão volta limpa para o pool
+        connection.exec_driver_sql("SET LOCAL enable_seqscan = off")
+        plan = connection.exec_driver_sql(f"EXPLAIN (FORMAT JSON) {statement}", parameters).scalar()
+        if isinstance(plan, str):
+            plan = json.loads(plan)
+
+        def walk(node):
+            relation = node.get("Relation Name")
+            if relation and _owner_table(relation) in tables:
+                kind = node["Node Type"]
+                if kind == "Seq Scan":
+                    problems.append(f"Seq Scan on {relation}")
+                elif kind in ("Index Scan", "Index Only Scan") and "Index Cond" not in node \
+                        and node.get("Index Name") not in partial:
+                    problems.append(f"{kind} completo de {node.get('Index Name')} em {relation}")
+            for child in node.get("Plans", []):
+                walk(child)
+
+        walk(plan[0]["Plan"])
+        return problems
+
+
+def assert_indexed(engine, capture: QueryCapture):
+    assert capture.statements, "nenhuma consulta capturada"
+    failures = []
+    for statement, parameters in capture.statements:
+        problems = full_scans(engine, statement, parameters)
+        if problems:
+            failures.append(f"{' '.join(statement.split())}\n    -> {'; '.join(problems)}")
+    assert not failures, "consultas sem índice:\n" + "\n".join(failures)
+
+
+@pytest.fixture
+def client(plan_engine):
+    # Sem respostas em cache de um teste para o outro: cada caso precisa ir ao banco
+    cache_clear()
+    return TestClient(app, headers={"Authorization": f"Bearer {create_access_token({'sub': str(USER_ID)})}"})
+
+
+def _since() -> str:
+    return (datetime.utcnow() - timedelta(hours=1)).isoformat()
+
+
+# (método, caminho, query string, segue o X-Next-Cursor)
+HOT_REQUESTS = [
+    ("GET", "/api/alerts", {}, True),
+    ("GET", "/api/alerts", {"active_only": "false"}, True),
+    ("GET", "/api/alerts/history", {}, True),
+    ("GET", "/api/alerts/stats", {}, False),
+    ("GET", "/api/dashboard", {}, False),
+    ("GET", "/api/dashboard", {"since": _since}, False),
+    ("GET", "/api/analytics/dashboard", {}, False),
+    ("GET", "/api/analytics/chart", {"days": 90}, False),
+    ("GET", "/api/suggestions/tickers", {}, False),
+]
+
+
+@pytest.mark.parametrize(
+    "method,path,params,paginate", HOT_REQUESTS,
+    ids=[f"{path}?{'&'.join(params)}" for _, path, params, _ in HOT_REQUESTS]
+)
+def test_api_queries_use_indexes(plan_engine, client, method, path, params, paginate):
+    params = {key: value() if callable(value) else value for key, value in params.items()}
+    with QueryCapture(plan_engine) as capture:
+        response = client.request(method, path, params={**params, "limit": PAGE_SIZE} if paginate else params)
+        assert response.status_code == 200, response.text
+        if paginate:
+            cursor = response.headers.get("X-Next-Cursor")
+            assert cursor, "a base de teste deveria ter mais de uma página"
+            response = client.request(method, path, params={**params, "limit": PAGE_SIZE, "cursor": cursor})
+            assert response.status_code == 200, response.text
+    assert_indexed(plan_engine, capture)
+
+
+def test_delete_alert_uses_indexes(plan_engine, client):
+    db = SessionLocal()
+    try:
+        alert_id = db.scalar(
+            select(Alert.id).where(Alert.user_id == USER_ID, Alert.is_active == True).limit(1)
+        )
+    finally:
+        db.close()
+
+    with QueryCapture(plan_engine) as capture:
+        response = client.delete(f"/api/alerts/{alert_id}")
+        assert response.status_code == 200, response.text
+    assert_indexed(plan_engine, capture)
+
+
+def test_scheduler_cycle_uses_indexes(plan_engine, monkeypatch):
+    from sqlalchemy import func
+
+    from app.scheduler import alert_checker
+    from app.services.market_data import market_data_service
+
+    # Só o ticker menos monitorado tem cotação: dispara alguns alertas (o caminho
+    # do disparo também é medido) sem que o IN de usuários cubra a tabela inteira
+    db = SessionLocal()
+    try:
+        rare = db.scalar(
+            select(Alert.ticker)
+            .where(Alert.is_active == True, Alert.triggered == False)
+            .group_by(Alert.ticker)
+            .order_by(func.count(), Alert.ticker)
+            .limit(1)
+        )
+    finally:
+        db.close()
+
+    async def fake_quote(ticker):
+        if ticker != rare:
+            return None
+        return {"price": 1e6, "change_percent": 50.0, "volume": 1e13}
+
+    monkeypatch.setattr(market_data_service, "get_quote", fake_quote)
+
+    with QueryCapture(plan_engine) as capture:
+        asyncio.run(alert_checker.check_all_alerts())
+    trace = alert_checker.traces[-1]
+    assert trace["status"] == "ok", trace["error"]
+    assert trace["triggered"] > 0
+    assert_indexed(plan_engine, capture)
+
+
+def test_scheduler_jobs_use_indexes(plan_engine):
+    from app.services.indicators import active_indicator_keys
+    from app.services.outbox import claim_batch
+
+    db = SessionLocal()
+    try:
+        with QueryCapture(plan_engine) as capture:
+            active_indicator_keys(db)
+            claim_batch(db)
+    finally:
+        db.close()
+    assert_indexed(plan_engine, capture)
@@ -0,0 +1,61 @@
+"""
+GETs condicionais dos alertas: ETag por versão do usuário, 304 sem banco
+e invalidação imediata em qualquer escrita
+"""
+
+import pytest
+from fastapi.testclient import TestClient
+
+from app.core.cache import cache_clear
+from app.core.security import create_access_token
+from app.main import app
+
+from test_query_plans import QueryCapture
+
+USER_ID = 43
+CACHED_PATHS = ["/api/alerts", "/api/alerts/history", "/api/alerts/stats"]
+
+
+@pytest.fixture
+def client(plan_engine):
+    cache_clear()
+    return TestClient(app, headers={"Authorization": f"Bearer {create_access_token({'sub': str(USER_ID)})}"})
+
+
+@pytest.mark.parametrize("path", CACHED_PATHS)
+def test_unchanged_refresh_is_304_without_queries(plan_engine, client, path):
+    first = client.get(path)
+    assert first.status_code == 200, first.text
+    etag = first.headers["ETag"]
+
+    with QueryCapture(plan_engine) as capture:
+        again = client.get(path, headers={"If-None-Match": etag})
+        cached = client.get(path)
+    assert again.status_code == 304
+    assert again.headers["ETag"] == etag
+    assert cached.status_code == 200 and cached.content == first.content
+    assert not capture.statements
+
+
+def test_write_invalidates_etag_and_cache(plan_engine, client):
+    before = client.get("/api/alerts")
+    created = client.post("/api/alerts", json={
+        "ticker": "PETR4", "alert_type": "price", "target_value": 1.0, "condition": ">"
+    })
+    assert created.status_code == 201, created.text
+
+    after = client.get("/api/alerts", headers={"If-None-Match": before.headers["ETag"]})
+    assert after.status_code == 200
+    assert after.headers["ETag"] != before.headers["ETag"]
+    assert created.json()["id"] in [alert["id"] for alert in after.json()]
+
+    client.delete(f"/api/alerts/{created.json()['id']}")
+    assert client.get("/api/alerts", headers={"If-None-Match": after.headers["ETag"]}).status_code == 200
+
+
+def test_etag_is_per_user_and_query(plan_engine, client):
+    etag = client.get("/api/alerts").headers["ETag"]
+    assert client.get("/api/alerts", params={"active_only": "false"}, headers={"If-None-Match": etag}).status_code == 200
+
+    other = TestClient(app, headers={"Authorization": f"Bearer {create_access_token({'sub': str(USER_ID + 1)})}"})
+    assert other.get("/api/alerts", headers={"If-None-Match": etag}).status_code == 200
@@ -0,0 +1,53 @@
+"""
+Backfill dos rollups: os disparos vêm dos alertas (quentes e arquivados), então
+a retenção de alert_events não apaga contadores antigos
+"""
+
+from datetime import date, datetime
+
+from sqlalchemy import delete, insert, select
+
+from app.core.database import SessionLocal
+from app.models.alert import AlertArchive
+from app.models.event import AlertEvent
+from app.models.rollup import AlertDailyRollup
+from app.services.events import expire_events
+from app.tasks.rollups import backfill_rollups
+
+USER_ID = 7
+ALERT_ID = 10_000_000
+CREATED = datetime(2023, 1, 10, 9, 0)
+TRIGGERED = datetime(2023, 2, 15, 14, 0)
+
+
+def _rollup(db, day: date) -> tuple:
+    row = db.get(AlertDailyRollup, (USER_ID, day, "price"))
+    return (row.created_count, row.triggered_count) if row else (0, 0)
+
+
+def test_backfill_keeps_triggers_older_than_event_retention(plan_engine):
+    db = SessionLocal()
+    try:
+        # Alerta antigo: arquivado e com o evento fora da retenção
+        db.execute(insert(AlertArchive).values(
+            id=ALERT_ID, user_id=USER_ID, ticker="PETR4", alert_type="price", target_value=30.0,
+            condition=">", triggered=True, created_at=CREATED, triggered_at=TRIGGERED,
+            updated_at=TRIGGERED, archived_at=TRIGGERED,
+        ))
+        db.execute(insert(AlertEvent).values(
+            triggered_at=TRIGGERED, user_id=USER_ID, alert_id=ALERT_ID, ticker="PETR4",
+            alert_type="price", condition=">", target_value=30.0, alert_created_at=CREATED,
+        ))
+        db.commit()
+
+        expire_events(db)
+        assert db.scalar(select(AlertEvent.id).where(AlertEvent.alert_id == ALERT_ID)) is None
+
+        backfill_rollups(db, user_id=USER_ID)
+        assert _rollup(db, CREATED.date()) == (1, 0)
+        assert _rollup(db, TRIGGERED.date()) == (0, 1)
+    finally:
+        db.execute(delete(AlertArchive).where(AlertArchive.id == ALERT_ID))
+        db.commit()
+        backfill_rollups(db, user_id=USER_ID)
+        db.close()
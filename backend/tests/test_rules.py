@@ -0,0 +1,116 @@
+"""
+Regras compostas: parser, plano pós-fixo e avaliação incremental do RuleEngine
+"""
+
+import pytest
+
+from app.services.rules import (
+    MAX_PREDICATES, MAX_TICKERS, RuleEngine, RuleError, compile_rule, normalize_rule
+)
+
+
+def test_not_binds_tighter_than_and_tighter_than_or():
+    expression = normalize_rule("price < 30 or volume > 1m and not rsi < 30", "petr4")
+    assert expression == "PETR4.price < 30 OR (PETR4.volume > 1M AND NOT PETR4.rsi(14) < 30)"
+    assert compile_rule(expression).plan == (
+        ("p", 0), ("p", 1), ("p", 2), ("not", 1), ("and", 2), ("or", 2)
+    )
+
+    # Parênteses mudam a precedência e sobrevivem à normalização
+    expression = normalize_rule("NOT (price < 30 OR price > 40) AND VALE3.volume >= 10", "PETR4")
+    assert expression == "NOT (PETR4.price < 30 OR PETR4.price > 40) AND VALE3.volume >= 10"
+
+    engine = RuleEngine()
+    engine.add(1, "PETR4.price < 30 OR (PETR4.volume > 1M AND NOT PETR4.rsi(14) < 30)")
+    # price falso, volume verdadeiro, rsi < 30 falso -> NOT verdadeiro -> AND verdadeiro
+    assert engine.evaluate({
+        ("PETR4", "price", None): 35, ("PETR4", "volume", None): 2e6, ("PETR4", "rsi", 14): 50
+    }) == [1]
+    # rsi < 30 verdadeiro: o lado do AND cai e o OR também
+    assert engine.evaluate({
+        ("PETR4", "price", None): 35, ("PETR4", "volume", None): 2e6, ("PETR4", "rsi", 14): 20
+    }) == []
+
+
+@pytest.mark.parametrize("text,value", [
+    ("10k", 10_000), ("2.5M", 2_500_000), ("1.1m", 1_100_000), ("3B", 3_000_000_000), ("-1.5", -1.5)
+])
+def test_number_suffixes(text, value):
+    predicate = compile_rule(normalize_rule(f"volume > {text}", "PETR4")).predicates[0]
+    assert predicate[4] == value
+
+
+def test_limits_on_predicates_and_tickers():
+    at_limit = " AND ".join(f"price > {n}" for n in range(MAX_PREDICATES))
+    normalize_rule(at_limit, "PETR4")
+    with pytest.raises(RuleError, match="condições"):
+        normalize_rule(f"{at_limit} AND price > 99", "PETR4")
+
+    tickers = [f"TICK{n}" for n in range(MAX_TICKERS + 1)]
+    normalize_rule(" OR ".join(f"{ticker}.price > 1" for ticker in tickers[:-1]))
+    with pytest.raises(RuleError, match="tickers"):
+        normalize_rule(" OR ".join(f"{ticker}.price > 1" for ticker in tickers))
+
+
+@pytest.mark.parametrize("expression", ["", "price <", "price < 30 AND", "(price < 30", "foo > 1", "AND price > 1"])
+def test_invalid_expressions(expression):
+    with pytest.raises(RuleError):
+        normalize_rule(expression, "PETR4")
+
+
+PRICE = ("PETR4", "price", None)
+VOLUME = ("PETR4", "volume", None)
+
+
+def test_shared_predicate_is_evaluated_once_per_tick():
+    engine = RuleEngine()
+    engine.add(1, "PETR4.price < 30 AND PETR4.volume > 1M")
+    engine.add(2, "PETR4.price < 30 OR PETR4.volume > 5M")
+    assert engine.stats()["predicates"] == 3
+
+    engine.evaluate({PRICE: 31, VOLUME: 2e6})
+    assert engine.last_cycle["predicates_evaluated"] == 3
+
+    # Só o preço mudou: o predicado compartilhado roda uma vez e reavalia as duas regras
+    assert sorted(engine.evaluate({PRICE: 29, VOLUME: 2e6})) == [1, 2]
+    assert engine.last_cycle == {"inputs_changed": 1, "predicates_evaluated": 1, "rules_evaluated": 2}
+
+
+def test_rules_with_unchanged_inputs_are_not_reevaluated():
+    engine = RuleEngine()
+    engine.add(1, "PETR4.price < 30")
+    engine.add(2, "VALE3.price > 60")
+    assert engine.evaluate({PRICE: 29, ("VALE3", "price", None): 50}) == [1]
+
+    # Só VALE3 mudou: a regra de PETR4 não é reavaliada
+    assert sorted(engine.evaluate({PRICE: 29, ("VALE3", "price", None): 61})) == [1, 2]
+    assert engine.last_cycle == {"inputs_changed": 1, "predicates_evaluated": 1, "rules_evaluated": 1}
+
+    # Nada mudou: nenhuma regra é tocada, o resultado continua o mesmo
+    assert sorted(engine.evaluate({PRICE: 29, ("VALE3", "price", None): 61})) == [1, 2]
+    assert engine.last_cycle == {"inputs_changed": 0, "predicates_evaluated": 0, "rules_evaluated": 0}
+
+
+def test_rule_added_mid_stream_is_evaluated_on_first_tick():
+    engine = RuleEngine()
+    engine.sync([(1, "PETR4.price < 30")])
+    values = {PRICE: 29, VOLUME: 2e6}
+    assert engine.evaluate(values) == [1]
+
+    # Reusa um predicado já avaliado e traz uma entrada nova
+    engine.sync([(1, "PETR4.price < 30"), (2, "PETR4.price < 30 AND PETR4.volume > 1M")])
+    assert sorted(engine.evaluate(values)) == [1, 2]
+    # Só a regra nova é avaliada
+    assert engine.last_cycle["rules_evaluated"] == 1
+
+    # Sai do sync: sai do resultado e solta os predicados que só ela usava
+    engine.sync([(1, "PETR4.price < 30")])
+    assert engine.evaluate(values) == [1]
+    assert engine.stats()["predicates"] == 1
+
+
+def test_unavailable_inputs_never_trigger():
+    engine = RuleEngine()
+    engine.add(1, "NOT PETR4.price > 30")
+    assert engine.evaluate({}) == []
+    assert engine.evaluate({PRICE: 20}) == [1]
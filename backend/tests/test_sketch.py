@@ -0,0 +1,48 @@
+"""
+QuantileSketch: quantis com erro relativo, inclusive para os alvos negativos
+dos alertas de indicador (distância percentual abaixo da média)
+"""
+
+import pytest
+
+from app.utils.sketch import QuantileSketch
+
+SIGNED_TARGETS = [-5, -3, -2, -1, 1, 2]
+
+
+def test_negative_values_keep_their_order_and_sign():
+    sketch = QuantileSketch()
+    for value in SIGNED_TARGETS:
+        sketch.add(value)
+
+    assert sketch.quantile(0.0) == pytest.approx(-5, rel=0.01)
+    assert sketch.quantile(0.25) == pytest.approx(-3, rel=0.01)
+    assert sketch.quantile(0.5) == pytest.approx(-2, rel=0.01)
+    assert sketch.quantile(1.0) == pytest.approx(2, rel=0.01)
+    assert sketch.average == pytest.approx(-8 / 6)
+    assert all(value < 0 for value, _ in sketch.clusters(3))
+
+
+def test_zero_has_its_own_bucket_and_removal_is_exact():
+    sketch = QuantileSketch()
+    for value in (-2, -2, 0, 3):
+        sketch.add(value)
+    assert sketch.clusters(1) == [(pytest.approx(-2, rel=0.01), 2)]
+    assert sketch.quantile(0.7) == 0.0
+
+    sketch.remove(-2, 2)
+    assert sketch.count == 2
+    assert sketch.quantile(0.0) == 0.0
+
+
+def test_round_trip_and_merge_keep_negative_buckets():
+    sketch = QuantileSketch()
+    for value in SIGNED_TARGETS:
+        sketch.add(value)
+
+    restored = QuantileSketch.from_dict(sketch.to_dict())
+    assert [restored.quantile(q) for q in (0.1, 0.5, 0.9)] == [sketch.quantile(q) for q in (0.1, 0.5, 0.9)]
+
+    restored.merge(sketch)
+    assert restored.count == 12
+    assert restored.quantile(0.0) == pytest.approx(-5, rel=0.01)
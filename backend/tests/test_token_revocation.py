@@ -0,0 +1,92 @@
+"""
+Revogação de tokens gravada em users.tokens_valid_after: vale para outros
+processos (cache vazio ou entrada vencida) e o estado local é limitado
+"""
+
+import asyncio
+import time
+
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy import update
+
+from app.core import security
+from app.core.database import SessionLocal
+from app.core.security import TokenCache, authenticate_token, create_access_token, revoke_user_tokens
+from app.main import app
+from app.models.user import User
+
+USER_ID = 45
+
+
+@pytest.fixture
+def db(plan_engine, monkeypatch):
+    monkeypatch.setattr(security, "token_cache", TokenCache())
+    session = SessionLocal()
+    try:
+        yield session
+    finally:
+        session.execute(update(User).where(User.id == USER_ID).values(tokens_valid_after=None))
+        session.commit()
+        session.close()
+
+
+def _token(user_id: int = USER_ID) -> str:
+    return create_access_token({"sub": str(user_id)})
+
+
+def _other_process(monkeypatch):
+    """Outro worker: mesmo banco, cache de tokens próprio e vazio"""
+    monkeypatch.setattr(security, "token_cache", TokenCache())
+
+
+def test_revocation_reaches_other_processes(db, monkeypatch):
+    old = _token()
+    assert asyncio.run(authenticate_token(old)).id == USER_ID
+
+    revoke_user_tokens(db, USER_ID)
+    db.commit()
+    new = _token()
+
+    _other_process(monkeypatch)
+    assert asyncio.run(authenticate_token(old)) is None
+    assert asyncio.run(authenticate_token(new)).id == USER_ID
+
+
+def test_cached_entries_are_revalidated(db, monkeypatch):
+    cache = TokenCache(revalidate_seconds=60)
+    monkeypatch.setattr(security, "token_cache", cache)
+    token = _token()
+    assert asyncio.run(authenticate_token(token)).id == USER_ID
+
+    # Revogado por outro processo: direto no banco, sem tocar neste cache
+    db.execute(update(User).where(User.id == USER_ID).values(tokens_valid_after=time.time()))
+    db.commit()
+
+    key = TokenCache.key(token)
+    assert cache.get(key, time.time()) is not None
+    assert cache.get(key, time.time() + 61) is None
+    assert asyncio.run(authenticate_token(token)) is None
+
+
+def test_tokens_of_missing_users_are_rejected(db):
+    assert asyncio.run(authenticate_token(_token(user_id=10 ** 6))) is None
+
+
+def test_logout_revokes_in_the_database(db, monkeypatch):
+    token = _token()
+    client = TestClient(app, headers={"Authorization": f"Bearer {token}"})
+    assert client.post("/api/auth/logout").status_code == 200
+
+    _other_process(monkeypatch)
+    assert client.get("/api/alerts").status_code == 401
+
+
+def test_local_revocations_expire_with_the_tokens():
+    cache = TokenCache(token_lifetime=3600)
+    now = time.time()
+    cache.revoke_user(1, since=now - 3601)
+    cache.revoke_user(2, since=now - 10)
+    assert cache.stats()["revoked"] == 1
+    assert not cache.is_revoked(1, now - 5000)
+    assert cache.is_revoked(2, now - 20)
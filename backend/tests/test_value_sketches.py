@@ -0,0 +1,70 @@
+"""
+Sketches de sugestões: o que está gravado em target_value_sketches é só cache
+morno; o banco de alertas vence na reconstrução
+"""
+
+import json
+
+from sqlalchemy import func, select
+
+from app.core.database import SessionLocal
+from app.models.alert import Alert
+from app.models.sketch import TargetValueSketch
+from app.services.value_sketches import ValueSketchStore
+from app.utils.sketch import QuantileSketch
+
+
+def test_stored_sketches_are_replaced_by_rebuild(plan_engine):
+    db = SessionLocal()
+    try:
+        ticker, alert_type, live = db.execute(
+            select(Alert.ticker, Alert.alert_type, func.count())
+            .where(Alert.is_active == True)
+            .group_by(Alert.ticker, Alert.alert_type)
+            .limit(1)
+        ).one()
+
+        # Sketch gravado que divergiu do banco (deltas perdidos num crash)
+        drifted = QuantileSketch()
+        drifted.add(1.0, live + 1000)
+        db.merge(TargetValueSketch(
+            ticker=ticker, alert_type=alert_type, payload=json.dumps(drifted.to_dict())
+        ))
+        db.commit()
+
+        store = ValueSketchStore(rebuild_interval=300)
+        assert store.get(db, ticker, alert_type).count == live + 1000
+
+        # Passado o intervalo, a próxima leitura reconstrói a partir dos alertas
+        store.rebuild_interval = 0
+        assert store.get(db, ticker, alert_type).count == live
+        assert json.loads(db.get(TargetValueSketch, (ticker, alert_type)).payload)["c"] == live
+    finally:
+        db.close()
+
+
+def test_compound_rules_stay_out_of_sketches(plan_engine, monkeypatch):
+    from app.services import alert_indexes
+    from app.services.rules import RULE_TYPE
+
+    db = SessionLocal()
+    try:
+        alert = Alert(
+            user_id=1, ticker="RULE3", alert_type=RULE_TYPE, target_value=0.0, condition="rule",
+            expression="RULE3.price > 10", is_active=True, triggered=False
+        )
+        db.add(alert)
+        db.commit()
+
+        store = ValueSketchStore()
+        store.rebuild(db)
+        assert store.get(db, "RULE3", RULE_TYPE) is None
+
+        monkeypatch.setattr(alert_indexes, "value_sketches", store)
+        alert_indexes.alerts_activated([("RULE3", RULE_TYPE, 0.0), ("RULE3", "price", 12.0)])
+        assert store.get(db, "RULE3", RULE_TYPE) is None
+        assert store.get(db, "RULE3", "price").count == 1
+    finally:
+        db.delete(alert)
+        db.commit()
+        db.close()
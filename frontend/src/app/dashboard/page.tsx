@@ -1,12 +1,31 @@
 'use client';
-import React, { useState, useEffect } from 'react';
+import React, { useState, useEffect, useRef } from 'react';
 import { useRouter } from 'next/navigation';
 import Link from 'next/link';
-import { Bell, TrendingUp, TrendingDown, Plus, Trash2, Target, Zap, DollarSign, Percent, Volume2, Search, User } from 'lucide-react';
-import { alertsAPI, Alert, AlertStats } from '../../services/api';
+import { Bell, TrendingUp, TrendingDown, Plus, Trash2, Target, Zap, DollarSign, Percent, Volume2, Search, User, Activity } from 'lucide-react';
+import { alertsAPI, dashboardAPI, Alert, AlertStats, DashboardSnapshot } from '../../services/api';
 import NotificationPanel from '../../components/NotificationPanel';
 import ProfilePanel from '../../components/ProfilePanel';
 
+const REFRESH_INTERVAL_MS = 60000;
+
+// Aplica um delta do /dashboard sobre as listas locais (upsert por id)
+const applyChanges = (alerts: Alert[], history: Alert[], changes: Alert[]) => {
+  const active = new Map(alerts.map(a => [a.id, a]));
+  const triggered = new Map(history.map(a => [a.id, a]));
+  changes.forEach(change => {
+    if (change.is_active) active.set(change.id, change);
+    else active.delete(change.id);
+    if (change.triggered) triggered.set(change.id, change);
+  });
+  const byDate = (key: 'created_at' | 'triggered_at') => (a: Alert, b: Alert) =>
+    (b[key] || '').localeCompare(a[key] || '') || b.id - a.id;
+  return {
+    alerts: Array.from(active.values()).sort(byDate('created_at')),
+    history: Array.from(triggered.values()).sort(byDate('triggered_at')).slice(0, 50),
+  };
+};
+
 export default function Dashboard() {
   const router = useRouter();
   const [activeTab, setActiveTab] = useState<'active' | 'history'>('active');
@@ -18,6 +37,9 @@ export default function Dashboard() {
   const [stats, setStats] = useState<AlertStats | null>(null);
   const [loading, setLoading] = useState(true);
   const [userId, setUserId] = useState<number | null>(null);
+  const syncToken = useRef<string | null>(null);
+  const listsRef = useRef({ alerts, history });
+  listsRef.current = { alerts, history };
 
   useEffect(() => {
     const storedUserId = localStorage.getItem('userId');
@@ -29,19 +51,30 @@ export default function Dashboard() {
     const id = parseInt(storedUserId);
     setUserId(id);
     loadData(id);
+    const timer = setInterval(() => refreshData(id), REFRESH_INTERVAL_MS);
+    return () => clearInterval(timer);
   }, [router]);
 
+  const applySnapshot = (data: DashboardSnapshot) => {
+    syncToken.current = data.sync_token;
+    setStats(data.stats);
+    if (data.full) {
+      setAlerts(data.active || []);
+      setHistory(data.history || []);
+      return;
+    }
+    const changes = data.changes || [];
+    if (changes.length === 0) return;
+    const merged = applyChanges(listsRef.current.alerts, listsRef.current.history, changes);
+    setAlerts(merged.alerts);
+    setHistory(merged.history);
+  };
+
   const loadData = async (id: number) => {
     try {
       setLoading(true);
-      const [alertsRes, historyRes, statsRes] = await Promise.all([
-        alertsAPI.getActive(id),
-        alertsAPI.getHistory(id),
-        alertsAPI.getStats(id),
-      ]);
-      setAlerts(alertsRes.data);
-      setHistory(historyRes.data);
-      setStats(statsRes.data);
+      const res = await dashboardAPI.get(id);
+      applySnapshot(res.data);
     } catch (err) {
       console.error('Erro:', err);
     } finally {
@@ -49,6 +82,17 @@ export default function Dashboard() {
     }
   };
 
+  // Atualização incremental: só o que mudou desde o último sync_token
+  const refreshData = async (id: number) => {
+    if (!syncToken.current) return;
+    try {
+      const res = await dashboardAPI.get(id, syncToken.current);
+      applySnapshot(res.data);
+    } catch (err) {
+      console.error('Erro ao atualizar:', err);
+    }
+  };
+
   const handleDelete = async (alertId: number) => {
     if (!userId || !confirm('Remover este alerta?')) return;
     try {
@@ -61,8 +105,12 @@ export default function Dashboard() {
   };
 
   const formatValue = (alert: Alert): string => {
+    if (alert.alert_type === 'compound') return alert.expression || '';
     if (alert.alert_type === 'price') return `R$ ${alert.target_value.toFixed(2)}`;
     if (alert.alert_type === 'percentage') return `${alert.target_value}%`;
+    if (alert.alert_type === 'rsi') return alert.target_value.toFixed(1);
+    // SMA/EMA/VWAP: distância percentual do preço até o indicador
+    if (['sma', 'ema', 'vwap'].includes(alert.alert_type)) return `${alert.target_value > 0 ? '+' : ''}${alert.target_value}%`;
     return alert.target_value.toLocaleString();
   };
 
@@ -75,7 +123,12 @@ export default function Dashboard() {
     const t: Record<string, any> = {
       price: { label: 'Preço', icon: DollarSign, color: 'emerald' },
       percentage: { label: 'Variação', icon: Percent, color: 'amber' },
-      volume: { label: 'Volume', icon: Volume2, color: 'purple' }
+      volume: { label: 'Volume', icon: Volume2, color: 'purple' },
+      sma: { label: 'SMA', icon: Activity, color: 'amber' },
+      ema: { label: 'EMA', icon: Activity, color: 'amber' },
+      vwap: { label: 'VWAP', icon: Activity, color: 'purple' },
+      rsi: { label: 'RSI', icon: Activity, color: 'emerald' },
+      compound: { label: 'Regra composta', icon: Activity, color: 'indigo' }
     };
     return t[type] || t.price;
   };
@@ -114,8 +167,11 @@ export default function Dashboard() {
         </div>
         <div className="p-4 rounded-xl bg-slate-800/50 border border-slate-700/50">
           <p className="text-xs text-slate-400 mb-1">CONDIÇÃO</p>
-          <p className="text-sm font-bold text-indigo-400 mb-2">{getConditionText(alert.condition)}</p>
-          <p className="text-xl font-black text-white">{formatValue(alert)}</p>
+          <p className="text-sm font-bold text-indigo-400 mb-2">{alert.alert_type === 'compound' ? 'Quando' : getConditionText(alert.condition)}</p>
+          <p className="text-xl font-black text-white break-words">{formatValue(alert)}</p>
+          {isHistory && alert.price != null && (
+            <p className="text-xs text-slate-400 mt-2">Preço no disparo: R$ {alert.price.toFixed(2)}</p>
+          )}
         </div>
       </div>
     );
@@ -225,6 +281,11 @@ export default function Dashboard() {
             <option value="price">Preço</option>
             <option value="percentage">Variação</option>
             <option value="volume">Volume</option>
+            <option value="sma">SMA</option>
+            <option value="ema">EMA</option>
+            <option value="vwap">VWAP</option>
+            <option value="rsi">RSI</option>
+            <option value="compound">Regra composta</option>
           </select>
         </div>
 
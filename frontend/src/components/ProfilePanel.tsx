@@ -149,6 +149,12 @@ export default function ProfilePanel() {
         throw new Error(error.detail || 'Erro ao alterar senha');
       }
 
+      // Tokens anteriores são revogados na troca de senha
+      const data = await response.json();
+      if (data.access_token) {
+        localStorage.setItem('token', data.access_token);
+      }
+
       setFormData({
         ...formData,
         currentPassword: '',
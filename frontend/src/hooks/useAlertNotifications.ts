@@ -5,7 +5,8 @@ export function useAlertNotifications(userId: string) {
   const [notifications, setNotifications] = useState<any[]>([]);
   
   useEffect(() => {
-    const ws = new WebSocket(`ws://localhost:8000/ws/${userId}`);
+    const token = localStorage.getItem('token') || '';
+    const ws = new WebSocket(`ws://localhost:8000/ws/${userId}?token=${encodeURIComponent(token)}`);
     
     ws.onmessage = (event) => {
       const data = JSON.parse(event.data);
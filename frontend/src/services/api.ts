@@ -40,10 +40,15 @@ export interface Alert {
   alert_type: string;
   target_value: number;
   condition: string;
+  period?: number | null;
+  // Regras compostas (alert_type "compound"), já normalizada pelo backend
+  expression?: string | null;
   is_active: boolean;
   triggered: boolean;
   created_at: string;
   triggered_at?: string;
+  // Só no histórico (alert_events): preço do ativo no momento do disparo
+  price?: number | null;
 }
 
 export interface AlertStats {
@@ -53,12 +58,34 @@ export interface AlertStats {
   total_tickers: number;
 }
 
+// Resposta de /dashboard: snapshot completo (full) ou apenas as mudanças desde `since`
+export interface DashboardSnapshot {
+  full: boolean;
+  sync_token: string;
+  stats: AlertStats;
+  active?: Alert[];
+  active_next_cursor?: string | null;
+  history?: Alert[];
+  changes?: Alert[];
+}
+
+// Paginação por cursor: o próximo cursor vem no header X-Next-Cursor
+export interface PageParams {
+  limit?: number;
+  cursor?: string;
+  fields?: string;
+}
+
 export interface CreateAlertPayload {
   user_id: number;
   ticker: string;
   alert_type: string;
   target_value: number;
   condition: string;
+  // Indicadores (sma, ema, rsi): sem valor usa o período padrão
+  period?: number;
+  // Regras compostas, ex.: "price < 30 AND volume > 10M"
+  expression?: string;
 }
 
 // Auth
@@ -73,16 +100,16 @@ export const authAPI = {
 // Alerts
 export const alertsAPI = {
   // Listar alertas ativos
-  getActive: (userId: number) => 
-    api.get<Alert[]>('/alerts', { params: { user_id: userId, active_only: true } }),
+  getActive: (userId: number, page: PageParams = {}) => 
+    api.get<Alert[]>('/alerts', { params: { user_id: userId, active_only: true, ...page } }),
   
   // Listar todos os alertas
-  getAll: (userId: number) => 
-    api.get<Alert[]>('/alerts', { params: { user_id: userId, active_only: false } }),
+  getAll: (userId: number, page: PageParams = {}) => 
+    api.get<Alert[]>('/alerts', { params: { user_id: userId, active_only: false, ...page } }),
   
   // Histórico de alertas disparados
-  getHistory: (userId: number) => 
-    api.get<Alert[]>('/alerts/history', { params: { user_id: userId } }),
+  getHistory: (userId: number, page: PageParams = {}) => 
+    api.get<Alert[]>('/alerts/history', { params: { user_id: userId, ...page } }),
   
   // Estatísticas
   getStats: (userId: number) => 
@@ -92,9 +119,19 @@ export const alertsAPI = {
   create: (payload: CreateAlertPayload) => 
     api.post<Alert>('/alerts', payload),
   
+  // Importar alertas em lote (array JSON)
+  bulkCreate: (userId: number, payload: Omit<CreateAlertPayload, 'user_id'>[]) => 
+    api.post('/alerts/bulk', payload, { params: { user_id: userId } }),
+  
   // Deletar alerta
   delete: (alertId: number, userId: number) => 
     api.delete(`/alerts/${alertId}`, { params: { user_id: userId } }),
 };
 
+// Dashboard (bootstrap + delta-sync)
+export const dashboardAPI = {
+  get: (userId: number, since?: string) => 
+    api.get<DashboardSnapshot>('/dashboard', { params: { user_id: userId, since } }),
+};
+
 export default api;
\ No newline at end of file